@@ -1,14 +1,22 @@
 from .neo4j_manager import Neo4jManager
+from .async_neo4j_manager import AsyncNeo4jManager
 from .graph_manager import GraphManager
+from .dataloader import GraphDataLoader
+from .path_engine import PathEngine
+from .write_buffer import WriteBuffer
+from .change_feed import ChangePoller
+from .entity_filter import EntityFilter
+from .temporal_index import TemporalIndex
+from text_index import NGramIndex
 import logging
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-__all__ = ['Neo4jManager', 'GraphManager', 'init_knowledge_graph']
+__all__ = ['Neo4jManager', 'AsyncNeo4jManager', 'GraphManager', 'GraphDataLoader', 'PathEngine', 'WriteBuffer', 'ChangePoller', 'EntityFilter', 'NGramIndex', 'TemporalIndex', 'init_knowledge_graph']
 
 def init_knowledge_graph(uri="neo4j://localhost:7687", user="neo4j", password="password", 
-                        sample_data=True, sample_path=None):
+                        sample_data=True, sample_path=None, warm_entities=None, **driver_config):
     """
     初始化知识图谱
     
@@ -18,12 +26,14 @@ def init_knowledge_graph(uri="neo4j://localhost:7687", user="neo4j", password="p
         password: 密码
         sample_data: 是否导入示例数据
         sample_path: 示例数据路径
+        warm_entities: 启动时预热查询缓存的热点实体列表
+        **driver_config: 连接池与超时配置，透传给Neo4jManager
     
     Returns:
         GraphManager实例
     """
     # 初始化Neo4j连接
-    neo4j_manager = Neo4jManager(uri, user, password)
+    neo4j_manager = Neo4jManager(uri, user, password, **driver_config)
     
     # 检查连接是否成功
     if not neo4j_manager.driver:
@@ -53,6 +63,10 @@ def init_knowledge_graph(uri="neo4j://localhost:7687", user="neo4j", password="p
         else:
             logging.warning(f"示例数据文件不存在: {sample_path}")
     
+    # 预热热点实体的查询缓存
+    if warm_entities:
+        graph_manager.warm_up_cache(warm_entities)
+    
     return graph_manager
 
 # 示例用法
@@ -0,0 +1,232 @@
+from neo4j import AsyncGraphDatabase, READ_ACCESS
+from .neo4j_manager import build_create_node_query, build_create_relationship_query
+from .query_profiler import QueryProfiler
+import asyncio
+import logging
+import time
+
+class AsyncNeo4jManager:
+    """
+    基于Neo4j异步驱动的连接管理器，接口与Neo4jManager保持一致
+    
+    所有查询方法都是协程，多个请求处理协程可以并发等待图数据库的往返，
+    而不必串行排队。由于建立连接需要await，请使用 `await AsyncNeo4jManager.create(...)`
+    或在构造后调用 `await manager.connect()`。
+    """
+    def __init__(self, uri="neo4j://localhost:7687", user="neo4j", password="password",
+                 database=None, max_connection_pool_size=100, connection_acquisition_timeout=60.0,
+                 connection_timeout=30.0, max_transaction_retry_time=30.0, fetch_size=1000,
+                 profiler=None):
+        """初始化异步Neo4j连接管理器，参数含义同Neo4jManager"""
+        self.uri = uri
+        self.user = user
+        self.password = password
+        self.database = database
+        self.max_connection_pool_size = max_connection_pool_size
+        self.connection_acquisition_timeout = connection_acquisition_timeout
+        self.connection_timeout = connection_timeout
+        self.max_transaction_retry_time = max_transaction_retry_time
+        self.fetch_size = fetch_size
+        self.driver = None
+        self.generation = 0
+        self.profiler = profiler or QueryProfiler()
+    
+    @classmethod
+    async def create(cls, *args, **kwargs):
+        """创建并连接异步管理器"""
+        manager = cls(*args, **kwargs)
+        await manager.connect()
+        return manager
+    
+    async def connect(self):
+        """建立与Neo4j数据库的连接"""
+        try:
+            self.driver = AsyncGraphDatabase.driver(
+                self.uri,
+                auth=(self.user, self.password),
+                max_connection_pool_size=self.max_connection_pool_size,
+                connection_acquisition_timeout=self.connection_acquisition_timeout,
+                connection_timeout=self.connection_timeout,
+                max_transaction_retry_time=self.max_transaction_retry_time
+            )
+            # 测试连接
+            await self.test_connection()
+            logging.info("成功连接到Neo4j数据库（异步）")
+            return True
+        except Exception as e:
+            logging.error(f"连接Neo4j数据库失败: {str(e)}")
+            self.driver = None
+            return False
+    
+    def _session(self, **config):
+        """创建异步会话，底层连接由驱动的连接池复用"""
+        config.setdefault('database', self.database)
+        config.setdefault('fetch_size', self.fetch_size)
+        return self.driver.session(**config)
+    
+    @staticmethod
+    async def _run_and_collect(tx, query, parameters):
+        """在托管事务中执行查询并取回全部记录"""
+        result = await tx.run(query, parameters)
+        return await result.data()
+    
+    @staticmethod
+    async def _run_profiled(tx, query, parameters):
+        """以PROFILE方式执行查询，返回 (记录列表, 执行计划)"""
+        result = await tx.run("PROFILE " + query, parameters)
+        records = await result.data()
+        summary = await result.consume()
+        return records, summary.profile
+    
+    async def _execute(self, query, parameters, write=False):
+        """在托管事务中执行查询，并把耗时、行数和抽样的执行计划交给性能分析器"""
+        parameters = parameters or {}
+        profile = self.profiler.should_profile()
+        work = self._run_profiled if profile else self._run_and_collect
+        
+        start = time.perf_counter()
+        try:
+            async with self._session() as session:
+                if write:
+                    result = await session.execute_write(work, query, parameters)
+                else:
+                    result = await session.execute_read(work, query, parameters)
+        except Exception as e:
+            self.profiler.record(query, parameters, (time.perf_counter() - start) * 1000, 0, error=str(e))
+            raise
+        
+        records, plan = result if profile else (result, None)
+        self.profiler.record(query, parameters, (time.perf_counter() - start) * 1000, len(records), plan)
+        return records
+    
+    async def test_connection(self):
+        """测试数据库连接"""
+        if self.driver:
+            async with self._session() as session:
+                result = await session.run("RETURN 1 AS count")
+                record = await result.single()
+                return record[0] == 1
+        return False
+    
+    async def execute_query(self, query, parameters=None):
+        """执行Cypher读查询（托管读事务）"""
+        if not self.driver:
+            logging.error("数据库连接未初始化")
+            return None
+        
+        try:
+            return await self._execute(query, parameters)
+        except Exception as e:
+            logging.error(f"执行查询失败: {str(e)}")
+            return None
+    
+    async def stream_query(self, query, parameters=None, fetch_size=None, as_tuples=False):
+        """以异步生成器方式流式执行Cypher查询，参数含义同Neo4jManager.stream_query"""
+        if not self.driver:
+            logging.error("数据库连接未初始化")
+            return
+        
+        try:
+            async with self._session(fetch_size=fetch_size or self.fetch_size,
+                                     default_access_mode=READ_ACCESS) as session:
+                result = await session.run(query, parameters or {})
+                async for record in result:
+                    yield tuple(record.values()) if as_tuples else record.data()
+        except Exception as e:
+            logging.error(f"流式查询失败: {str(e)}")
+    
+    async def execute_write(self, query, parameters=None):
+        """执行写操作的Cypher查询"""
+        if not self.driver:
+            logging.error("数据库连接未初始化")
+            return None
+        
+        try:
+            result = await self._execute(query, parameters, write=True)
+            self.generation += 1
+            return result
+        except Exception as e:
+            logging.error(f"执行写操作失败: {str(e)}")
+            return None
+    
+    async def execute_queries(self, queries):
+        """
+        并发执行多个读查询
+        
+        Args:
+            queries: (query, parameters) 元组列表
+        
+        Returns:
+            与输入顺序一致的结果列表
+        """
+        return await asyncio.gather(
+            *(self.execute_query(query, parameters) for query, parameters in queries)
+        )
+    
+    def get_query_stats(self, top_n=20, sort_by='total_ms'):
+        """获取各查询模板的延迟、行数和PROFILE统计"""
+        return self.profiler.get_stats(top_n=top_n, sort_by=sort_by)
+    
+    async def close(self):
+        """关闭数据库连接"""
+        if self.driver:
+            await self.driver.close()
+            logging.info("已关闭Neo4j数据库连接（异步）")
+    
+    async def create_node(self, label, properties):
+        """创建节点"""
+        query, params = build_create_node_query(label, properties)
+        return await self.execute_write(query, params)
+    
+    async def create_relationship(self, start_node_label, start_node_prop,
+                                  relationship_type, end_node_label, end_node_prop,
+                                  rel_properties=None):
+        """创建关系"""
+        query, params = build_create_relationship_query(
+            start_node_label, start_node_prop,
+            relationship_type, end_node_label, end_node_prop,
+            rel_properties
+        )
+        return await self.execute_write(query, params)
+    
+    async def get_node_by_property(self, label, property_name, property_value):
+        """根据属性查找节点"""
+        query = f"MATCH (n:{label}) WHERE n.{property_name} = $value RETURN n"
+        return await self.execute_query(query, {"value": property_value})
+    
+    async def get_relationships(self, node_label, property_name, property_value,
+                                relationship_type=None):
+        """获取节点的关系"""
+        rel_filter = f"[:{relationship_type}]" if relationship_type else ""
+        query = f"""
+        MATCH (n:{node_label})-[r{rel_filter}]-(m)
+        WHERE n.{property_name} = $value
+        RETURN n, r, m
+        """
+        return await self.execute_query(query, {"value": property_value})
+    
+    async def clear_database(self):
+        """清空数据库（谨慎使用）"""
+        query = "MATCH (n) DETACH DELETE n"
+        return await self.execute_write(query)
+
+# 测试代码
+if __name__ == "__main__":
+    # 配置日志
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
+    async def main():
+        manager = await AsyncNeo4jManager.create()
+        try:
+            if manager.driver:
+                # 两个查询的往返并发进行
+                companies, products = await manager.execute_queries([
+                    ("MATCH (c:Company) RETURN c.name AS name", None),
+                    ("MATCH (p:Product) RETURN p.name AS name", None),
+                ])
+                print(f"公司: {[c['name'] for c in companies or []]}")
+                print(f"产品: {[p['name'] for p in products or []]}")
+        finally:
+            await manager.close()
+    
+    asyncio.run(main())
@@ -0,0 +1,264 @@
+import logging
+import threading
+
+class ChangePoller:
+    """
+    图数据变更轮询器
+    
+    create_node和create_relationship会给节点和关系写入created_at时间戳。轮询器按水位线只取回
+    上次轮询之后新建的节点和关系，再把变更推送给订阅者（如QueryPreprocessor.apply_graph_changes、
+    QAEngine.apply_graph_changes），使进程内的AC自动机、实体嵌入等结构无需重启即可看到新数据。
+    
+    created_at由datetime()写入，取的是事务开始时间：开始较早、在上次轮询之后才提交的事务，
+    其created_at会小于水位线。因此每次轮询从水位线往前回看lag秒重新读取，并按elementId
+    去掉回看窗口内已经推送过的记录。lag应大于写事务的最长持续时间。
+    同一事务写入的数据created_at相同，分页时按 (created_at, elementId) 排序和翻页。
+    
+    轮询查询按标签（关系按类型）逐个匹配并用UNION合并，每个标签和关系类型都先在created_at上
+    建立范围索引，每次轮询只做索引范围扫描，不扫描全图。新出现的标签和关系类型在下次轮询时建立索引。
+    """
+    NODE_BRANCH = """
+    MATCH (n:{name})
+    WHERE {condition}
+    RETURN labels(n)[0] AS label, coalesce(n.name, n.id) AS name, properties(n) AS properties,
+           n.created_at AS created_at, elementId(n) AS element_id
+    ORDER BY created_at, element_id
+    LIMIT $limit
+    """
+    
+    RELATIONSHIP_BRANCH = """
+    MATCH (a)-[r:{name}]->(b)
+    WHERE {condition}
+    RETURN labels(a)[0] AS start_label, coalesce(a.name, a.id) AS start, type(r) AS type,
+           labels(b)[0] AS end_label, coalesce(b.name, b.id) AS end, properties(r) AS properties,
+           r.created_at AS created_at, elementId(r) AS element_id
+    ORDER BY created_at, element_id
+    LIMIT $limit
+    """
+    
+    PAGE_QUERY = """
+    CALL {{
+    {branches}
+    }}
+    RETURN *
+    ORDER BY created_at, element_id
+    LIMIT $limit
+    """
+    
+    LATEST_QUERY = """
+    CALL {{
+    {branches}
+    }}
+    RETURN max(created_at) AS created_at
+    """
+    
+    NODE_LATEST = "MATCH (n:{name}) WHERE n.created_at IS NOT NULL RETURN max(n.created_at) AS created_at"
+    RELATIONSHIP_LATEST = "MATCH ()-[r:{name}]->() WHERE r.created_at IS NOT NULL RETURN max(r.created_at) AS created_at"
+    
+    NODE_INDEX = "CREATE RANGE INDEX IF NOT EXISTS FOR (n:{name}) ON (n.created_at)"
+    RELATIONSHIP_INDEX = "CREATE RANGE INDEX IF NOT EXISTS FOR ()-[r:{name}]-() ON (r.created_at)"
+    
+    def __init__(self, neo4j_manager, poll_interval=5.0, batch_size=1000, start_from_latest=True, lag=60.0):
+        """
+        初始化变更轮询器
+        
+        Args:
+            neo4j_manager: Neo4j连接管理器
+            poll_interval: 后台轮询间隔（秒）
+            batch_size: 单次查询最多取回的节点或关系数
+            start_from_latest: 是否从数据库当前最新的时间戳开始（进程内结构已按全量数据构建时使用），
+                               否则第一次轮询会取回全部带时间戳的数据
+            lag: 每次轮询从水位线往前回看的秒数，用于取回晚提交的事务
+        """
+        self.neo4j_manager = neo4j_manager
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.lag = lag
+        self.logger = logging.getLogger(__name__)
+        
+        # 水位线：(已见到的最大created_at, 回看窗口内已推送的elementId集合)，None表示从头开始
+        self.node_watermark = None
+        self.relationship_watermark = None
+        
+        # 已在created_at上建立范围索引的节点标签和关系类型，轮询只查询这些标签和类型
+        self.indexed_labels = []
+        self.indexed_types = []
+        
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        
+        if start_from_latest:
+            self.reset_watermarks()
+    
+    @staticmethod
+    def _quote(name):
+        """把标签或关系类型转义为Cypher标识符"""
+        return '`' + str(name).replace('`', '``') + '`'
+    
+    def _ensure_indexes(self):
+        """为新出现的节点标签和关系类型在created_at上建立范围索引（调用方持有_lock）"""
+        for procedure, column, index_query, indexed in (
+            ('db.labels()', 'label', self.NODE_INDEX, self.indexed_labels),
+            ('db.relationshipTypes()', 'relationshipType', self.RELATIONSHIP_INDEX, self.indexed_types)
+        ):
+            rows = self.neo4j_manager.execute_query(f"CALL {procedure} YIELD {column} RETURN {column} AS name")
+            for row in rows or []:
+                name = row['name']
+                if name in indexed:
+                    continue
+                # 建立索引失败的标签不加入轮询，下次轮询重试
+                if self.neo4j_manager.execute_write(index_query.format(name=self._quote(name))) is None:
+                    self.logger.error(f"为 {name} 的created_at建立索引失败")
+                    continue
+                indexed.append(name)
+    
+    def _union(self, template, names, separator='UNION', **fields):
+        """按标签（或关系类型）逐个展开查询分支并用UNION合并"""
+        return separator.join(template.format(name=self._quote(name), **fields) for name in names)
+    
+    def reset_watermarks(self):
+        """
+        把水位线设置为数据库中当前最新的时间戳
+        
+        回看窗口内已有的记录视为已推送，之后的轮询不会再推送它们。
+        """
+        with self._lock:
+            self._ensure_indexes()
+            self.node_watermark = self._latest_watermark(
+                'n', self.NODE_BRANCH, self.NODE_LATEST, self.indexed_labels
+            )
+            self.relationship_watermark = self._latest_watermark(
+                'r', self.RELATIONSHIP_BRANCH, self.RELATIONSHIP_LATEST, self.indexed_types
+            )
+    
+    def _latest_watermark(self, variable, branch, latest_branch, names):
+        """最新时间戳及其回看窗口内全部记录组成的水位线"""
+        if not names:
+            return None
+        rows = self.neo4j_manager.execute_query(
+            self.LATEST_QUERY.format(branches=self._union(latest_branch, names, separator='\n    UNION ALL\n    '))
+        )
+        if not rows or rows[0]['created_at'] is None:
+            return None
+        _, watermark = self._fetch_since(branch, variable, names, (rows[0]['created_at'], set()))
+        return watermark
+    
+    def subscribe(self, callback):
+        """
+        订阅变更
+        
+        Args:
+            callback: 接收变更字典 {'nodes': [...], 'relationships': [...]} 的可调用对象
+        """
+        self._subscribers.append(callback)
+        return callback
+    
+    def unsubscribe(self, callback):
+        """取消订阅"""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+    
+    def _fetch_since(self, branch, variable, names, watermark):
+        """
+        分页取回水位线之后（含回看窗口内晚提交）的新记录
+        
+        Returns:
+            (新记录列表, 新水位线)
+        """
+        if not names:
+            return [], watermark
+        since, seen = watermark if watermark is not None else (None, set())
+        start = since
+        records = []
+        window_ids = set()
+        cursor = None
+        complete = False
+        while True:
+            if start is None:
+                conditions = [f"{variable}.created_at IS NOT NULL"]
+                params = {'limit': self.batch_size}
+            else:
+                conditions = [f"{variable}.created_at >= $since - duration({{seconds: $lag}})"]
+                params = {'since': start, 'lag': self.lag, 'limit': self.batch_size}
+            if cursor is not None:
+                conditions.append(f"({variable}.created_at > $cursor OR "
+                                  f"({variable}.created_at = $cursor AND elementId({variable}) > $cursor_id))")
+                params.update(cursor=cursor[0], cursor_id=cursor[1])
+            condition = ' AND '.join(f"({c})" for c in conditions)
+            page_query = self.PAGE_QUERY.format(branches=self._union(branch, names, condition=condition))
+            
+            page = self.neo4j_manager.execute_query(page_query, params)
+            if page is None:
+                # 查询失败时保留已推送的记录，下次轮询从已取得的位置重试
+                break
+            for record in page:
+                window_ids.add(record['element_id'])
+                if record['element_id'] not in seen:
+                    records.append(record)
+            if page:
+                cursor = (page[-1]['created_at'], page[-1]['element_id'])
+                if since is None or cursor[0] > since:
+                    since = cursor[0]
+            if len(page) < self.batch_size:
+                complete = True
+                break
+        
+        # 完整读完回看窗口时，窗口外的旧记录不会再被读到，只需记住窗口内的elementId
+        seen = window_ids if complete else seen | window_ids
+        return records, (since, seen) if since is not None else None
+    
+    def poll_once(self):
+        """
+        执行一次轮询，把新增的节点和关系推送给订阅者
+        
+        Returns:
+            变更字典，没有新数据时两个列表均为空
+        """
+        with self._lock:
+            self._ensure_indexes()
+            nodes, node_watermark = self._fetch_since(self.NODE_BRANCH, 'n', self.indexed_labels, self.node_watermark)
+            relationships, rel_watermark = self._fetch_since(self.RELATIONSHIP_BRANCH, 'r', self.indexed_types,
+                                                             self.relationship_watermark)
+            self.node_watermark = node_watermark
+            self.relationship_watermark = rel_watermark
+        
+        changes = {'nodes': nodes, 'relationships': relationships}
+        if not nodes and not relationships:
+            return changes
+        
+        self.logger.info(f"检测到图数据变更: {len(nodes)} 个新节点, {len(relationships)} 条新关系")
+        # 其他进程写入的数据不会经过本进程的execute_write，这里同步递增图版本号使查询缓存失效
+        if hasattr(self.neo4j_manager, 'bump_generation'):
+            self.neo4j_manager.bump_generation()
+        
+        for callback in list(self._subscribers):
+            try:
+                callback(changes)
+            except Exception as e:
+                self.logger.error(f"变更订阅者处理失败: {str(e)}")
+        return changes
+    
+    def _run(self):
+        """后台轮询线程"""
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll_once()
+            except Exception as e:
+                self.logger.error(f"轮询图数据变更失败: {str(e)}")
+    
+    def start(self):
+        """启动后台轮询"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='graph-change-poller', daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        """停止后台轮询"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,74 @@
+class GraphDataLoader:
+    """
+    请求级图查询数据加载器
+    
+    调用方先用prefetch_*登记本次请求会用到的键，之后逐个调用与GraphManager同名的
+    查询方法：第一次未命中时，所有已登记但尚未查询的键会通过一次批量查询一起取回，
+    其余调用直接命中本地结果。加载器不做失效处理，应在每个请求（或每次预测）内新建。
+    """
+    def __init__(self, graph_manager):
+        """初始化数据加载器"""
+        self.graph_manager = graph_manager
+        
+        # 待查询的键（dict保持登记顺序并去重）
+        self._pending_pairs = {}
+        self._pending_keys = {}
+        
+        # 已取回的结果
+        self._pair_results = {}
+        self._key_results = {}
+        
+        self.batches_dispatched = 0
+    
+    def prefetch_relationship_between(self, pairs):
+        """登记需要查询关系的 (entity1, entity2) 实体对"""
+        for pair in pairs:
+            pair = tuple(pair)
+            if pair not in self._pair_results:
+                self._pending_pairs[pair] = None
+    
+    def prefetch_entities_relationships(self, keys, top_k=5):
+        """登记需要查询相关实体的 (entity, relationship) 键"""
+        for entity, relationship in keys:
+            key = (entity, relationship, top_k)
+            if key not in self._key_results:
+                self._pending_keys[key] = None
+    
+    def query_relationship_between_entities(self, entity1, entity2):
+        """查询两个实体之间的关系，接口与GraphManager一致"""
+        pair = (entity1, entity2)
+        if pair not in self._pair_results:
+            self._pending_pairs[pair] = None
+            self.dispatch()
+        return self._pair_results[pair]
+    
+    def query_entities_relationships(self, entity, relationship=None, top_k=5):
+        """查询与实体相关的关系和其他实体，接口与GraphManager一致"""
+        key = (entity, relationship, top_k)
+        if key not in self._key_results:
+            self._pending_keys[key] = None
+            self.dispatch()
+        return self._key_results[key]
+    
+    def dispatch(self):
+        """把所有待查询的键合并为批量查询发出"""
+        if self._pending_pairs:
+            pairs = list(self._pending_pairs)
+            self._pending_pairs = {}
+            results = self.graph_manager.query_relationships_between_entities_batch(pairs) or {}
+            for pair in pairs:
+                self._pair_results[pair] = results.get(pair, [])
+            self.batches_dispatched += 1
+        
+        if self._pending_keys:
+            # 不同top_k的键分开查询
+            by_top_k = {}
+            for entity, relationship, top_k in self._pending_keys:
+                by_top_k.setdefault(top_k, []).append((entity, relationship))
+            self._pending_keys = {}
+            
+            for top_k, keys in by_top_k.items():
+                results = self.graph_manager.query_entities_relationships_batch(keys, top_k=top_k) or {}
+                for key in keys:
+                    self._key_results[key + (top_k,)] = results.get(key, [])
+                self.batches_dispatched += 1
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import math
+import os
+import threading
+
+class EntityFilter:
+    """
+    已知实体名的Bloom过滤器，用于在查询数据库前排除一定不存在的实体
+    
+    图查询对实体的匹配条件是 name CONTAINS $q OR id = $q，因此过滤器中写入的不只是完整名称，
+    还有名称中长度不超过max_gram的全部子串，以及实体id和别名。判断查询串q时：
+    len(q) <= max_gram时直接检查q；更长的q只有在它的每个长度为max_gram的窗口都存在时才可能是某个名称的子串。
+    Bloom过滤器没有假阴性，返回"一定不存在"时可以安全地跳过数据库查询。
+    """
+    FORMAT_VERSION = 1
+    
+    def __init__(self, expected_items=100000, fp_rate=0.01, max_gram=4):
+        """
+        初始化过滤器
+        
+        Args:
+            expected_items: 预计写入的条目数（子串、id和别名的总数）
+            fp_rate: 目标假阳性率
+            max_gram: 写入的名称子串的最大长度
+        """
+        expected_items = max(1, int(expected_items))
+        self.num_bits = max(8, int(math.ceil(-expected_items * math.log(fp_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / expected_items * math.log(2))))
+        self.max_gram = max_gram
+        self.fp_rate = fp_rate
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+        self.fingerprint = None
+        self._lock = threading.Lock()
+        
+        # 运行统计
+        self.checks = 0
+        self.definite_misses = 0
+        self.false_positives = 0
+    
+    def _positions(self, item):
+        """双重哈希得到item的num_hashes个比特位置"""
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+    
+    def add(self, item):
+        """写入一个条目"""
+        positions = self._positions(item)
+        with self._lock:
+            for position in positions:
+                self.bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+    
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+    
+    @staticmethod
+    def substrings(name, max_gram):
+        """名称中长度不超过max_gram的全部不重复子串"""
+        return {name[i:j] for i in range(len(name)) for j in range(i + 1, min(i + max_gram, len(name)) + 1)}
+    
+    @staticmethod
+    def estimate_items(name, max_gram):
+        """估计一个名称会写入的条目数上界"""
+        n = len(name)
+        g = min(max_gram, n)
+        return g * (2 * n - g + 1) // 2 + 1
+    
+    @staticmethod
+    def _entity_hash(name, entity_id, aliases):
+        """单个实体 (名称, id, 别名) 的64位哈希"""
+        item = json.dumps([name, entity_id, sorted(str(alias) for alias in aliases or ())],
+                          ensure_ascii=False, default=str)
+        return int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'little')
+    
+    @classmethod
+    def content_fingerprint(cls, entities):
+        """
+        实体集合的内容指纹
+        
+        各实体哈希按64位取模求和，与读取顺序无关，也可以随add_entity增量更新；
+        任一实体的新增、删除或改名都会改变指纹。
+        
+        Args:
+            entities: (name, entity_id, aliases) 元组的可迭代对象
+        
+        Returns:
+            {'node_count': 实体数, 'content_hash': 十六进制哈希}
+        """
+        total = 0
+        count = 0
+        for name, entity_id, aliases in entities:
+            total = (total + cls._entity_hash(name, entity_id, aliases)) & 0xFFFFFFFFFFFFFFFF
+            count += 1
+        return {'node_count': count, 'content_hash': f'{total:016x}'}
+    
+    def add_entity(self, name=None, entity_id=None, aliases=()):
+        """写入一个实体：名称的全部短子串、id和别名"""
+        if name is not None:
+            for item in self.substrings(str(name), self.max_gram):
+                self.add(item)
+        if entity_id is not None:
+            self.add(str(entity_id))
+        for alias in aliases or ():
+            self.add(str(alias))
+        # 已有内容指纹时同步计入该实体，保存的快照指纹始终对应过滤器实际写入的实体
+        if self.fingerprint and 'content_hash' in self.fingerprint:
+            with self._lock:
+                total = int(self.fingerprint['content_hash'], 16) + self._entity_hash(name, entity_id, aliases)
+                self.fingerprint = {'node_count': self.fingerprint['node_count'] + 1,
+                                    'content_hash': f'{total & 0xFFFFFFFFFFFFFFFF:016x}'}
+    
+    def might_match(self, query):
+        """
+        判断是否可能存在名称包含query或id等于query的实体
+        
+        Returns:
+            False表示一定不存在，True表示可能存在
+        """
+        self.checks += 1
+        if not query:
+            return True
+        query = str(query)
+        if query in self:
+            return True
+        if len(query) > self.max_gram and all(
+            query[i:i + self.max_gram] in self for i in range(len(query) - self.max_gram + 1)
+        ):
+            return True
+        self.definite_misses += 1
+        return False
+    
+    def record_false_positive(self):
+        """记录一次过滤器判断可能存在、但数据库查询为空的情况"""
+        self.false_positives += 1
+    
+    def estimated_fpr(self):
+        """按当前条目数估计的单次检查假阳性率"""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+    
+    def get_stats(self):
+        """获取过滤器统计信息"""
+        negatives = self.definite_misses + self.false_positives
+        return {
+            'num_bits': self.num_bits,
+            'num_hashes': self.num_hashes,
+            'max_gram': self.max_gram,
+            'items': self.count,
+            'size_bytes': len(self.bits),
+            'target_fpr': self.fp_rate,
+            'estimated_fpr': self.estimated_fpr(),
+            'checks': self.checks,
+            'definite_misses': self.definite_misses,
+            'false_positives': self.false_positives,
+            # 实际不存在的查询中被过滤器放行的比例（假阳性只能在查询结果为空时观测到）
+            'observed_fpr': self.false_positives / negatives if negatives else 0.0
+        }
+    
+    def save(self, path):
+        """保存过滤器：一行JSON头部加比特数组，原子写入"""
+        header = {
+            'version': self.FORMAT_VERSION,
+            'num_bits': self.num_bits,
+            'num_hashes': self.num_hashes,
+            'max_gram': self.max_gram,
+            'fp_rate': self.fp_rate,
+            'count': self.count,
+            'fingerprint': self.fingerprint
+        }
+        tmp_path = path + '.tmp'
+        with self._lock:
+            with open(tmp_path, 'wb') as f:
+                f.write(json.dumps(header).encode('utf-8') + b'\n')
+                f.write(bytes(self.bits))
+        os.replace(tmp_path, path)
+        return True
+    
+    @classmethod
+    def load(cls, path):
+        """加载save保存的过滤器"""
+        with open(path, 'rb') as f:
+            header = json.loads(f.readline().decode('utf-8'))
+            bits = f.read()
+        if header.get('version') != cls.FORMAT_VERSION:
+            raise ValueError(f"不支持的实体过滤器格式版本: {header.get('version')}")
+        
+        entity_filter = cls.__new__(cls)
+        entity_filter.num_bits = header['num_bits']
+        entity_filter.num_hashes = header['num_hashes']
+        entity_filter.max_gram = header['max_gram']
+        entity_filter.fp_rate = header['fp_rate']
+        entity_filter.count = header['count']
+        entity_filter.fingerprint = header.get('fingerprint')
+        entity_filter.bits = bytearray(bits)
+        if len(entity_filter.bits) != (entity_filter.num_bits + 7) // 8:
+            raise ValueError("实体过滤器文件不完整")
+        entity_filter._lock = threading.Lock()
+        entity_filter.checks = entity_filter.definite_misses = entity_filter.false_positives = 0
+        return entity_filter
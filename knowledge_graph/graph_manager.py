@@ -1,16 +1,99 @@
 from .neo4j_manager import Neo4jManager
+from .dataloader import GraphDataLoader
+from .query_cache import QueryCache
+from .path_engine import PathEngine
+from .entity_filter import EntityFilter
+from .temporal_index import TemporalIndex
+from text_index import NGramIndex
+from collections import Counter
+import copy
+import gzip
 import json
 import logging
-import pandas as pd
+import os
+import threading
 
 class GraphManager:
-    def __init__(self, neo4j_manager=None):
-        """初始化知识图谱管理器"""
+    # 等待变更轮询器重放的本进程写入实体的最大数量
+    MAX_LOCAL_NODES = 100000
+    
+    def __init__(self, neo4j_manager=None, cache_size=1024, cache_ttl=300):
+        """
+        初始化知识图谱管理器
+        
+        Args:
+            neo4j_manager: Neo4j连接管理器
+            cache_size: 读查询结果缓存的最大条目数，0表示关闭缓存
+            cache_ttl: 缓存条目的存活时间（秒）
+        """
         self.neo4j_manager = neo4j_manager or Neo4jManager()
         self.logger = logging.getLogger(__name__)
+        
+        # 读查询结果缓存，图数据写入后按版本号失效
+        self.query_cache = None
+        if cache_size:
+            self.query_cache = QueryCache(
+                max_entries=cache_size, 
+                ttl=cache_ttl, 
+                generation_source=lambda: getattr(self.neo4j_manager, 'generation', 0)
+            )
+        
+        # 内存路径引擎，调用build_path_engine后启用
+        self.path_engine = None
+        
+        # 已知实体名过滤器，调用build_entity_filter后启用
+        self.entity_filter = None
+        
+        # 实体名n-gram索引和实体id集合，调用build_ngram_index后启用
+        self.ngram_index = None
+        self.entity_ids = set()
+        
+        # 带时间信息的关系索引，调用build_temporal_index后启用
+        self.temporal_index = None
+        
+        # 本进程写入、尚未被变更轮询器重放的实体 {(name, id, aliases): 次数}，重放时跳过，避免重复计入过滤器指纹
+        self._local_nodes = Counter()
+        self._local_nodes_lock = threading.Lock()
     
-    def build_graph_from_json(self, data_path):
-        """从JSON文件构建知识图谱"""
+    def _cached_query(self, method, key_params, query, parameters):
+        """
+        带读穿缓存的查询：命中时直接返回缓存结果，未命中时查询数据库并缓存
+        
+        缓存中保存结果的副本，每次命中也返回副本，调用方修改返回的记录不会影响缓存和其他调用方。
+        """
+        if self.query_cache is None:
+            return self.neo4j_manager.execute_query(query, parameters)
+        
+        key = QueryCache.make_key(method, key_params)
+        hit, value = self.query_cache.get(key)
+        if hit:
+            return copy.deepcopy(value)
+        
+        # 先记录版本号，查询期间若有写入，该结果会在下次读取时失效
+        generation = self.query_cache.current_generation()
+        value = self.neo4j_manager.execute_query(query, parameters)
+        if value is None:
+            return None
+        self.query_cache.put(key, copy.deepcopy(value), generation)
+        return value
+    
+    def _flush_buffered_writes(self, buffered):
+        """提交写缓冲中的写操作，返回是否全部成功"""
+        if not buffered:
+            return True
+        results = self.neo4j_manager.flush_writes()
+        failed = sum(result['size'] for result in results if not result['success'])
+        if failed:
+            self.logger.error(f"{failed} 个缓冲写操作提交失败")
+        return failed == 0
+    
+    def build_graph_from_json(self, data_path, buffered=False):
+        """
+        从JSON文件构建知识图谱
+        
+        buffered=True时节点和关系经写缓冲批量提交（需先调用neo4j_manager.enable_write_buffer）
+        """
+        buffered = buffered and getattr(self.neo4j_manager, 'write_buffer', None) is not None
         try:
             with open(data_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
@@ -19,9 +102,13 @@ class GraphManager:
             if 'nodes' in data:
                 for node in data['nodes']:
                     label = node.pop('label')
-                    self.neo4j_manager.create_node(label, node)
+                    self.neo4j_manager.create_node(label, node, buffered=buffered)
                     self.logger.info(f"创建节点: {label} {node}")
             
+            # 关系依赖节点已存在，先提交缓冲中的节点
+            if not self._flush_buffered_writes(buffered):
+                return False
+            
             # 创建关系
             if 'relationships' in data:
                 for rel in data['relationships']:
@@ -31,17 +118,21 @@ class GraphManager:
                         rel['type'],
                         rel['end_label'],
                         {rel['end_property']: rel['end_value']},
-                        rel.get('properties', {})
+                        rel.get('properties', {}),
+                        buffered=buffered
                     )
                     self.logger.info(f"创建关系: {rel['type']}")
             
-            return True
+            return self._flush_buffered_writes(buffered)
         except Exception as e:
             self.logger.error(f"从JSON构建图谱失败: {str(e)}")
             return False
     
-    def build_graph_from_csv(self, nodes_csv, relationships_csv):
-        """从CSV文件构建知识图谱"""
+    def build_graph_from_csv(self, nodes_csv, relationships_csv, buffered=False):
+        """从CSV文件构建知识图谱，buffered含义同build_graph_from_json"""
+        import pandas as pd
+        
+        buffered = buffered and getattr(self.neo4j_manager, 'write_buffer', None) is not None
         try:
             # 导入节点
             nodes_df = pd.read_csv(nodes_csv)
@@ -49,7 +140,10 @@ class GraphManager:
                 # 假设CSV中有label列，其余列为属性
                 row_dict = row.to_dict()
                 label = row_dict.pop('label')
-                self.neo4j_manager.create_node(label, row_dict)
+                self.neo4j_manager.create_node(label, row_dict, buffered=buffered)
+            
+            if not self._flush_buffered_writes(buffered):
+                return False
             
             # 导入关系
             rels_df = pd.read_csv(relationships_csv)
@@ -62,16 +156,36 @@ class GraphManager:
                     row_dict['type'],
                     row_dict['end_label'],
                     {row_dict['end_property']: row_dict['end_value']},
-                    {k: v for k, v in row_dict.items() if k not in ['start_label', 'start_property', 'start_value', 'type', 'end_label', 'end_property', 'end_value']}
+                    {k: v for k, v in row_dict.items() if k not in ['start_label', 'start_property', 'start_value', 'type', 'end_label', 'end_property', 'end_value']},
+                    buffered=buffered
                 )
             
-            return True
+            return self._flush_buffered_writes(buffered)
         except Exception as e:
             self.logger.error(f"从CSV构建图谱失败: {str(e)}")
             return False
     
+    def _definitely_missing(self, *entities):
+        """
+        任一实体一定不存在时返回True
+        
+        n-gram索引是精确的：没有名称包含该实体名、也没有相同的id时一定不存在；
+        未构建索引时退而使用Bloom过滤器判断。
+        """
+        for entity in entities:
+            if self.ngram_index is not None:
+                entity = str(entity)
+                if entity not in self.entity_ids and not self.ngram_index.has_substring(entity):
+                    return True
+            elif self.entity_filter is not None and not self.entity_filter.might_match(entity):
+                return True
+        return False
+    
     def query_entities_relationships(self, entity, relationship=None, top_k=5):
         """查询与实体相关的关系和其他实体"""
+        if self._definitely_missing(entity):
+            return []
+        
         if relationship:
             query = f"""
             MATCH (e)-[r:{relationship}]->(related)
@@ -87,13 +201,16 @@ class GraphManager:
             LIMIT $limit
             """
         
-        return self.neo4j_manager.execute_query(
-            query, 
-            {"entity": entity, "limit": top_k}
+        return self._cached_query(
+            'query_entities_relationships', (entity, relationship, top_k),
+            query, {"entity": entity, "limit": top_k}
         )
     
     def query_relationship_between_entities(self, entity1, entity2):
         """查询两个实体之间的关系"""
+        if self._definitely_missing(entity1, entity2):
+            return []
+        
         query = f"""
         MATCH (e1)-[r]-(e2)
         WHERE (e1.name CONTAINS $entity1 OR e1.id = $entity1) AND 
@@ -101,13 +218,133 @@ class GraphManager:
         RETURN e1.name AS entity1, type(r) AS relationship, e2.name AS entity2, properties(r) AS rel_properties
         """
         
-        return self.neo4j_manager.execute_query(
+        return self._cached_query(
+            'query_relationship_between_entities', (entity1, entity2),
+            query, {"entity1": entity1, "entity2": entity2}
+        )
+    
+    def query_relationships_between_entities_batch(self, pairs):
+        """
+        批量查询多对实体之间的关系，一次UNWIND查询完成所有配对
+        
+        Args:
+            pairs: (entity1, entity2) 元组列表
+        
+        Returns:
+            以 (entity1, entity2) 为键、与query_relationship_between_entities返回格式相同的记录列表为值的字典，
+            查询失败时返回None
+        """
+        pairs = list(dict.fromkeys((entity1, entity2) for entity1, entity2 in pairs))
+        results = {pair: [] for pair in pairs}
+        pairs = [pair for pair in pairs if not self._definitely_missing(*pair)]
+        if not pairs:
+            return results
+        
+        query = """
+        UNWIND $pairs AS pair
+        MATCH (e1)-[r]-(e2)
+        WHERE (e1.name CONTAINS pair[0] OR e1.id = pair[0]) AND 
+              (e2.name CONTAINS pair[1] OR e2.id = pair[1])
+        RETURN pair[0] AS key1, pair[1] AS key2, 
+               e1.name AS entity1, type(r) AS relationship, e2.name AS entity2, properties(r) AS rel_properties
+        """
+        rows = self.neo4j_manager.execute_query(
             query, 
-            {"entity1": entity1, "entity2": entity2}
+            {"pairs": [list(pair) for pair in pairs]}
         )
+        if rows is None:
+            return None
+        
+        for row in rows:
+            key = (row.pop('key1'), row.pop('key2'))
+            results[key].append(row)
+        return results
     
-    def query_path_between_entities(self, entity1, entity2, max_depth=3):
-        """查询两个实体之间的路径"""
+    def query_entities_relationships_batch(self, keys, top_k=5):
+        """
+        批量查询多个 (实体, 关系类型) 的相关实体，一次UNWIND查询完成
+        
+        Args:
+            keys: (entity, relationship) 元组列表，relationship为None表示不限关系类型
+            top_k: 每个键最多返回的记录数
+        
+        Returns:
+            以 (entity, relationship) 为键、与query_entities_relationships返回格式相同的记录列表为值的字典，
+            查询失败时返回None
+        """
+        keys = list(dict.fromkeys((entity, relationship) for entity, relationship in keys))
+        results = {key: [] for key in keys}
+        keys = [key for key in keys if not self._definitely_missing(key[0])]
+        if not keys:
+            return results
+        
+        query = """
+        UNWIND $keys AS key
+        CALL {
+            WITH key
+            MATCH (e)-[r]->(related)
+            WHERE (e.name CONTAINS key.entity OR e.id = key.entity)
+              AND (key.relationship IS NULL OR type(r) = key.relationship)
+            RETURN e.name AS entity, type(r) AS relationship, labels(related)[0] AS related_type, 
+                   related.name AS related_entity, properties(r) AS rel_properties
+            LIMIT $limit
+        }
+        RETURN key.entity AS key_entity, key.relationship AS key_relationship, 
+               entity, relationship, related_type, related_entity, rel_properties
+        """
+        rows = self.neo4j_manager.execute_query(
+            query, 
+            {"keys": [{"entity": entity, "relationship": relationship} for entity, relationship in keys], 
+             "limit": top_k}
+        )
+        if rows is None:
+            return None
+        
+        for row in rows:
+            key = (row.pop('key_entity'), row.pop('key_relationship'))
+            results[key].append(row)
+        return results
+    
+    def dataloader(self):
+        """创建请求级数据加载器，把同一请求内的单次查询合并为批量查询"""
+        return GraphDataLoader(self)
+    
+    def build_path_engine(self, max_visits=10000, min_rebuild_interval=60):
+        """
+        构建内存路径引擎，之后query_path_between_entities改由引擎回答
+        
+        Args:
+            max_visits: 单次路径查询最多访问的节点数
+            min_rebuild_interval: 图数据变化后两次重建邻接表的最小间隔（秒）
+        
+        Returns:
+            PathEngine实例
+        """
+        engine = PathEngine(self.neo4j_manager, max_visits=max_visits, 
+                            min_rebuild_interval=min_rebuild_interval)
+        engine.build()
+        self.path_engine = engine
+        return engine
+    
+    def query_path_between_entities(self, entity1, entity2, max_depth=3, k=1, relationship_types=None):
+        """
+        查询两个实体之间的路径
+        
+        返回 [{'path': [节点属性, 关系类型, 节点属性, ...]}, ...]，即Neo4j驱动对Path记录的转换结果。
+        已调用build_path_engine时由内存路径引擎回答（双向BFS / Yen k短路径），返回最短的k条路径，
+        节点属性只包含name（没有name时为id）；否则回退到Cypher的shortestPath查询，
+        此时k和relationship_types不生效。
+        """
+        if self.path_engine is not None:
+            self.path_engine.refresh_if_stale()
+            return self.path_engine.find_paths(
+                entity1, entity2, k=k, max_depth=max_depth, 
+                relationship_types=relationship_types, as_records=True
+            )
+        
+        if self._definitely_missing(entity1, entity2):
+            return []
+        
         query = f"""
         MATCH path = shortestPath((e1)-[*1..{max_depth}]-(e2))
         WHERE (e1.name CONTAINS $entity1 OR e1.id = $entity1) AND 
@@ -115,23 +352,251 @@ class GraphManager:
         RETURN path
         """
         
-        return self.neo4j_manager.execute_query(
-            query, 
-            {"entity1": entity1, "entity2": entity2}
+        return self._cached_query(
+            'query_path_between_entities', (entity1, entity2, max_depth),
+            query, {"entity1": entity1, "entity2": entity2}
+        )
+    
+    def build_temporal_index(self):
+        """
+        构建带时间信息的关系索引，之后按时间的关系查询改由索引回答
+        
+        Returns:
+            TemporalIndex实例
+        """
+        self.temporal_index = TemporalIndex(self.neo4j_manager).build()
+        return self.temporal_index
+    
+    def query_relationships_between_years(self, entity, start_year=None, end_year=None, relationship=None):
+        """
+        查询实体在某一时间区间（含两端）内建立的关系
+        
+        已调用build_temporal_index时由内存索引二分查找回答；否则回退到Cypher查询，
+        此时只按year和since属性过滤。
+        
+        Returns:
+            [{'entity', 'relationship', 'related_entity', 'year', 'direction'}, ...]，按年份升序
+        """
+        if self.temporal_index is not None:
+            return self.temporal_index.relationships_between(
+                entity, start_year=start_year, end_year=end_year, relationship=relationship
+            )
+        
+        if self._definitely_missing(entity):
+            return []
+        
+        rel_pattern = f":{relationship}" if relationship else ""
+        query = f"""
+        MATCH (e)-[r{rel_pattern}]-(n)
+        WHERE (e.name = $entity OR e.id = $entity)
+        WITH e, r, n, coalesce(r.year, r.since) AS year
+        WHERE year IS NOT NULL AND ($start_year IS NULL OR year >= $start_year)
+              AND ($end_year IS NULL OR year <= $end_year)
+        RETURN e.name AS entity, type(r) AS relationship, n.name AS related_entity, year,
+               CASE WHEN startNode(r) = e THEN 'out' ELSE 'in' END AS direction
+        ORDER BY year
+        """
+        return self._cached_query(
+            'query_relationships_between_years', (entity, start_year, end_year, relationship),
+            query, {"entity": entity, "start_year": start_year, "end_year": end_year}
         )
     
+    def query_relationships_as_of(self, entity, year, relationship=None):
+        """查询实体在year（含）及之前建立的关系，返回格式同query_relationships_between_years"""
+        return self.query_relationships_between_years(entity, end_year=year, relationship=relationship)
+    
     def get_entity_info(self, entity_name):
         """获取实体的详细信息"""
+        if self._definitely_missing(entity_name):
+            return []
+        
         query = f"""
         MATCH (e) WHERE e.name CONTAINS $entity_name OR e.id = $entity_name
         RETURN labels(e)[0] AS type, properties(e) AS properties
         LIMIT 1
         """
         
-        return self.neo4j_manager.execute_query(
-            query, 
-            {"entity_name": entity_name}
+        result = self._cached_query(
+            'get_entity_info', (entity_name,),
+            query, {"entity_name": entity_name}
         )
+        if result == [] and self.entity_filter is not None:
+            self.entity_filter.record_false_positive()
+        return result
+    
+    def get_node_count(self):
+        """获取节点总数"""
+        result = self.neo4j_manager.execute_query("MATCH (n) RETURN count(n) AS count")
+        return result[0]['count'] if result else 0
+    
+    @staticmethod
+    def _aliases(value):
+        """把别名属性规范化为列表"""
+        if value is None:
+            return []
+        if isinstance(value, (list, tuple)):
+            return list(value)
+        return [value]
+    
+    def build_entity_filter(self, fp_rate=0.01, max_gram=4, snapshot_path=None, growth=1.5):
+        """
+        构建已知实体名过滤器，之后各读查询会跳过一定不存在的实体
+        
+        Args:
+            fp_rate: 目标假阳性率
+            max_gram: 写入的名称子串最大长度，越大对长查询串的排除能力越强，占用内存也越多
+            snapshot_path: 过滤器快照路径；快照存在且内容指纹与数据库一致时直接加载，否则重建并保存
+            growth: 为后续写入预留的容量倍数
+        
+        Returns:
+            EntityFilter实例
+        """
+        query = "MATCH (n) RETURN n.name AS name, n.id AS id, coalesce(n.aliases, n.alias) AS aliases"
+        entities = [
+            (name, entity_id, self._aliases(aliases))
+            for name, entity_id, aliases in self.neo4j_manager.stream_query(query, as_tuples=True)
+        ]
+        # 指纹覆盖全部实体的名称、id和别名，数量不变的改名、删除后新增也会使快照失效
+        fingerprint = EntityFilter.content_fingerprint(entities)
+        if snapshot_path and os.path.exists(snapshot_path):
+            try:
+                entity_filter = EntityFilter.load(snapshot_path)
+                if entity_filter.fingerprint == fingerprint:
+                    self._install_entity_filter(entity_filter)
+                    self.logger.info(f"从快照加载实体过滤器: {snapshot_path}")
+                    return entity_filter
+                self.logger.info("实体过滤器快照与数据库不一致，重新构建")
+            except Exception as e:
+                self.logger.warning(f"加载实体过滤器快照失败，重新构建: {str(e)}")
+        
+        expected = sum(
+            (EntityFilter.estimate_items(str(name), max_gram) if name is not None else 0) + 1 + len(aliases)
+            for name, _, aliases in entities
+        )
+        
+        entity_filter = EntityFilter(expected_items=expected * growth, fp_rate=fp_rate, max_gram=max_gram)
+        for name, entity_id, aliases in entities:
+            entity_filter.add_entity(name, entity_id, aliases)
+        entity_filter.fingerprint = fingerprint
+        self._install_entity_filter(entity_filter)
+        self.logger.info(f"实体过滤器构建完成: {len(entities)} 个实体, {entity_filter.count} 个条目, "
+                         f"{len(entity_filter.bits)} 字节")
+        
+        if snapshot_path:
+            entity_filter.save(snapshot_path)
+        return entity_filter
+    
+    def _install_entity_filter(self, entity_filter):
+        """启用过滤器，并在本进程创建节点时同步写入"""
+        self.entity_filter = entity_filter
+        if hasattr(self.neo4j_manager, 'add_node_listener'):
+            self.neo4j_manager.add_node_listener(self._on_node_created)
+    
+    def build_ngram_index(self):
+        """
+        构建实体名的n-gram倒排索引，用于进程内的部分名称和模糊查询
+        
+        索引建立后，search_entities直接由索引回答，各读查询对不存在的实体也不再访问数据库。
+        
+        Returns:
+            NGramIndex实例
+        """
+        query = "MATCH (n) RETURN n.name AS name, n.id AS id"
+        index = NGramIndex()
+        entity_ids = set()
+        for name, entity_id in self.neo4j_manager.stream_query(query, as_tuples=True):
+            if name is not None:
+                index.add(name)
+            if entity_id is not None:
+                entity_ids.add(str(entity_id))
+        
+        self.entity_ids = entity_ids
+        self.ngram_index = index
+        if hasattr(self.neo4j_manager, 'add_node_listener'):
+            self.neo4j_manager.add_node_listener(self._on_node_created)
+        self.logger.info(f"实体名n-gram索引构建完成: {index.get_stats()}")
+        return index
+    
+    def search_entities(self, query, limit=10, fuzzy=True, min_score=0.3):
+        """
+        按部分名称查找实体
+        
+        Args:
+            query: 部分名称
+            limit: 返回的候选数量
+            fuzzy: 子串匹配不足limit个时是否用模糊匹配补足（需要n-gram索引）
+            min_score: 模糊匹配的最低Dice系数
+        
+        Returns:
+            [{'entity': 名称, 'score': 分数}, ...]，子串匹配的分数为查询串在名称中所占的比例
+        """
+        if self.ngram_index is not None:
+            return [
+                {'entity': name, 'score': score}
+                for name, score in self.ngram_index.lookup(query, limit, fuzzy=fuzzy, min_score=min_score)
+            ]
+        
+        rows = self.neo4j_manager.execute_query(
+            "MATCH (e) WHERE e.name CONTAINS $query RETURN DISTINCT e.name AS name "
+            "ORDER BY size(e.name) LIMIT $limit",
+            {"query": query, "limit": limit}
+        ) or []
+        return [{'entity': row['name'], 'score': len(query) / max(len(row['name']), 1)} for row in rows]
+    
+    def _node_key(self, properties):
+        """节点的 (名称, id, 别名)，与实体过滤器指纹覆盖的内容一致"""
+        aliases = self._aliases(properties.get('aliases', properties.get('alias')))
+        return properties.get('name'), properties.get('id'), tuple(str(alias) for alias in aliases)
+    
+    def _on_node_created(self, label, properties):
+        """节点创建回调：把本进程写入的新实体写入进程内索引，并记下该实体以便跳过轮询器的重放"""
+        with self._local_nodes_lock:
+            # 没有轮询器消费时不无限增长；清空后重放的实体会重复计入指纹，下次启动时快照不匹配而重建
+            if len(self._local_nodes) >= self.MAX_LOCAL_NODES:
+                self._local_nodes.clear()
+            self._local_nodes[self._node_key(properties)] += 1
+        self._index_node(properties)
+    
+    def _index_node(self, properties):
+        """把一个实体写入进程内索引"""
+        name, entity_id, aliases = self._node_key(properties)
+        if self.entity_filter is not None:
+            self.entity_filter.add_entity(name, entity_id, list(aliases))
+        if self.ngram_index is not None:
+            if name is not None:
+                self.ngram_index.add(name)
+            if entity_id is not None:
+                self.entity_ids.add(str(entity_id))
+    
+    def apply_graph_changes(self, changes):
+        """
+        应用图数据变更（ChangePoller的订阅回调），使其他进程写入的实体也进入进程内索引
+        
+        轮询器也会取回本进程写入的节点，这些节点已由节点创建回调写入索引，这里跳过，
+        实体过滤器的指纹因此与数据库中的实体一一对应。
+        
+        Args:
+            changes: {'nodes': [...], 'relationships': [...]}
+        """
+        for node in changes.get('nodes', []):
+            properties = node.get('properties') or {}
+            key = self._node_key(properties)
+            with self._local_nodes_lock:
+                replayed = self._local_nodes[key] > 0
+                if replayed:
+                    self._local_nodes[key] -= 1
+                    if not self._local_nodes[key]:
+                        del self._local_nodes[key]
+            if not replayed:
+                self._index_node(properties)
+        if self.temporal_index is not None:
+            self.temporal_index.apply_graph_changes(changes)
+    
+    def save_entity_filter(self, snapshot_path):
+        """保存实体过滤器快照，指纹对应过滤器已写入的实体，加载时与数据库内容不一致即重建"""
+        if self.entity_filter is None:
+            return False
+        return self.entity_filter.save(snapshot_path)
     
     def get_all_entities(self, label=None, limit=100):
         """获取所有实体"""
@@ -140,74 +605,238 @@ class GraphManager:
         else:
             query = "MATCH (e) RETURN labels(e)[0] AS type, properties(e) AS entity LIMIT $limit"
         
-        return self.neo4j_manager.execute_query(
-            query, 
-            {"limit": limit}
+        return self._cached_query(
+            'get_all_entities', (label, limit),
+            query, {"limit": limit}
         )
     
     def get_all_relationships(self, limit=100):
         """获取所有关系类型"""
         query = "MATCH ()-[r]->() RETURN DISTINCT type(r) AS relationship_type LIMIT $limit"
-        return self.neo4j_manager.execute_query(
-            query, 
-            {"limit": limit}
+        return self._cached_query(
+            'get_all_relationships', (limit,),
+            query, {"limit": limit}
         )
     
-    def export_graph_to_json(self, output_path):
-        """导出知识图谱为JSON格式"""
-        try:
-            # 获取所有节点
-            nodes_query = "MATCH (n) RETURN labels(n)[0] AS label, properties(n) AS properties"
-            nodes = self.neo4j_manager.execute_query(nodes_query)
-            
-            # 获取所有关系
-            relationships_query = """
+    def warm_up_cache(self, entities):
+        """
+        预热查询缓存：为热点实体预先加载实体信息和关系
+        
+        Args:
+            entities: 热点实体名称列表
+        
+        Returns:
+            成功预热的实体数量
+        """
+        if self.query_cache is None:
+            return 0
+        
+        warmed = 0
+        for entity in entities:
+            if self.get_entity_info(entity) is not None and \
+               self.query_entities_relationships(entity) is not None:
+                warmed += 1
+        self.logger.info(f"查询缓存预热完成: {warmed}/{len(entities)} 个实体")
+        return warmed
+    
+    def get_entity_filter_stats(self):
+        """获取实体过滤器的规模和假阳性率统计"""
+        if self.entity_filter is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.entity_filter.get_stats()}
+    
+    def get_cache_stats(self):
+        """获取查询缓存的命中、未命中和淘汰统计"""
+        if self.query_cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.query_cache.get_stats()}
+    
+    def _iter_export_pages(self, kind, cursor=None, page_size=1000):
+        """
+        按elementId顺序流式读取节点或关系，每page_size条产出 (记录列表, 本页最后的游标)
+        
+        每个阶段只执行一次查询，记录按page_size分批从服务器拉取；游标只在断点续传时
+        用于跳过已导出的部分，不会像LIMIT分页那样每页都重新扫描和排序整个图。
+        """
+        if kind == 'nodes':
+            query = """
+            MATCH (n)
+            WHERE $cursor IS NULL OR elementId(n) > $cursor
+            RETURN elementId(n) AS element_id, labels(n)[0] AS label, properties(n) AS properties
+            ORDER BY element_id
+            """
+        else:
+            # 只取起止节点的标识属性，不再返回完整的属性字典
+            query = """
             MATCH (a)-[r]->(b)
-            RETURN labels(a)[0] AS start_label, properties(a) AS start_props,
+            WHERE $cursor IS NULL OR elementId(r) > $cursor
+            RETURN elementId(r) AS element_id,
+                   labels(a)[0] AS start_label,
+                   CASE WHEN a.name IS NOT NULL THEN 'name' ELSE 'id' END AS start_property,
+                   coalesce(a.name, a.id, '') AS start_value,
                    type(r) AS type, properties(r) AS rel_props,
-                   labels(b)[0] AS end_label, properties(b) AS end_props
+                   labels(b)[0] AS end_label,
+                   CASE WHEN b.name IS NOT NULL THEN 'name' ELSE 'id' END AS end_property,
+                   coalesce(b.name, b.id, '') AS end_value
+            ORDER BY element_id
             """
-            relationships = self.neo4j_manager.execute_query(relationships_query)
-            
-            # 构建导出数据结构
-            export_data = {
-                "nodes": [],
-                "relationships": []
-            }
+        
+        rows = self.neo4j_manager.stream_query(query, {"cursor": cursor}, fetch_size=page_size, 
+                                               raise_on_error=True)
+        records = []
+        for row in rows:
+            if kind == 'nodes':
+                record = row['properties']
+                record['label'] = row['label']
+            else:
+                record = {
+                    "start_label": row['start_label'],
+                    "start_property": row['start_property'],
+                    "start_value": row['start_value'],
+                    "type": row['type'],
+                    "end_label": row['end_label'],
+                    "end_property": row['end_property'],
+                    "end_value": row['end_value'],
+                    "properties": row['rel_props']
+                }
+            records.append(record)
+            cursor = row['element_id']
             
-            # 处理节点
-            for node in nodes:
-                node_data = node['properties']
-                node_data['label'] = node['label']
-                export_data['nodes'].append(node_data)
+            if len(records) >= page_size:
+                yield records, cursor
+                records = []
+        
+        if records:
+            yield records, cursor
+    
+    @staticmethod
+    def _json_default(value):
+        """序列化Neo4j的时间类型等JSON不支持的属性值"""
+        if hasattr(value, 'iso_format'):
+            return value.iso_format()
+        return str(value)
+    
+    def _dumps_compact(self, record):
+        """紧凑格式序列化单条记录"""
+        return json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=self._json_default)
+    
+    def export_graph_to_json(self, output_path, page_size=1000, compress=None, progress_callback=None):
+        """
+        导出知识图谱为JSON格式（与build_graph_from_json兼容）
+        
+        按页读取并逐条写出，内存占用只与page_size有关。
+        
+        Args:
+            output_path: 输出文件路径
+            page_size: 每页读取的节点/关系数量
+            compress: 是否gzip压缩，默认根据文件名是否以.gz结尾判断
+            progress_callback: 进度回调，参数为 (阶段, 已导出数量)
+        
+        Returns:
+            是否导出成功
+        """
+        if compress is None:
+            compress = output_path.endswith('.gz')
+        
+        try:
+            opener = gzip.open if compress else open
+            with opener(output_path, 'wt', encoding='utf-8') as f:
+                f.write('{"nodes":[')
+                for phase in ('nodes', 'relationships'):
+                    if phase == 'relationships':
+                        f.write('],"relationships":[')
+                    
+                    count = 0
+                    for records, _ in self._iter_export_pages(phase, page_size=page_size):
+                        for record in records:
+                            if count:
+                                f.write(',')
+                            f.write('\n')
+                            f.write(self._dumps_compact(record))
+                            count += 1
+                        self.logger.info(f"已导出{phase}: {count}")
+                        if progress_callback:
+                            progress_callback(phase, count)
+                f.write('\n]}\n')
             
-            # 处理关系
-            for rel in relationships:
-                # 使用name属性作为标识，如果没有则使用id
-                start_id_prop = 'name' if 'name' in rel['start_props'] else 'id'
-                end_id_prop = 'name' if 'name' in rel['end_props'] else 'id'
+            return True
+        except Exception as e:
+            self.logger.error(f"导出图谱失败: {str(e)}")
+            return False
+    
+    def export_graph_to_jsonl(self, output_path, page_size=1000, compress=None, resume=False, 
+                              progress_callback=None):
+        """
+        流式导出知识图谱为JSONL格式，支持gzip压缩和断点续传
+        
+        每行一条记录：{"node": {...}} 或 {"relationship": {...}}，字段与JSON导出格式一致。
+        每写完一页都会在 output_path + '.checkpoint' 中记录游标和文件偏移，
+        resume=True 时从上次成功写完的页继续导出。压缩模式下每页是一个独立的
+        gzip成员，多个成员直接拼接仍是合法的gzip文件。
+        
+        Args:
+            output_path: 输出文件路径
+            page_size: 每页读取的节点/关系数量
+            compress: 是否gzip压缩，默认根据文件名是否以.gz结尾判断
+            resume: 是否从检查点继续
+            progress_callback: 进度回调，参数为 (阶段, 已导出数量)
+        
+        Returns:
+            是否导出成功
+        """
+        if compress is None:
+            compress = output_path.endswith('.gz')
+        checkpoint_path = output_path + '.checkpoint'
+        
+        state = {"phase": "nodes", "cursor": None, "nodes": 0, "relationships": 0, "offset": 0}
+        if resume and os.path.exists(checkpoint_path) and os.path.exists(output_path):
+            with open(checkpoint_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.logger.info(f"从检查点继续导出: {state}")
+        
+        try:
+            with open(output_path, 'ab' if state['offset'] else 'wb') as f:
+                # 丢弃上次中断时写了一半的页
+                f.truncate(state['offset'])
                 
-                rel_data = {
-                    "start_label": rel['start_label'],
-                    "start_property": start_id_prop,
-                    "start_value": rel['start_props'].get(start_id_prop, ''),
-                    "type": rel['type'],
-                    "end_label": rel['end_label'],
-                    "end_property": end_id_prop,
-                    "end_value": rel['end_props'].get(end_id_prop, ''),
-                    "properties": rel['rel_props']
-                }
-                export_data['relationships'].append(rel_data)
-            
-            # 保存到JSON文件
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, ensure_ascii=False, indent=2)
+                phases = ('nodes', 'relationships')
+                for phase in phases[phases.index(state['phase']):]:
+                    if phase != state['phase']:
+                        state['phase'], state['cursor'] = phase, None
+                    key = 'node' if phase == 'nodes' else 'relationship'
+                    
+                    for records, cursor in self._iter_export_pages(phase, state['cursor'], page_size):
+                        data = ''.join(self._dumps_compact({key: record}) + '\n' for record in records)
+                        data = data.encode('utf-8')
+                        if compress:
+                            data = gzip.compress(data)
+                        f.write(data)
+                        f.flush()
+                        
+                        state['cursor'] = cursor
+                        state[phase] += len(records)
+                        state['offset'] = f.tell()
+                        self._write_checkpoint(checkpoint_path, state)
+                        
+                        self.logger.info(f"已导出{phase}: {state[phase]}")
+                        if progress_callback:
+                            progress_callback(phase, state[phase])
             
+            if os.path.exists(checkpoint_path):
+                os.remove(checkpoint_path)
+            self.logger.info(f"导出完成: {state['nodes']} 个节点, {state['relationships']} 条关系")
             return True
         except Exception as e:
             self.logger.error(f"导出图谱失败: {str(e)}")
             return False
     
+    def _write_checkpoint(self, checkpoint_path, state):
+        """原子地写入导出检查点"""
+        tmp_path = checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, checkpoint_path)
+    
     def close(self):
         """关闭连接"""
         if self.neo4j_manager:
@@ -1,19 +1,100 @@
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, READ_ACCESS
+from .query_profiler import QueryProfiler
+from .write_buffer import WriteBuffer
 import logging
+import threading
+import time
+
+def build_create_node_query(label, properties):
+    """构建创建节点的Cypher语句，返回 (query, parameters)"""
+    # created_at由数据库写入，作为变更轮询的水位线
+    properties = {k: v for k, v in properties.items() if k != 'created_at'}
+    props_str = ", ".join([f"{k}: ${k}" for k in properties.keys()] + ["created_at: datetime()"])
+    query = f"CREATE (n:{label} {{ {props_str} }}) RETURN n"
+    return query, properties
+
+def build_create_relationship_query(start_node_label, start_node_prop, 
+                                    relationship_type, end_node_label, end_node_prop, 
+                                    rel_properties=None):
+    """构建创建关系的Cypher语句，返回 (query, parameters)"""
+    # 查找开始节点
+    start_query = f"MATCH (a:{start_node_label}) WHERE a.{list(start_node_prop.keys())[0]} = ${list(start_node_prop.keys())[0]} RETURN a LIMIT 1"
+    # 查找结束节点
+    end_query = f"MATCH (b:{end_node_label}) WHERE b.{list(end_node_prop.keys())[0]} = ${list(end_node_prop.keys())[0]} RETURN b LIMIT 1"
+    
+    # 组合查询参数
+    params = {**start_node_prop, **end_node_prop}
+    
+    # 添加关系属性
+    rel_props_str = ""
+    rel_properties = {k: v for k, v in (rel_properties or {}).items() if k != 'created_at'}
+    if rel_properties:
+        rel_props_str = ", " + ", ".join([f"{k}: ${k}_rel" for k in rel_properties.keys()])
+        # 添加关系属性到参数
+        for k, v in rel_properties.items():
+            params[f"{k}_rel"] = v
+    
+    # 创建关系
+    query = f"""
+    {start_query}
+    {end_query}
+    CREATE (a)-[r:{relationship_type} {{created_at: datetime() {rel_props_str}}}]->(b)
+    RETURN a, r, b
+    """
+    return query, params
 
 class Neo4jManager:
-    def __init__(self, uri="neo4j://localhost:7687", user="neo4j", password="password"):
-        """初始化Neo4j连接管理器"""
+    def __init__(self, uri="neo4j://localhost:7687", user="neo4j", password="password",
+                 database=None, max_connection_pool_size=100, connection_acquisition_timeout=60.0,
+                 connection_timeout=30.0, max_transaction_retry_time=30.0, fetch_size=1000,
+                 profiler=None):
+        """
+        初始化Neo4j连接管理器
+        
+        Args:
+            uri: Neo4j数据库URI
+            user: 用户名
+            password: 密码
+            database: 数据库名称，None表示使用服务器默认数据库
+            max_connection_pool_size: 连接池最大连接数
+            connection_acquisition_timeout: 从连接池获取连接的超时时间（秒）
+            connection_timeout: 建立TCP连接的超时时间（秒）
+            max_transaction_retry_time: 托管事务遇到瞬时错误时的最长重试时间（秒）
+            fetch_size: 每批从服务器拉取的默认记录数
+            profiler: 查询性能分析器，默认创建一个不做PROFILE采样的QueryProfiler
+        """
         self.uri = uri
         self.user = user
         self.password = password
+        self.database = database
+        self.max_connection_pool_size = max_connection_pool_size
+        self.connection_acquisition_timeout = connection_acquisition_timeout
+        self.connection_timeout = connection_timeout
+        self.max_transaction_retry_time = max_transaction_retry_time
+        self.fetch_size = fetch_size
         self.driver = None
+        # 图版本号：每次成功写入后递增，用于使查询缓存失效
+        self.generation = 0
+        # 写线程、写缓冲线程和变更轮询线程都会递增版本号
+        self._generation_lock = threading.Lock()
+        self.profiler = profiler or QueryProfiler()
+        # 写缓冲，调用enable_write_buffer后启用
+        self.write_buffer = None
+        # 节点创建后的回调，参数为 (label, properties)
+        self.node_listeners = []
         self._connect()
     
     def _connect(self):
         """建立与Neo4j数据库的连接"""
         try:
-            self.driver = GraphDatabase.driver(self.uri, auth=(self.user, self.password))
+            self.driver = GraphDatabase.driver(
+                self.uri, 
+                auth=(self.user, self.password),
+                max_connection_pool_size=self.max_connection_pool_size,
+                connection_acquisition_timeout=self.connection_acquisition_timeout,
+                connection_timeout=self.connection_timeout,
+                max_transaction_retry_time=self.max_transaction_retry_time
+            )
             # 测试连接
             self.test_connection()
             logging.info("成功连接到Neo4j数据库")
@@ -21,84 +102,232 @@ class Neo4jManager:
             logging.error(f"连接Neo4j数据库失败: {str(e)}")
             self.driver = None
     
+    def _session(self, **config):
+        """创建会话；会话本身很轻量，底层连接由驱动的连接池复用"""
+        config.setdefault('database', self.database)
+        config.setdefault('fetch_size', self.fetch_size)
+        return self.driver.session(**config)
+    
+    @staticmethod
+    def _run_and_collect(tx, query, parameters):
+        """在托管事务中执行查询并取回全部记录"""
+        return tx.run(query, parameters).data()
+    
+    @staticmethod
+    def _run_profiled(tx, query, parameters):
+        """以PROFILE方式执行查询，返回 (记录列表, 执行计划)"""
+        result = tx.run("PROFILE " + query, parameters)
+        records = result.data()
+        return records, result.consume().profile
+    
+    def _execute(self, query, parameters, write=False):
+        """在托管事务中执行查询，并把耗时、行数和抽样的执行计划交给性能分析器"""
+        parameters = parameters or {}
+        profile = self.profiler.should_profile()
+        work = self._run_profiled if profile else self._run_and_collect
+        
+        start = time.perf_counter()
+        try:
+            with self._session() as session:
+                if write:
+                    result = session.execute_write(work, query, parameters)
+                else:
+                    result = session.execute_read(work, query, parameters)
+        except Exception as e:
+            self.profiler.record(query, parameters, (time.perf_counter() - start) * 1000, 0, error=str(e))
+            raise
+        
+        records, plan = result if profile else (result, None)
+        self.profiler.record(query, parameters, (time.perf_counter() - start) * 1000, len(records), plan)
+        return records
+    
     def test_connection(self):
         """测试数据库连接"""
         if self.driver:
-            with self.driver.session() as session:
+            with self._session() as session:
                 result = session.run("RETURN 1 AS count")
                 return result.single()[0] == 1
         return False
     
     def execute_query(self, query, parameters=None):
-        """执行Cypher查询"""
+        """执行Cypher读查询（托管读事务，集群环境下路由到读副本）"""
         if not self.driver:
             logging.error("数据库连接未初始化")
             return None
         
         try:
-            with self.driver.session() as session:
-                result = session.run(query, parameters or {})
-                return [record.data() for record in result]
+            return self._execute(query, parameters)
         except Exception as e:
             logging.error(f"执行查询失败: {str(e)}")
             return None
     
-    def execute_write(self, query, parameters=None):
-        """执行写操作的Cypher查询"""
+    def stream_query(self, query, parameters=None, fetch_size=None, as_tuples=False, raise_on_error=False):
+        """
+        以生成器方式流式执行Cypher查询
+        
+        记录按fetch_size分批从服务器拉取，会话在迭代器的整个生命周期内保持打开，
+        迭代结束或生成器被关闭时自动释放。
+        
+        Args:
+            query: Cypher查询语句
+            parameters: 查询参数
+            fetch_size: 每批从服务器拉取的记录数，默认使用连接管理器的fetch_size
+            as_tuples: 为True时产出按RETURN顺序排列的元组，而不是字典
+            raise_on_error: 失败时是否抛出异常（默认记录日志并结束迭代）
+        
+        Yields:
+            每条记录对应的字典或元组
+        """
+        if not self.driver:
+            logging.error("数据库连接未初始化")
+            if raise_on_error:
+                raise RuntimeError("数据库连接未初始化")
+            return
+        
+        start = time.perf_counter()
+        rows = 0
+        error = None
+        try:
+            with self._session(fetch_size=fetch_size or self.fetch_size, 
+                               default_access_mode=READ_ACCESS) as session:
+                result = session.run(query, parameters or {})
+                if as_tuples:
+                    for record in result:
+                        rows += 1
+                        yield tuple(record.values())
+                else:
+                    for record in result:
+                        rows += 1
+                        yield record.data()
+        except Exception as e:
+            error = str(e)
+            if raise_on_error:
+                raise
+            logging.error(f"流式查询失败: {error}")
+        finally:
+            # 耗时包含调用方消费记录的时间
+            self.profiler.record(query, parameters, (time.perf_counter() - start) * 1000, rows, error=error)
+    
+    def execute_write(self, query, parameters=None, buffered=False):
+        """
+        执行写操作的Cypher查询
+        
+        buffered=True且已启用写缓冲时，写操作进入缓冲队列批量提交，返回是否成功入队
+        """
+        if buffered and self.write_buffer:
+            return self.write_buffer.submit(query, parameters)
+        
         if not self.driver:
             logging.error("数据库连接未初始化")
             return None
         
         try:
-            with self.driver.session() as session:
-                result = session.write_transaction(lambda tx: tx.run(query, parameters or {}).data())
-                return result
+            result = self._execute(query, parameters, write=True)
+            self.bump_generation()
+            return result
         except Exception as e:
             logging.error(f"执行写操作失败: {str(e)}")
             return None
     
+    @staticmethod
+    def _run_batch(tx, operations):
+        """在同一个事务中依次执行多个写操作"""
+        for query, parameters in operations:
+            tx.run(query, parameters).consume()
+        return len(operations)
+    
+    def execute_write_batch(self, operations, raise_on_error=False):
+        """
+        在同一个事务中执行一批写操作
+        
+        Args:
+            operations: (query, parameters) 元组列表
+            raise_on_error: 失败时是否抛出异常（默认记录日志并返回None）
+        
+        Returns:
+            提交的写操作数量
+        """
+        if not self.driver:
+            logging.error("数据库连接未初始化")
+            if raise_on_error:
+                raise RuntimeError("数据库连接未初始化")
+            return None
+        
+        try:
+            with self._session() as session:
+                count = session.execute_write(self._run_batch, operations)
+            self.bump_generation()
+            return count
+        except Exception as e:
+            if raise_on_error:
+                raise
+            logging.error(f"执行批量写操作失败: {str(e)}")
+            return None
+    
+    def enable_write_buffer(self, **config):
+        """
+        启用写缓冲，之后以buffered=True调用的写操作会批量提交
+        
+        Args:
+            **config: 透传给WriteBuffer的配置（max_batch_size、flush_interval、max_queue_size等）
+        
+        Returns:
+            WriteBuffer实例
+        """
+        if self.write_buffer is None:
+            self.write_buffer = WriteBuffer(self, **config)
+        return self.write_buffer
+    
+    def flush_writes(self):
+        """同步提交写缓冲中的全部写操作，返回批次结果列表"""
+        if self.write_buffer is None:
+            return []
+        return self.write_buffer.flush()
+    
+    def get_query_stats(self, top_n=20, sort_by='total_ms'):
+        """获取各查询模板的延迟、行数和PROFILE统计"""
+        return self.profiler.get_stats(top_n=top_n, sort_by=sort_by)
+    
+    def bump_generation(self):
+        """递增图版本号，使基于旧版本的缓存结果失效（线程安全）"""
+        with self._generation_lock:
+            self.generation += 1
+            return self.generation
+    
     def close(self):
         """关闭数据库连接"""
+        if self.write_buffer:
+            self.write_buffer.close()
+            self.write_buffer = None
         if self.driver:
             self.driver.close()
             logging.info("已关闭Neo4j数据库连接")
     
-    def create_node(self, label, properties):
+    def create_node(self, label, properties, buffered=False):
         """创建节点"""
-        # 构建属性字符串
-        props_str = ", ".join([f"{k}: ${k}" for k in properties.keys()])
-        query = f"CREATE (n:{label} {{ {props_str} }}) RETURN n"
-        return self.execute_write(query, properties)
+        query, params = build_create_node_query(label, properties)
+        result = self.execute_write(query, params, buffered=buffered)
+        if result is not None and result is not False:
+            for listener in self.node_listeners:
+                listener(label, properties)
+        return result
+    
+    def add_node_listener(self, listener):
+        """注册节点创建回调，用于同步更新进程内的实体索引"""
+        if listener not in self.node_listeners:
+            self.node_listeners.append(listener)
+        return listener
     
     def create_relationship(self, start_node_label, start_node_prop, 
                           relationship_type, end_node_label, end_node_prop, 
-                          rel_properties=None):
+                          rel_properties=None, buffered=False):
         """创建关系"""
-        # 查找开始节点
-        start_query = f"MATCH (a:{start_node_label}) WHERE a.{list(start_node_prop.keys())[0]} = ${list(start_node_prop.keys())[0]} RETURN a LIMIT 1"
-        # 查找结束节点
-        end_query = f"MATCH (b:{end_node_label}) WHERE b.{list(end_node_prop.keys())[0]} = ${list(end_node_prop.keys())[0]} RETURN b LIMIT 1"
-        
-        # 组合查询参数
-        params = {**start_node_prop, **end_node_prop}
-        
-        # 添加关系属性
-        rel_props_str = ""
-        if rel_properties:
-            rel_props_str = ", " + ", ".join([f"{k}: ${k}_rel" for k in rel_properties.keys()])
-            # 添加关系属性到参数
-            for k, v in rel_properties.items():
-                params[f"{k}_rel"] = v
-        
-        # 创建关系
-        query = f"""
-        {start_query}
-        {end_query}
-        CREATE (a)-[r:{relationship_type} {{created_at: datetime() {rel_props_str}}}]->(b)
-        RETURN a, r, b
-        """
-        
-        return self.execute_write(query, params)
+        query, params = build_create_relationship_query(
+            start_node_label, start_node_prop, 
+            relationship_type, end_node_label, end_node_prop, 
+            rel_properties
+        )
+        return self.execute_write(query, params, buffered=buffered)
     
     def get_node_by_property(self, label, property_name, property_value):
         """根据属性查找节点"""
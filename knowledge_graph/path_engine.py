@@ -0,0 +1,354 @@
+from text_index import NGramIndex
+import heapq
+import logging
+import threading
+import time
+
+class PathGraph:
+    """
+    路径引擎的邻接表快照
+    
+    节点和关系类型编码为整数，adjacency[节点] = [(邻居, 关系类型, 是否为出边), ...]。
+    快照构建完成后不再修改，重建时生成新快照整体替换。
+    """
+    def __init__(self, names=None, name_to_id=None, id_values=None, rel_types=None, rel_type_ids=None,
+                 adjacency=None, name_index=None):
+        self.names = names or []
+        self.name_to_id = name_to_id or {}
+        # 没有name属性、以id属性标识的节点：{节点编号: id属性值}
+        self.id_values = id_values or {}
+        self.rel_types = rel_types or []
+        self.rel_type_ids = rel_type_ids or {}
+        self.adjacency = adjacency or []
+        # 节点名的n-gram索引，用于部分名称解析；索引编号与节点编号一致
+        self.name_index = name_index or NGramIndex()
+    
+    def node_properties(self, node):
+        """节点的标识属性，与Cypher返回的节点属性字典使用相同的键"""
+        if node in self.id_values:
+            return {'id': self.id_values[node]}
+        return {'name': self.names[node]}
+
+
+class PathEngine:
+    """
+    基于内存邻接表的路径搜索引擎
+    
+    从Neo4j一次性加载全部关系构建无向邻接表（保留关系方向信息），
+    用双向BFS求最短路径，用Yen算法求k条最短无环路径。
+    模糊实体名先解析为候选节点集合，再作为多源/多汇一次搜索，不再对候选端点做笛卡尔积。
+    每次搜索都有节点访问预算，遇到枢纽节点时搜索工作量有上界。
+    
+    邻接表在局部变量中构建，完成后以一次属性赋值替换为新的PathGraph快照；每次查询开始时取一次快照，
+    重建期间的查询使用旧快照。同一时间只有一个线程重建。
+    """
+    QUERY = """
+    MATCH (a)-[r]->(b)
+    RETURN coalesce(a.name, a.id) AS start, a.name IS NULL AS start_by_id, type(r) AS type,
+           coalesce(b.name, b.id) AS end, b.name IS NULL AS end_by_id
+    """
+    
+    def __init__(self, neo4j_manager, max_visits=10000, min_rebuild_interval=60):
+        """
+        初始化路径引擎
+        
+        Args:
+            neo4j_manager: Neo4j连接管理器
+            max_visits: 单次查询最多访问的节点数
+            min_rebuild_interval: 图数据变化后两次重建邻接表的最小间隔（秒）
+        """
+        self.neo4j_manager = neo4j_manager
+        self.max_visits = max_visits
+        self.min_rebuild_interval = min_rebuild_interval
+        self.logger = logging.getLogger(__name__)
+        
+        self.graph = PathGraph()
+        self._build_lock = threading.Lock()
+        
+        self.generation = None
+        self.built_at = 0.0
+    
+    def build(self):
+        """从数据库加载全部关系，构建邻接表"""
+        with self._build_lock:
+            return self._build()
+    
+    def _build(self):
+        generation = getattr(self.neo4j_manager, 'generation', 0)
+        names, name_to_id, id_values, adjacency = [], {}, {}, []
+        rel_types, rel_type_ids = [], {}
+        
+        def intern(value, by_id):
+            name = str(value)
+            node_id = name_to_id.get(name)
+            if node_id is None:
+                node_id = len(names)
+                name_to_id[name] = node_id
+                names.append(name)
+                adjacency.append([])
+                if by_id:
+                    id_values[node_id] = value
+            return node_id
+        
+        edge_count = 0
+        for start, start_by_id, rel_type, end, end_by_id in self.neo4j_manager.stream_query(self.QUERY, 
+                                                                                          as_tuples=True):
+            if start is None or end is None:
+                continue
+            start_id = intern(start, start_by_id)
+            end_id = intern(end, end_by_id)
+            rel_id = rel_type_ids.setdefault(rel_type, len(rel_types))
+            if rel_id == len(rel_types):
+                rel_types.append(rel_type)
+            adjacency[start_id].append((end_id, rel_id, True))
+            adjacency[end_id].append((start_id, rel_id, False))
+            edge_count += 1
+        
+        name_index = NGramIndex()
+        name_index.add_many(names)
+        
+        self.graph = PathGraph(names, name_to_id, id_values, rel_types, rel_type_ids, adjacency, name_index)
+        self.generation = generation
+        self.built_at = time.monotonic()
+        self.logger.info(f"路径引擎邻接表构建完成: {len(names)} 个节点, {edge_count} 条关系")
+        return True
+    
+    def is_stale(self):
+        """图数据发生变化且距上次构建超过最小间隔"""
+        return getattr(self.neo4j_manager, 'generation', 0) != self.generation and \
+            time.monotonic() - self.built_at >= self.min_rebuild_interval
+    
+    def refresh_if_stale(self):
+        """
+        图数据发生变化且距上次构建超过最小间隔时重建邻接表
+        
+        已有其他线程在重建时不等待，直接使用当前快照。
+        
+        Returns:
+            本次调用是否重建了邻接表
+        """
+        if not self.is_stale():
+            return False
+        if not self._build_lock.acquire(blocking=False):
+            return False
+        try:
+            # 等待锁期间其他线程可能已经重建完成
+            if not self.is_stale():
+                return False
+            return self._build()
+        finally:
+            self._build_lock.release()
+    
+    def resolve(self, entity, limit=10, graph=None):
+        """把实体名解析为候选节点，精确匹配优先，否则按子串匹配（名称越短越优先）"""
+        graph = graph or self.graph
+        node_id = graph.name_to_id.get(entity)
+        if node_id is not None:
+            return [node_id]
+        return [graph.name_to_id[name] for name, _ in graph.name_index.search(entity, limit)]
+    
+    def _bidirectional_bfs(self, graph, sources, targets, max_depth, allowed_rels=None,
+                           blocked_nodes=frozenset(), blocked_edges=frozenset(), budget=None):
+        """
+        多源多汇的双向BFS
+        
+        Returns:
+            (节点序列, 边序列, 访问节点数)；未找到路径时节点序列为None。
+            边以 (起点, 关系类型, 终点) 的原始方向表示。
+        """
+        budget = budget if budget is not None else self.max_visits
+        # parents[节点] = (前驱, 关系类型, 是否为出边, 深度)
+        forward = {s: (None, None, None, 0) for s in sources if s not in blocked_nodes}
+        backward = {t: (None, None, None, 0) for t in targets if t not in blocked_nodes}
+        visits = len(forward) + len(backward)
+        if not forward or not backward:
+            return None, None, visits
+        
+        forward_frontier, backward_frontier = list(forward), list(backward)
+        forward_depth = backward_depth = 0
+        
+        while forward_frontier and backward_frontier and forward_depth + backward_depth < max_depth:
+            # 总是扩展较小的一侧，减少枢纽节点带来的扩张
+            expand_forward = len(forward_frontier) <= len(backward_frontier)
+            if expand_forward:
+                frontier, parents, others = forward_frontier, forward, backward
+            else:
+                frontier, parents, others = backward_frontier, backward, forward
+            
+            next_frontier = []
+            best = None
+            for node in frontier:
+                depth = parents[node][3]
+                for neighbor, rel_id, outgoing in graph.adjacency[node]:
+                    if allowed_rels is not None and rel_id not in allowed_rels:
+                        continue
+                    if neighbor in blocked_nodes:
+                        continue
+                    if blocked_edges:
+                        edge = (node, rel_id, neighbor) if outgoing else (neighbor, rel_id, node)
+                        if edge in blocked_edges:
+                            continue
+                    
+                    if neighbor in others:
+                        total = depth + 1 + others[neighbor][3]
+                        if total <= max_depth and (best is None or total < best[0]):
+                            best = (total, node, neighbor, rel_id, outgoing)
+                        continue
+                    if neighbor in parents:
+                        continue
+                    
+                    parents[neighbor] = (node, rel_id, outgoing, depth + 1)
+                    next_frontier.append(neighbor)
+                    visits += 1
+                    if visits > budget:
+                        self.logger.warning(f"路径搜索超出访问预算 {budget}，提前终止")
+                        return None, None, visits
+            
+            if best is not None:
+                _, node, neighbor, rel_id, outgoing = best
+                if expand_forward:
+                    return self._join(forward, backward, node, neighbor, rel_id, outgoing) + (visits,)
+                # 反向扩展时边的方向以后向节点为起点，翻转后再拼接
+                return self._join(forward, backward, neighbor, node, rel_id, not outgoing) + (visits,)
+            
+            if expand_forward:
+                forward_frontier = next_frontier
+                forward_depth += 1
+            else:
+                backward_frontier = next_frontier
+                backward_depth += 1
+        
+        return None, None, visits
+    
+    @staticmethod
+    def _walk(parents, node):
+        """沿前驱指针回溯到搜索起点，返回 (节点列表, 边列表)，均从node开始"""
+        nodes, edges = [node], []
+        prev, rel_id, outgoing, _ = parents[node]
+        while prev is not None:
+            edges.append((prev, rel_id, node) if outgoing else (node, rel_id, prev))
+            node = prev
+            nodes.append(node)
+            prev, rel_id, outgoing, _ = parents[node]
+        return nodes, edges
+    
+    def _join(self, forward, backward, left, right, rel_id, outgoing):
+        """拼接前向树中的left与后向树中的right，二者由一条边相连"""
+        left_nodes, left_edges = self._walk(forward, left)
+        right_nodes, right_edges = self._walk(backward, right)
+        middle = (left, rel_id, right) if outgoing else (right, rel_id, left)
+        nodes = left_nodes[::-1] + right_nodes
+        edges = left_edges[::-1] + [middle] + right_edges
+        return nodes, edges
+    
+    def k_shortest_paths(self, sources, targets, k=1, max_depth=3, allowed_rels=None, max_visits=None,
+                         graph=None):
+        """
+        Yen算法求k条最短无环路径
+        
+        graph为搜索使用的快照，默认为当前快照；sources和targets须是该快照中的节点编号。
+        
+        Returns:
+            [(节点序列, 边序列), ...]，按长度升序
+        """
+        graph = graph or self.graph
+        budget = max_visits if max_visits is not None else self.max_visits
+        targets = set(targets) - set(sources) or set(targets)
+        
+        nodes, edges, used = self._bidirectional_bfs(graph, sources, targets, max_depth, allowed_rels, 
+                                                     budget=budget)
+        if nodes is None:
+            return []
+        
+        found = [(nodes, edges)]
+        seen = {tuple(edges)}
+        candidates = []
+        counter = 0
+        
+        while len(found) < k and used < budget:
+            prev_nodes, prev_edges = found[-1]
+            for i in range(len(prev_nodes) - 1):
+                spur = prev_nodes[i]
+                root_nodes, root_edges = prev_nodes[:i + 1], prev_edges[:i]
+                
+                # 屏蔽与已有路径共享同一根路径的下一条边，以及根路径上的节点
+                blocked_edges = {p_edges[i] for p_nodes, p_edges in found
+                                 if p_nodes[:i + 1] == root_nodes and len(p_edges) > i}
+                blocked_nodes = set(root_nodes[:-1])
+                
+                spur_nodes, spur_edges, spur_used = self._bidirectional_bfs(
+                    graph, [spur], targets, max_depth - i, allowed_rels,
+                    blocked_nodes=blocked_nodes, blocked_edges=blocked_edges,
+                    budget=budget - used
+                )
+                used += spur_used
+                if spur_nodes is None:
+                    continue
+                
+                total_edges = root_edges + spur_edges
+                key = tuple(total_edges)
+                if key not in seen:
+                    seen.add(key)
+                    counter += 1
+                    heapq.heappush(candidates, (len(total_edges), counter, root_nodes[:-1] + spur_nodes, total_edges))
+            
+            if not candidates:
+                break
+            _, _, nodes, edges = heapq.heappop(candidates)
+            found.append((nodes, edges))
+        
+        return found
+    
+    def find_paths(self, entity1, entity2, k=1, max_depth=3, relationship_types=None, max_visits=None,
+                   as_records=False):
+        """
+        查询两个实体之间的最短路径
+        
+        Args:
+            entity1: 起点实体名（支持部分名称）
+            entity2: 终点实体名（支持部分名称）
+            k: 返回的路径条数
+            max_depth: 最大路径长度
+            relationship_types: 允许经过的关系类型列表，None表示不限
+            max_visits: 节点访问预算，默认使用引擎配置
+            as_records: 为True时返回与Cypher shortestPath查询相同结构的记录
+        
+        Returns:
+            路径列表，每条路径为 {'nodes': [...], 'relationships': [{'start', 'type', 'end'}], 'length': n}；
+            as_records=True时为 [{'path': [节点属性, 关系类型, 节点属性, ...]}, ...]，
+            节点属性只包含name（没有name时为id）
+        """
+        # 整个查询使用同一个快照，不受并发重建影响
+        graph = self.graph
+        sources = self.resolve(entity1, graph=graph)
+        targets = self.resolve(entity2, graph=graph)
+        if not sources or not targets:
+            return []
+        
+        allowed_rels = None
+        if relationship_types:
+            allowed_rels = {graph.rel_type_ids[t] for t in relationship_types if t in graph.rel_type_ids}
+        
+        paths = self.k_shortest_paths(sources, targets, k, max_depth, allowed_rels, max_visits, graph)
+        if as_records:
+            return [{'path': self._path_record(graph, nodes, edges)} for nodes, edges in paths]
+        return [
+            {
+                'nodes': [graph.names[n] for n in nodes],
+                'relationships': [
+                    {'start': graph.names[s], 'type': graph.rel_types[r], 'end': graph.names[e]}
+                    for s, r, e in edges
+                ],
+                'length': len(edges)
+            }
+            for nodes, edges in paths
+        ]
+    
+    @staticmethod
+    def _path_record(graph, nodes, edges):
+        """与Neo4j驱动Record.data()对Path的转换结果一致：节点属性与关系类型交替排列"""
+        record = [graph.node_properties(nodes[0])]
+        for node, (_, rel_id, _) in zip(nodes[1:], edges):
+            record.append(graph.rel_types[rel_id])
+            record.append(graph.node_properties(node))
+        return record
@@ -0,0 +1,128 @@
+from collections import OrderedDict
+import threading
+import time
+
+class QueryCache:
+    """
+    有界的LRU+TTL查询结果缓存
+    
+    每个缓存项记录写入时的图版本号（generation），图数据发生写操作后版本号递增，
+    旧版本的缓存项在下次读取时即视为失效。
+    """
+    def __init__(self, max_entries=1024, ttl=300, generation_source=None):
+        """
+        初始化查询缓存
+        
+        Args:
+            max_entries: 最多缓存的条目数，超出后淘汰最久未使用的条目
+            ttl: 条目存活时间（秒），None表示不过期
+            generation_source: 返回当前图版本号的可调用对象
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation_source = generation_source or (lambda: 0)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+    
+    @staticmethod
+    def _normalize(value):
+        """
+        把参数转换为可哈希的缓存键
+        
+        字符串按原样保留：键必须与发送给Neo4j的参数完全一致，例如CONTAINS对" 苹果"和"苹果"返回不同的行。
+        """
+        if isinstance(value, (list, tuple)):
+            return tuple(QueryCache._normalize(v) for v in value)
+        if isinstance(value, dict):
+            return tuple(sorted((k, QueryCache._normalize(v)) for k, v in value.items()))
+        return value
+    
+    @staticmethod
+    def make_key(method, params):
+        """由方法名和参数构造缓存键"""
+        return (method, QueryCache._normalize(params))
+    
+    def current_generation(self):
+        """当前图版本号"""
+        return self.generation_source()
+    
+    def get(self, key):
+        """
+        读取缓存
+        
+        Returns:
+            (是否命中, 缓存值)
+        """
+        now = time.monotonic()
+        generation = self.generation_source()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            
+            value, entry_generation, expires_at = entry
+            if entry_generation != generation:
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return False, None
+            if expires_at is not None and expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+    
+    def put(self, key, value, generation=None):
+        """
+        写入缓存
+        
+        Args:
+            key: 缓存键
+            value: 缓存值
+            generation: 加载该值之前读取的图版本号；加载期间若发生写操作，该条目会在下次读取时失效
+        """
+        if generation is None:
+            generation = self.generation_source()
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, generation, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get_stats(self):
+        """获取缓存统计信息"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'generation': self.generation_source(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations
+        }
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import logging
+import random
+import threading
+
+class QueryProfiler:
+    """
+    Cypher查询性能分析器
+    
+    按查询模板（规范化空白后的查询文本，参数不计入）统计调用次数、延迟直方图和返回行数；
+    按采样率对查询加PROFILE前缀执行，记录db hits和执行计划；
+    超过阈值的查询以JSON格式写入慢查询日志，只记录参数的类型和规模，不记录参数值。
+    """
+    # 延迟直方图的桶上界（毫秒），最后一个桶收纳所有更慢的查询
+    LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+    
+    def __init__(self, slow_threshold_ms=500, profile_sample_rate=0.0, slow_log_path=None, max_templates=1000):
+        """
+        初始化性能分析器
+        
+        Args:
+            slow_threshold_ms: 慢查询阈值（毫秒）
+            profile_sample_rate: 以PROFILE方式执行的查询比例，0表示不采样
+            slow_log_path: 慢查询日志文件路径，None时只输出到日志系统
+            max_templates: 最多跟踪的查询模板数量
+        """
+        self.slow_threshold_ms = slow_threshold_ms
+        self.profile_sample_rate = profile_sample_rate
+        self.max_templates = max_templates
+        self.templates = {}
+        self._lock = threading.Lock()
+        
+        self.slow_logger = logging.getLogger(__name__ + '.slow_query')
+        if slow_log_path:
+            handler = logging.FileHandler(slow_log_path, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self.slow_logger.addHandler(handler)
+    
+    @staticmethod
+    def normalize_query(query):
+        """规范化查询文本，作为模板标识"""
+        return ' '.join(query.split())
+    
+    @staticmethod
+    def template_id(template):
+        """查询模板的短哈希"""
+        return hashlib.sha1(template.encode('utf-8')).hexdigest()[:12]
+    
+    @staticmethod
+    def param_shapes(parameters):
+        """描述参数的类型和规模，不包含参数值"""
+        shapes = {}
+        for name, value in (parameters or {}).items():
+            if isinstance(value, (list, tuple)):
+                shapes[name] = f"list[{len(value)}]"
+            elif isinstance(value, dict):
+                shapes[name] = f"map[{len(value)}]"
+            elif isinstance(value, str):
+                shapes[name] = f"str[{len(value)}]"
+            else:
+                shapes[name] = type(value).__name__
+        return shapes
+    
+    @staticmethod
+    def summarize_plan(profile):
+        """汇总PROFILE执行计划，返回 (db hits总数, 精简后的计划树)"""
+        if not profile:
+            return 0, None
+        
+        def walk(operator):
+            children = [walk(child) for child in operator.get('children', [])]
+            db_hits = operator.get('dbHits', 0) + sum(child['db_hits_total'] for child in children)
+            return {
+                'operator': operator.get('operatorType'),
+                'db_hits': operator.get('dbHits', 0),
+                'rows': operator.get('rows', 0),
+                'db_hits_total': db_hits,
+                'children': children
+            }
+        
+        plan = walk(profile)
+        return plan['db_hits_total'], plan
+    
+    def should_profile(self):
+        """按采样率决定本次查询是否以PROFILE方式执行"""
+        return self.profile_sample_rate > 0 and random.random() < self.profile_sample_rate
+    
+    def record(self, query, parameters, duration_ms, rows, profile=None, error=None):
+        """记录一次查询的执行情况"""
+        template = self.normalize_query(query)
+        db_hits, plan = self.summarize_plan(profile)
+        
+        with self._lock:
+            stats = self.templates.get(template)
+            if stats is None:
+                if len(self.templates) >= self.max_templates:
+                    return
+                stats = {
+                    'template_id': self.template_id(template),
+                    'query': template,
+                    'count': 0,
+                    'errors': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'rows_total': 0,
+                    'rows_max': 0,
+                    'histogram': [0] * (len(self.LATENCY_BUCKETS_MS) + 1),
+                    'profiled': 0,
+                    'db_hits_total': 0,
+                    'last_plan': None,
+                    'slow_count': 0
+                }
+                self.templates[template] = stats
+            
+            stats['count'] += 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            stats['rows_total'] += rows
+            stats['rows_max'] = max(stats['rows_max'], rows)
+            bucket = next((i for i, bound in enumerate(self.LATENCY_BUCKETS_MS) if duration_ms <= bound),
+                          len(self.LATENCY_BUCKETS_MS))
+            stats['histogram'][bucket] += 1
+            if error:
+                stats['errors'] += 1
+            if plan is not None:
+                stats['profiled'] += 1
+                stats['db_hits_total'] += db_hits
+                stats['last_plan'] = plan
+            
+            is_slow = duration_ms >= self.slow_threshold_ms
+            if is_slow:
+                stats['slow_count'] += 1
+            template_id = stats['template_id']
+        
+        if is_slow:
+            entry = {
+                'template_id': template_id,
+                'query': template,
+                'param_shapes': self.param_shapes(parameters),
+                'duration_ms': round(duration_ms, 3),
+                'rows': rows
+            }
+            if plan is not None:
+                entry['db_hits'] = db_hits
+            if error:
+                entry['error'] = error
+            self.slow_logger.warning(json.dumps(entry, ensure_ascii=False))
+    
+    def _percentile(self, histogram, count, p):
+        """由直方图估计百分位延迟（返回所在桶的上界，落在最慢的桶时返回None）"""
+        threshold = count * p
+        cumulative = 0
+        for i, bucket_count in enumerate(histogram):
+            cumulative += bucket_count
+            if cumulative >= threshold:
+                return self.LATENCY_BUCKETS_MS[i] if i < len(self.LATENCY_BUCKETS_MS) else None
+        return None
+    
+    def get_stats(self, top_n=None, sort_by='total_ms'):
+        """
+        获取各查询模板的统计信息
+        
+        Args:
+            top_n: 只返回排名前top_n的模板
+            sort_by: 排序字段，如total_ms、max_ms、count、db_hits_total
+        
+        Returns:
+            模板统计列表
+        """
+        with self._lock:
+            snapshot = [dict(stats, histogram=list(stats['histogram'])) for stats in self.templates.values()]
+        
+        for stats in snapshot:
+            count = stats['count']
+            stats['avg_ms'] = stats['total_ms'] / count if count else 0.0
+            stats['avg_rows'] = stats['rows_total'] / count if count else 0.0
+            stats['p50_ms'] = self._percentile(stats['histogram'], count, 0.5)
+            stats['p95_ms'] = self._percentile(stats['histogram'], count, 0.95)
+            stats['avg_db_hits'] = stats['db_hits_total'] / stats['profiled'] if stats['profiled'] else None
+            stats['histogram'] = dict(zip([f"<={b}ms" for b in self.LATENCY_BUCKETS_MS] + ['slower'],
+                                          stats['histogram']))
+        
+        snapshot.sort(key=lambda stats: stats.get(sort_by) or 0, reverse=True)
+        return snapshot[:top_n] if top_n else snapshot
+    
+    def reset(self):
+        """清空统计"""
+        with self._lock:
+            self.templates.clear()
@@ -0,0 +1,245 @@
+import logging
+import threading
+import time
+import numpy as np
+
+class TemporalIndex:
+    """
+    带时间信息的关系的内存索引
+    
+    从Neo4j一次性加载带year/since/created_at属性的关系，实体和关系类型编码为整数后按列存放：
+    - 年份分区：全部关系按年份排序，某一年份区间内的关系是二分查找得到的一段连续行；
+    - 实体索引：每条关系按两端实体各记录一次（保留方向），按 (实体, 关系类型, 年份) 排序并预计算
+      每个实体的行偏移，某个实体在某一时间之前或某一时间区间内的关系在 (实体, 关系类型) 的行内二分查找。
+    查询耗时与关系总数无关。追加关系时在新数组上重新排序，完成后整体替换，读取方始终看到一致的快照。
+    """
+    QUERY = """
+    MATCH (h)-[r]->(t)
+    WHERE r.since IS NOT NULL OR r.year IS NOT NULL OR r.created_at IS NOT NULL
+    RETURN coalesce(h.name, h.id) AS head, type(r) AS relationship, coalesce(t.name, t.id) AS tail,
+           properties(r) AS props
+    """
+    
+    def __init__(self, neo4j_manager):
+        """
+        初始化时间索引
+        
+        Args:
+            neo4j_manager: Neo4j连接管理器
+        """
+        self.neo4j_manager = neo4j_manager
+        self.logger = logging.getLogger(__name__)
+        
+        self.entities = []
+        self.entity_ids = {}
+        self.relationships = []
+        self.relationship_ids = {}
+        self._lock = threading.Lock()
+        
+        empty = np.empty(0, dtype=np.int32)
+        # 年份分区：(头实体, 关系, 尾实体, 年份)，按年份排序
+        self._edges = (empty, empty, empty, empty)
+        # 实体索引：(实体, 关系, 另一端实体, 年份, 是否为出边, 实体行偏移)
+        self._by_entity = (empty, empty, empty, empty, np.empty(0, dtype=bool), np.zeros(1, dtype=np.int64))
+        self.built_at = 0.0
+    
+    def __len__(self):
+        return len(self._edges[0])
+    
+    @staticmethod
+    def extract_year(props):
+        """从关系属性中提取年份，依次尝试year、since、created_at，无法解析时返回None"""
+        if 'year' in props:
+            return props['year']
+        if 'since' in props:
+            return props['since']
+        if 'created_at' in props:
+            created_at = props['created_at']
+            # 只解析字符串形式的日期；create_relationship写入的DateTime是变更轮询的水位线，不是业务年份
+            if isinstance(created_at, str):
+                try:
+                    return int(created_at.split('-')[0])
+                except ValueError:
+                    pass
+        return None
+    
+    @staticmethod
+    def _encode(value, ids, values):
+        code = ids.get(value)
+        if code is None:
+            code = len(values)
+            values.append(value)
+            ids[value] = code
+        return code
+    
+    def build(self):
+        """从数据库加载全部带时间信息的关系"""
+        start_time = time.time()
+        with self._lock:
+            self.entities, self.entity_ids = [], {}
+            self.relationships, self.relationship_ids = [], {}
+            empty = np.empty(0, dtype=np.int32)
+            self._edges = (empty, empty, empty, empty)
+        
+        rows = self.neo4j_manager.stream_query(self.QUERY, as_tuples=True)
+        self.add(
+            (head, relationship, tail, self.extract_year(props or {}))
+            for head, relationship, tail, props in rows
+        )
+        self.built_at = time.time()
+        self.logger.info(f"时间索引构建完成，共 {len(self)} 条关系，耗时 {self.built_at - start_time:.2f} 秒")
+        return self
+    
+    def add(self, rows):
+        """
+        追加带时间信息的关系
+        
+        Args:
+            rows: [(头实体, 关系类型, 尾实体, 年份), ...]，年份为None或实体为None的行被跳过
+        
+        Returns:
+            追加的关系数
+        """
+        encoded = []
+        with self._lock:
+            for head, relationship, tail, year in rows:
+                if head is None or tail is None or year is None:
+                    continue
+                try:
+                    year = int(year)
+                except (TypeError, ValueError):
+                    continue
+                encoded.append((self._encode(str(head), self.entity_ids, self.entities),
+                                self._encode(relationship, self.relationship_ids, self.relationships),
+                                self._encode(str(tail), self.entity_ids, self.entities),
+                                year))
+            if not encoded:
+                return 0
+            
+            encoded = np.array(encoded, dtype=np.int32)
+            columns = [np.concatenate([old, encoded[:, i]]) for i, old in enumerate(self._edges)]
+            order = np.argsort(columns[3], kind='stable')
+            heads, rels, tails, years = (column[order] for column in columns)
+            
+            # 每条关系按两端实体各记录一次
+            entity = np.concatenate([heads, tails])
+            other = np.concatenate([tails, heads])
+            entity_rels = np.concatenate([rels, rels])
+            entity_years = np.concatenate([years, years])
+            outgoing = np.concatenate([np.ones(len(heads), dtype=bool), np.zeros(len(heads), dtype=bool)])
+            order = np.lexsort((entity_years, entity_rels, entity))
+            entity = entity[order]
+            offsets = np.searchsorted(entity, np.arange(len(self.entities) + 1))
+            
+            self._edges = (heads, rels, tails, years)
+            self._by_entity = (entity, entity_rels[order], other[order], entity_years[order], outgoing[order], offsets)
+        return len(encoded)
+    
+    def apply_graph_changes(self, changes):
+        """把变更中带时间信息的新关系追加到索引（ChangePoller的订阅回调）"""
+        return self.add(
+            (rel.get('start'), rel['type'], rel.get('end'), self.extract_year(rel.get('properties') or {}))
+            for rel in changes.get('relationships', [])
+        )
+    
+    @staticmethod
+    def _year_bounds(years, start_year, end_year):
+        """升序年份数组中落在 [start_year, end_year] 内的下标区间"""
+        low = 0 if start_year is None else int(np.searchsorted(years, start_year, side='left'))
+        high = len(years) if end_year is None else int(np.searchsorted(years, end_year, side='right'))
+        return low, max(low, high)
+    
+    def relationships_between(self, entity, start_year=None, end_year=None, relationship=None, direction='both'):
+        """
+        查询实体在某一时间区间内的关系
+        
+        Args:
+            entity: 实体名称
+            start_year: 起始年份（含），None表示不限
+            end_year: 结束年份（含），None表示不限
+            relationship: 关系类型，None表示全部关系类型
+            direction: 'out'只返回实体作为头实体的关系，'in'只返回作为尾实体的关系，'both'返回全部
+        
+        Returns:
+            [{'entity', 'relationship', 'related_entity', 'year', 'direction'}, ...]，按年份升序
+        """
+        entities, rels, others, years, outgoing, offsets = self._by_entity
+        entity_id = self.entity_ids.get(str(entity))
+        if entity_id is None or entity_id + 1 >= len(offsets):
+            return []
+        start, end = int(offsets[entity_id]), int(offsets[entity_id + 1])
+        
+        # 实体行内每种关系类型是一段按年份排序的连续行
+        entity_rels = rels[start:end]
+        if relationship is not None:
+            rel_id = self.relationship_ids.get(relationship)
+            if rel_id is None:
+                return []
+            runs = [(start + int(np.searchsorted(entity_rels, rel_id, side='left')),
+                     start + int(np.searchsorted(entity_rels, rel_id, side='right')))]
+        else:
+            boundaries = [start] + [start + int(i) + 1 for i in np.flatnonzero(np.diff(entity_rels))] + [end]
+            runs = list(zip(boundaries[:-1], boundaries[1:]))
+        
+        rows = []
+        for run_start, run_end in runs:
+            low, high = self._year_bounds(years[run_start:run_end], start_year, end_year)
+            rows.extend(range(run_start + low, run_start + high))
+        if direction != 'both':
+            rows = [row for row in rows if outgoing[row] == (direction == 'out')]
+        rows.sort(key=lambda row: years[row])
+        
+        name = self.entities[entity_id]
+        return [{
+            'entity': name,
+            'relationship': self.relationships[rels[row]],
+            'related_entity': self.entities[others[row]],
+            'year': int(years[row]),
+            'direction': 'out' if outgoing[row] else 'in'
+        } for row in rows]
+    
+    def relationships_as_of(self, entity, year, relationship=None, direction='both'):
+        """查询实体在year（含）及之前建立的关系，参数与返回值同relationships_between"""
+        return self.relationships_between(entity, end_year=year, relationship=relationship, direction=direction)
+    
+    def edges_between(self, start_year=None, end_year=None, relationship=None):
+        """
+        查询某一时间区间内建立的全部关系
+        
+        Returns:
+            [(头实体, 关系类型, 尾实体, 年份), ...]，按年份升序
+        """
+        heads, rels, tails, years = self._edges
+        low, high = self._year_bounds(years, start_year, end_year)
+        rows = np.arange(low, high)
+        if relationship is not None:
+            rel_id = self.relationship_ids.get(relationship)
+            if rel_id is None:
+                return []
+            rows = rows[rels[low:high] == rel_id]
+        return [(self.entities[heads[row]], self.relationships[rels[row]], self.entities[tails[row]], int(years[row]))
+                for row in rows]
+    
+    def edges(self):
+        """按年份升序逐行迭代全部关系 (头实体, 关系类型, 尾实体, 年份)"""
+        heads, rels, tails, years = self._edges
+        for head, rel, tail, year in zip(heads, rels, tails, years):
+            yield self.entities[head], self.relationships[rel], self.entities[tail], int(year)
+    
+    def year_range(self):
+        """全部关系的 (最早年份, 最晚年份)，没有关系时返回None"""
+        years = self._edges[3]
+        if len(years) == 0:
+            return None
+        return int(years[0]), int(years[-1])
+    
+    def get_stats(self):
+        """获取索引统计信息"""
+        return {
+            'edges': len(self),
+            'entities': len(self.entities),
+            'relationships': len(self.relationships),
+            'year_range': self.year_range(),
+            'index_bytes': sum(column.nbytes for column in self._edges + self._by_entity),
+            'built_at': self.built_at
+        }
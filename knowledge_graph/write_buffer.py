@@ -0,0 +1,155 @@
+from collections import deque
+import logging
+import queue
+import threading
+import time
+
+class WriteBuffer:
+    """
+    图写操作的写缓冲队列（write-behind）
+    
+    写操作先进入有界队列，后台线程在队列积累到max_batch_size或距上次提交超过flush_interval时，
+    把一批写操作放在同一个事务中提交（group commit）。队列满时submit阻塞等待（背压），
+    超时则拒绝。需要读己之写的调用方可以调用flush()同步提交队列中已有的全部写操作。
+    """
+    def __init__(self, neo4j_manager, max_batch_size=500, flush_interval=1.0, max_queue_size=10000,
+                 put_timeout=None, on_batch_error=None, max_error_history=100):
+        """
+        初始化写缓冲
+        
+        Args:
+            neo4j_manager: Neo4j连接管理器
+            max_batch_size: 单个事务最多包含的写操作数
+            flush_interval: 后台定时提交的间隔（秒）
+            max_queue_size: 队列容量，队列满时submit阻塞
+            put_timeout: submit在队列满时的最长等待时间（秒），None表示一直等待
+            on_batch_error: 批次提交失败时的回调，参数为批次结果字典
+            max_error_history: 保留的失败批次数量
+        """
+        self.neo4j_manager = neo4j_manager
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.on_batch_error = on_batch_error
+        self.logger = logging.getLogger(__name__)
+        
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        # 保证同一时刻只有一个批次在提交，flush()借此等待后台线程正在提交的批次
+        self._commit_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        
+        self.failed_batches = deque(maxlen=max_error_history)
+        self.stats = {'submitted': 0, 'rejected': 0, 'batches': 0, 'committed': 0, 'failed': 0}
+        self._batch_id = 0
+        
+        self._thread = threading.Thread(target=self._run, name='neo4j-write-buffer', daemon=True)
+        self._thread.start()
+    
+    def submit(self, query, parameters=None, timeout=None):
+        """
+        提交一个写操作到队列
+        
+        Args:
+            query: Cypher写语句
+            parameters: 查询参数
+            timeout: 队列满时的最长等待时间（秒），默认使用put_timeout
+        
+        Returns:
+            是否成功入队
+        """
+        if self._stop.is_set():
+            self.logger.error("写缓冲已关闭，拒绝写操作")
+            return False
+        
+        try:
+            self._queue.put((query, parameters or {}),
+                            timeout=timeout if timeout is not None else self.put_timeout)
+        except queue.Full:
+            self.stats['rejected'] += 1
+            self.logger.warning("写缓冲队列已满，写操作被拒绝")
+            return False
+        
+        self.stats['submitted'] += 1
+        if self._queue.qsize() >= self.max_batch_size:
+            self._wakeup.set()
+        return True
+    
+    def _drain(self):
+        """从队列取出至多一个批次的写操作"""
+        operations = []
+        while len(operations) < self.max_batch_size:
+            try:
+                operations.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return operations
+    
+    def _commit_next_batch(self):
+        """提交下一个批次，队列为空时返回None"""
+        with self._commit_lock:
+            operations = self._drain()
+            if not operations:
+                return None
+            
+            self._batch_id += 1
+            result = {'batch_id': self._batch_id, 'size': len(operations), 'success': True, 'error': None}
+            start = time.perf_counter()
+            try:
+                self.neo4j_manager.execute_write_batch(operations, raise_on_error=True)
+                self.stats['committed'] += len(operations)
+            except Exception as e:
+                result.update(success=False, error=str(e), operations=operations)
+                self.stats['failed'] += len(operations)
+                self.failed_batches.append(result)
+                self.logger.error(f"写批次 {self._batch_id} 提交失败（{len(operations)} 个写操作）: {str(e)}")
+            result['duration_ms'] = (time.perf_counter() - start) * 1000
+            self.stats['batches'] += 1
+        
+        if not result['success'] and self.on_batch_error:
+            try:
+                self.on_batch_error(result)
+            except Exception as e:
+                self.logger.error(f"写批次失败回调出错: {str(e)}")
+        return result
+    
+    def flush(self):
+        """
+        同步提交队列中已有的全部写操作
+        
+        Returns:
+            本次提交的批次结果列表
+        """
+        results = []
+        while True:
+            result = self._commit_next_batch()
+            if result is None:
+                # 等待后台线程可能正在提交的批次完成
+                with self._commit_lock:
+                    pass
+                return results
+            results.append(result)
+    
+    def _run(self):
+        """后台线程：按时间或队列长度触发批量提交"""
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            while self._commit_next_batch() is not None:
+                if self._queue.qsize() < self.max_batch_size and not self._stop.is_set():
+                    break
+    
+    def pending(self):
+        """队列中尚未提交的写操作数量"""
+        return self._queue.qsize()
+    
+    def get_stats(self):
+        """获取写缓冲统计信息"""
+        return {**self.stats, 'pending': self.pending(), 'failed_batches': len(self.failed_batches)}
+    
+    def close(self):
+        """停止后台线程并提交剩余写操作"""
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
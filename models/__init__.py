@@ -1,5 +1,12 @@
 from .interpolation_model import InterpolationModel
 from .extrapolation_model import ExtrapolationModel
+from .temporal_store import TemporalStore
+from .candidate_scorer import CandidateScorer, EdgeSet
+from .trend_engine import TrendEngine
+from .trend_cube import TrendCube
+from .forecast_engine import ForecastEngine
+from .embedding_store import EmbeddingStore, EmbeddingTable
+from .forecast_views import ForecastViews
 
 class QAEngine:
     """
@@ -10,11 +17,31 @@ class QAEngine:
         """初始化问答引擎"""
         self.graph_manager = graph_manager
         
+        # 两个模型共享的实体/关系类型词表和初始嵌入，只读取一次
+        self.embedding_store = EmbeddingStore().load_vocabulary(graph_manager)
+        
         # 初始化内推模型
-        self.interpolation_model = InterpolationModel(graph_manager)
+        self.interpolation_model = InterpolationModel(graph_manager, embedding_store=self.embedding_store)
         
         # 初始化外推模型
-        self.extrapolation_model = ExtrapolationModel(graph_manager)
+        self.extrapolation_model = ExtrapolationModel(graph_manager, embedding_store=self.embedding_store)
+        
+        # 趋势和外推预测的物化视图，调用enable_forecast_views后启用
+        self.forecast_views = None
+    
+    def enable_forecast_views(self, **config):
+        """
+        启用趋势和外推预测的物化视图并启动后台刷新
+        
+        Args:
+            **config: 传给ForecastViews的参数（refresh_interval、top_entities、view_params）
+        
+        Returns:
+            ForecastViews实例
+        """
+        if self.forecast_views is None:
+            self.forecast_views = ForecastViews(self.extrapolation_model, **config).start()
+        return self.forecast_views
     
     def answer_interpolation_query(self, entity1, relationship=None, entity2=None, top_k=5):
         """
@@ -62,27 +89,23 @@ class QAEngine:
         Args:
             entity: 要预测的实体
             future_years: 预测未来的年数
-            top_k: 返回前k个预测结果
+            top_k: 每年返回的预测结果数
             
         Returns:
-            预测的未来关系列表
+            (predictions_by_year, relationship_stats, general_insights)，格式见ForecastEngine.forecast
         """
-        results = []
-        
         if not entity:
-            results.append({
-                'error': '参数不完整，请提供实体名称',
-                'suggestion': '请提供一个实体名称以预测其未来可能的关系'
-            })
-        else:
-            # 使用外推模型预测未来关系
-            results = self.extrapolation_model.predict_future_relationships(
-                entity, future_years=future_years, top_k=top_k
-            )
-        
-        return results
+            return ForecastEngine.empty_result('参数不完整，请提供一个实体名称以预测其未来可能的关系')
+        
+        # 优先使用物化视图中预先计算的结果
+        views = self.forecast_views
+        cached = views.get('entity', entity, future_years, top_k) if views else None
+        if cached is not None:
+            return cached
+        # 使用外推模型按年预测未来关系
+        return self.extrapolation_model.forecast_engine.forecast(entity, future_years=future_years, top_k=top_k)
     
-    def predict_industry_trend(self, industry, future_years=5, top_k=5):
+    def predict_industry_trend(self, industry, future_years=5, top_k=5, mode='pairwise'):
         """
         预测行业趋势
         
@@ -90,6 +113,7 @@ class QAEngine:
             industry: 行业名称
             future_years: 预测未来的年数
             top_k: 返回前k个预测结果
+            mode: 'pairwise'预测行业内公司之间的新关系；'aggregate'预测各关系类型每年的数量
             
         Returns:
             行业趋势预测列表
@@ -101,14 +125,34 @@ class QAEngine:
                 'error': '参数不完整，请提供行业名称',
                 'suggestion': '请提供一个行业名称以预测其未来趋势'
             })
+        elif mode == 'aggregate':
+            # 行业趋势统计上的切片和线性趋势，无需查询图数据库
+            results = self.extrapolation_model.predict_industry_activity(
+                industry, future_years=future_years, top_k=top_k
+            )
         else:
+            # 优先使用物化视图中预先计算的结果
+            views = self.forecast_views
+            cached = views.get('industry', industry, future_years, top_k) if views else None
             # 使用外推模型预测行业趋势
-            results = self.extrapolation_model.predict_market_trend(
+            results = cached if cached is not None else self.extrapolation_model.predict_market_trend(
                 industry, future_years=future_years, top_k=top_k
             )
         
         return results
     
+    def apply_graph_changes(self, changes):
+        """
+        应用图数据变更（ChangePoller的订阅回调），转发给内推和外推模型
+        
+        Args:
+            changes: {'nodes': [...], 'relationships': [...]}
+        """
+        self.interpolation_model.apply_graph_changes(changes)
+        self.extrapolation_model.apply_graph_changes(changes)
+        if self.forecast_views is not None:
+            self.forecast_views.mark_changed(changes)
+    
     def train_models(self, interpolation_epochs=10, extrapolation_epochs=5, learning_rate=0.01):
         """
         训练所有模型
@@ -142,6 +186,10 @@ class QAEngine:
             'time_seconds': time.time() - start_time
         }
         
+        # 嵌入已更新，物化视图需要全部重算
+        if self.forecast_views is not None:
+            self.forecast_views.invalidate_all()
+        
         return results
     
     def save_models(self, interpolation_path, extrapolation_path):
@@ -149,8 +197,9 @@ class QAEngine:
         保存模型
         
         Args:
-            interpolation_path: 内推模型保存路径
-            extrapolation_path: 外推模型保存路径
+            interpolation_path: 内推模型保存目录
+            extrapolation_path: 外推模型保存目录
+            （每个目录包含float32的.npy嵌入矩阵、名称文件和manifest.json）
             
         Returns:
             保存结果字典
@@ -166,8 +215,10 @@ class QAEngine:
         加载模型
         
         Args:
-            interpolation_path: 内推模型加载路径
-            extrapolation_path: 外推模型加载路径
+            interpolation_path: 内推模型目录（旧版pickle文件也可读取）
+            extrapolation_path: 外推模型目录（旧版pickle文件也可读取）
+            
+        嵌入矩阵以只读内存映射方式打开，多个进程加载同一目录时共享物理内存。
             
         Returns:
             加载结果字典
@@ -176,10 +227,12 @@ class QAEngine:
             'interpolation': self.interpolation_model.load_model(interpolation_path),
             'extrapolation': self.extrapolation_model.load_model(extrapolation_path)
         }
+        if self.forecast_views is not None:
+            self.forecast_views.invalidate_all()
         return results
 
 # 导出类和函数
-__all__ = ['QAEngine', 'InterpolationModel', 'ExtrapolationModel']
+__all__ = ['QAEngine', 'InterpolationModel', 'ExtrapolationModel', 'TemporalStore', 'CandidateScorer', 'EdgeSet', 'TrendEngine', 'TrendCube', 'ForecastEngine', 'EmbeddingStore', 'EmbeddingTable', 'ForecastViews']
 
 # 示例用法
 if __name__ == "__main__":
@@ -0,0 +1,134 @@
+import numpy as np
+
+class CandidateScorer:
+    """
+    候选实体的批量打分
+    
+    实体嵌入按行堆叠为一个行归一化的float32矩阵，一个查询向量与全部候选的余弦相似度
+    只需一次矩阵-向量乘积，多个查询向量则是一次矩阵乘法。
+    """
+    def __init__(self, entity_embeddings):
+        """
+        初始化打分器
+        
+        Args:
+            entity_embeddings: {实体名称: 嵌入向量}或EmbeddingTable
+        """
+        self.source = entity_embeddings
+        if hasattr(entity_embeddings, 'matrix'):
+            # EmbeddingTable已是按行堆叠的float32矩阵，直接使用
+            self.names = entity_embeddings.names
+            self.index = entity_embeddings.index
+            matrix = entity_embeddings.matrix
+        elif entity_embeddings:
+            self.names = list(entity_embeddings)
+            self.index = {name: i for i, name in enumerate(self.names)}
+            matrix = np.array([entity_embeddings[name] for name in self.names], dtype=np.float32)
+        else:
+            self.names, self.index = [], {}
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.normalized = matrix / norms
+    
+    def __len__(self):
+        return len(self.names)
+    
+    @staticmethod
+    def normalize(vectors):
+        """把向量（或按最后一维的多个向量）归一化为单位长度的float32数组"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+    
+    def similarities(self, vectors):
+        """
+        查询向量与全部候选实体的余弦相似度
+        
+        Args:
+            vectors: 一个向量 (d,) 或多个向量 (m, d)
+        
+        Returns:
+            (n,) 或 (m, n) 的相似度数组
+        """
+        return self.normalize(vectors) @ self.normalized.T
+    
+    def mask(self, names):
+        """names中属于候选集合的实体对应的布尔掩码"""
+        mask = np.zeros(len(self.names), dtype=bool)
+        rows = [self.index[name] for name in names if name in self.index]
+        mask[rows] = True
+        return mask
+    
+    @staticmethod
+    def top_k(scores, k):
+        """
+        取分数最高的k个位置，忽略值为-inf的位置
+        
+        Args:
+            scores: 一维或多维分数数组，多维时按展平后的位置计算
+        
+        Returns:
+            展平后的位置数组，按分数降序
+        """
+        flat = scores.ravel()
+        k = min(k, int(np.count_nonzero(np.isfinite(flat))))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        top = np.argpartition(-flat, k - 1)[:k]
+        return top[np.argsort(-flat[top], kind='stable')]
+
+
+class EdgeSet:
+    """
+    内存中的已有关系集合
+    
+    与GraphManager.query_relationship_between_entities一致，关系按无向处理：
+    (a, 关系, b) 写入后，a和b互为该关系下的邻居。
+    """
+    def __init__(self):
+        """初始化空集合"""
+        self._neighbors = {}
+        self.count = 0
+    
+    def __len__(self):
+        return self.count
+    
+    def add_many(self, edges):
+        """
+        批量写入关系
+        
+        每个键的邻居集合在新集合上合并后整体替换，其他线程读取时不会遇到集合大小变化。
+        
+        Args:
+            edges: [(头实体, 关系, 尾实体), ...]
+        
+        Returns:
+            写入的关系数
+        """
+        grouped = {}
+        count = 0
+        for head, relationship, tail in edges:
+            if head is None or tail is None:
+                continue
+            grouped.setdefault((head, relationship), set()).add(tail)
+            grouped.setdefault((tail, relationship), set()).add(head)
+            count += 1
+        for key, added in grouped.items():
+            existing = self._neighbors.get(key)
+            self._neighbors[key] = existing | added if existing else added
+        self.count += count
+        return count
+    
+    def add(self, head, relationship, tail):
+        """写入一条关系"""
+        return self.add_many([(head, relationship, tail)])
+    
+    def neighbors(self, entity, relationship):
+        """与entity之间存在relationship关系的实体集合"""
+        return self._neighbors.get((entity, relationship), ())
+    
+    def contains(self, head, relationship, tail):
+        """两个实体之间是否已存在该关系"""
+        return tail in self.neighbors(head, relationship)
@@ -0,0 +1,255 @@
+from collections.abc import Mapping
+import json
+import logging
+import os
+import threading
+import numpy as np
+
+class EmbeddingTable(Mapping):
+    """
+    名称到嵌入向量的只读映射
+    
+    全部向量是一个float32矩阵的行，names[i]对应matrix[i]，index为名称到行号的映射。
+    按名称取出的向量是矩阵行的视图，不复制数据；需要整体计算时直接使用matrix。
+    表创建后不再修改，追加名称或训练更新都生成新表后整体替换。
+    """
+    MANIFEST = 'manifest.json'
+    FORMAT = 'embedding_tables'
+    VERSION = 1
+    
+    def __init__(self, names, matrix, index=None):
+        """
+        初始化嵌入表
+        
+        Args:
+            names: 名称列表
+            matrix: (len(names), 维度) 的float32矩阵
+            index: 名称到行号的映射，默认由names生成
+        """
+        self.names = names
+        self.index = index if index is not None else {name: i for i, name in enumerate(names)}
+        self.matrix = matrix
+        # 由EmbeddingStore创建的共享表指向该存储
+        self.owner = None
+    
+    @classmethod
+    def from_dict(cls, embeddings, dim=None):
+        """由 {名称: 向量} 字典创建嵌入表"""
+        names = list(embeddings)
+        if names:
+            matrix = np.array([embeddings[name] for name in names], dtype=np.float32)
+        else:
+            matrix = np.zeros((0, dim or 0), dtype=np.float32)
+        return cls(names, matrix)
+    
+    def __getitem__(self, name):
+        return self.matrix[self.index[name]]
+    
+    def __contains__(self, name):
+        return name in self.index
+    
+    def __iter__(self):
+        return iter(self.names)
+    
+    def __len__(self):
+        return len(self.names)
+    
+    @property
+    def dim(self):
+        return self.matrix.shape[1]
+    
+    def rows(self, names):
+        """names对应的向量矩阵"""
+        return self.matrix[[self.index[name] for name in names]]
+    
+    def extended(self, names, init):
+        """
+        追加本表中没有的名称
+        
+        Args:
+            names: 名称序列
+            init: 以缺少的名称列表为参数、返回 (缺少的名称数, 维度) 向量矩阵的函数
+        
+        Returns:
+            追加后的新表；没有缺少的名称时返回本表
+        """
+        missing = [name for name in dict.fromkeys(names) if name not in self.index]
+        if not missing:
+            return self
+        index = dict(self.index)
+        index.update((name, len(self.names) + i) for i, name in enumerate(missing))
+        matrix = np.vstack([self.matrix, np.asarray(init(missing), dtype=np.float32)])
+        return EmbeddingTable(self.names + missing, matrix, index)
+    
+    @classmethod
+    def save_many(cls, directory, tables, **metadata):
+        """
+        把多个嵌入表保存到目录
+        
+        每张表保存为 <名称>.npy（连续的float32矩阵）和 <名称>.names.json（按行排列的名称），
+        最后写入manifest.json记录格式版本、各表的文件和形状以及metadata。manifest先写入临时文件再替换，
+        读取方只会看到完整的manifest。
+        
+        Args:
+            directory: 保存目录，不存在时创建
+            tables: {表名称: EmbeddingTable}
+            **metadata: 写入manifest的其他信息
+        
+        Returns:
+            manifest字典
+        """
+        os.makedirs(directory, exist_ok=True)
+        manifest = {'format': cls.FORMAT, 'version': cls.VERSION, 'tables': {}, **metadata}
+        for name, table in tables.items():
+            matrix = np.ascontiguousarray(table.matrix, dtype=np.float32)
+            np.save(os.path.join(directory, f'{name}.npy'), matrix)
+            with open(os.path.join(directory, f'{name}.names.json'), 'w', encoding='utf-8') as f:
+                json.dump(list(table.names), f, ensure_ascii=False)
+            manifest['tables'][name] = {
+                'matrix': f'{name}.npy',
+                'names': f'{name}.names.json',
+                'shape': list(matrix.shape)
+            }
+        
+        manifest_path = os.path.join(directory, cls.MANIFEST)
+        with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(manifest_path + '.tmp', manifest_path)
+        return manifest
+    
+    @classmethod
+    def load_many(cls, directory, mmap=True):
+        """
+        读取save_many保存的嵌入表
+        
+        Args:
+            directory: 保存目录
+            mmap: 是否以只读内存映射方式打开矩阵，多个进程打开同一文件时共享物理内存
+        
+        Returns:
+            ({表名称: EmbeddingTable}, manifest字典)
+        """
+        with open(os.path.join(directory, cls.MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format') != cls.FORMAT or manifest.get('version', 0) > cls.VERSION:
+            raise ValueError(f"不支持的嵌入文件格式: {manifest.get('format')} v{manifest.get('version')}")
+        
+        tables = {}
+        for name, entry in manifest['tables'].items():
+            matrix = np.load(os.path.join(directory, entry['matrix']), mmap_mode='r' if mmap else None)
+            with open(os.path.join(directory, entry['names']), encoding='utf-8') as f:
+                names = json.load(f)
+            if list(matrix.shape) != entry['shape'] or len(names) != matrix.shape[0]:
+                raise ValueError(f"嵌入表 {name} 的形状与manifest不一致")
+            tables[name] = cls(names, matrix)
+        return tables, manifest
+
+
+class EmbeddingStore:
+    """
+    内推模型和外推模型共享的实体/关系类型词表和初始嵌入
+    
+    实体名按elementId游标分页读取，不受条数上限限制；关系类型取自db.relationshipTypes()。
+    实体和关系类型的初始嵌入各是一个float32矩阵（EmbeddingTable），两个模型在训练前引用同一张表，
+    训练后各自持有训练得到的新表，即参数不同的部分才各占一份内存。图数据新增的名称经update加入
+    共享表，并以相同的初始向量补齐到各模型的表中。
+    """
+    NODE_PAGE_QUERY = """
+    MATCH (n)
+    WHERE $cursor IS NULL OR elementId(n) > $cursor
+    WITH n ORDER BY elementId(n) LIMIT $page_size
+    RETURN elementId(n) AS element_id, coalesce(n.name, toString(n.id)) AS name
+    """
+    RELATIONSHIP_TYPES_QUERY = "CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType"
+    
+    def __init__(self, embedding_dim=128, seed=None):
+        """
+        初始化嵌入存储
+        
+        Args:
+            embedding_dim: 嵌入维度
+            seed: 初始嵌入的随机种子
+        """
+        self.embedding_dim = embedding_dim
+        self.logger = logging.getLogger(__name__)
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        
+        self.entities = self._shared(EmbeddingTable([], np.zeros((0, embedding_dim), dtype=np.float32)))
+        self.relationships = self._shared(EmbeddingTable([], np.zeros((0, embedding_dim), dtype=np.float32)))
+    
+    def _shared(self, table):
+        table.owner = self
+        return table
+    
+    def _random_rows(self, names):
+        """新名称的随机初始嵌入"""
+        return self._rng.normal(0, 0.1, (len(names), self.embedding_dim)).astype(np.float32)
+    
+    def load_vocabulary(self, graph_manager, page_size=1000):
+        """
+        分页读取图中的全部实体名和关系类型
+        
+        Args:
+            graph_manager: 知识图谱管理器
+            page_size: 每页读取的节点数
+        
+        Returns:
+            self
+        """
+        neo4j_manager = graph_manager.neo4j_manager
+        names = []
+        cursor = None
+        while True:
+            rows = neo4j_manager.execute_query(self.NODE_PAGE_QUERY, {"cursor": cursor, "page_size": page_size})
+            if not rows:
+                break
+            names.extend(str(row['name']) for row in rows if row['name'] is not None)
+            cursor = rows[-1]['element_id']
+        # 全部页读完后一次追加，矩阵只分配一次
+        self.add_entities(names)
+        
+        rows = neo4j_manager.execute_query(self.RELATIONSHIP_TYPES_QUERY) or []
+        self.add_relationships(row['relationshipType'] for row in rows)
+        self.logger.info(f"共享词表包含 {len(self.entities)} 个实体和 {len(self.relationships)} 个关系类型")
+        return self
+    
+    def add_entities(self, names):
+        """把实体名加入共享表，返回新的共享表"""
+        with self._lock:
+            self.entities = self._shared(self.entities.extended(names, self._random_rows))
+            return self.entities
+    
+    def add_relationships(self, names):
+        """把关系类型加入共享表，返回新的共享表"""
+        with self._lock:
+            self.relationships = self._shared(self.relationships.extended(names, self._random_rows))
+            return self.relationships
+    
+    def update(self, entity_table, relationship_table, entity_names=(), relationship_types=()):
+        """
+        把图数据变更中的名称加入共享表，并补齐到一个模型的嵌入表中
+        
+        模型的表仍是共享表（尚未训练）时直接返回新的共享表；否则只在模型的表上追加缺少的行，
+        初始向量与共享表一致。
+        
+        Returns:
+            (实体嵌入表, 关系嵌入表)
+        """
+        entity_names, relationship_types = list(entity_names), list(relationship_types)
+        entities = self.add_entities(entity_names)
+        relationships = self.add_relationships(relationship_types)
+        if getattr(entity_table, 'owner', None) is not self:
+            entities = entity_table.extended(entity_names, entities.rows)
+        if getattr(relationship_table, 'owner', None) is not self:
+            relationships = relationship_table.extended(relationship_types, relationships.rows)
+        return entities, relationships
+    
+    def get_stats(self):
+        """获取存储统计信息"""
+        return {
+            'entities': len(self.entities),
+            'relationships': len(self.relationships),
+            'embedding_dim': self.embedding_dim,
+            'matrix_bytes': self.entities.matrix.nbytes + self.relationships.matrix.nbytes
+        }
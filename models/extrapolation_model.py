@@ -1,91 +1,210 @@
 import numpy as np
-import pandas as pd
 from datetime import datetime, timedelta
-import torch
-import torch.nn as nn
-import torch.optim as optim
+import json
 import logging
-from sklearn.metrics.pairwise import cosine_similarity
+import os
+import time
+from .temporal_store import TemporalStore
+from .candidate_scorer import CandidateScorer, EdgeSet
+from .trend_engine import TrendEngine
+from .trend_cube import TrendCube
+from .forecast_engine import ForecastEngine
+from .embedding_store import EmbeddingStore, EmbeddingTable
 
 class ExtrapolationModel:
-    def __init__(self, graph_manager, embedding_dim=128):
-        """初始化外推模型"""
+    def __init__(self, graph_manager, embedding_dim=128, embedding_store=None):
+        """
+        初始化外推模型
+        
+        Args:
+            graph_manager: 知识图谱管理器
+            embedding_dim: 嵌入维度，传入embedding_store时以其维度为准
+            embedding_store: 与内推模型共享的词表和初始嵌入，默认单独读取
+        """
         self.graph_manager = graph_manager
-        self.embedding_dim = embedding_dim
         self.logger = logging.getLogger(__name__)
+        self.embedding_store = embedding_store or EmbeddingStore(embedding_dim).load_vocabulary(graph_manager)
+        self.embedding_dim = self.embedding_store.embedding_dim
         
-        # 初始化实体和关系的时间感知嵌入
-        self.entity_embeddings = {}
-        self.relationship_embeddings = {}
-        self.temporal_data = []  # 存储时间相关的数据
+        # 实体和关系的时间感知嵌入（EmbeddingTable），训练前引用共享表
+        self.entity_embeddings = self.embedding_store.entities
+        self.relationship_embeddings = self.embedding_store.relationships
+        # 时间相关的关系三元组，按头实体预建索引
+        self.temporal_store = TemporalStore()
+        # 图中已有的关系，预测时排除
+        self.existing_edges = EdgeSet()
+        # 实体嵌入矩阵的批量打分器，按需构建
+        self._scorer = None
+        # 行业趋势的批量计算
+        self.trend_engine = TrendEngine(self)
+        # 实体未来关系的按年预测
+        self.forecast_engine = ForecastEngine(self)
+        # 实体所属行业，以及行业 × 关系类型 × 年份的关系数量
+        self.entity_industries = {}
+        self.trend_cube = TrendCube()
         
         # 构建模型
         self._build_temporal_model()
     
     def _build_temporal_model(self):
         """构建时间感知模型"""
-        # 获取所有实体
-        entities = self.graph_manager.get_all_entities(limit=1000)
-        for entity_data in entities:
-            if isinstance(entity_data, dict) and 'properties' in entity_data:
-                entity_id = entity_data['properties'].get('name', str(entity_data['properties'].get('id', 'unknown')))
-                # 为每个实体创建随机嵌入
-                self.entity_embeddings[entity_id] = np.random.normal(0, 0.1, self.embedding_dim)
-        
-        # 获取所有关系类型
-        relationships = self.graph_manager.get_all_relationships(limit=100)
-        for rel_data in relationships:
-            if isinstance(rel_data, dict) and 'relationship_type' in rel_data:
-                rel_type = rel_data['relationship_type']
-                # 为每个关系类型创建随机嵌入
-                self.relationship_embeddings[rel_type] = np.random.normal(0, 0.1, self.embedding_dim)
-        
-        # 收集时间相关数据
+        # 收集实体所属行业和时间相关数据
+        self._collect_entity_industries()
         self._collect_temporal_data()
+        # 收集已有关系
+        self._collect_existing_edges()
         
         self.logger.info(f"构建了时间感知模型，包含 {len(self.entity_embeddings)} 个实体和 {len(self.relationship_embeddings)} 个关系")
     
-    def _collect_temporal_data(self):
-        """收集时间相关的数据"""
+    def _iter_temporal_edges(self):
+        """
+        逐行产生带时间信息的关系 (头实体, 关系类型, 尾实体, 年份)
+        
+        GraphManager已构建时间索引时直接读取索引，不再查询数据库。
+        """
+        temporal_index = getattr(self.graph_manager, 'temporal_index', None)
+        if temporal_index is not None:
+            yield from temporal_index.edges()
+            return
+        
         # 查询所有带时间属性的关系
         query = """
         MATCH (h)-[r]->(t)
         WHERE r.since IS NOT NULL OR r.year IS NOT NULL OR r.created_at IS NOT NULL
         RETURN h.name AS head, type(r) AS relationship, t.name AS tail, properties(r) AS props
         """
-        results = self.graph_manager.neo4j_manager.execute_query(query)
-        
-        for result in results:
+        for head, relationship, tail, props in self.graph_manager.neo4j_manager.stream_query(query, as_tuples=True):
             # 提取时间信息
-            year = None
-            if 'year' in result['props']:
-                year = result['props']['year']
-            elif 'since' in result['props']:
-                year = result['props']['since']
-            elif 'created_at' in result['props']:
-                # 处理Neo4j的datetime格式
-                created_at = result['props']['created_at']
-                if isinstance(created_at, str):
-                    try:
-                        year = int(created_at.split('-')[0])
-                    except:
-                        pass
+            yield head, relationship, tail, self._extract_year(props)
+    
+    def _collect_temporal_data(self):
+        """收集时间相关的数据"""
+        temporal_rows = []
+        cube_rows = []
+        industries = self.entity_industries
+        for head, relationship, tail, year in self._iter_temporal_edges():
+            if not year:
+                continue
             
-            if year and result['head'] in self.entity_embeddings and result['tail'] in self.entity_embeddings:
-                self.temporal_data.append({
-                    'head': result['head'],
-                    'relationship': result['relationship'],
-                    'tail': result['tail'],
-                    'year': int(year)
-                })
-        
-        # 转换为DataFrame便于处理
-        if self.temporal_data:
-            self.temporal_df = pd.DataFrame(self.temporal_data)
-            self.logger.info(f"收集了 {len(self.temporal_data)} 条时间相关数据")
+            # 行业统计覆盖全部带时间的关系，不要求实体已有嵌入
+            cube_rows.append((industries.get(head), relationship, year))
+            if head in self.entity_embeddings and tail in self.entity_embeddings:
+                temporal_rows.append((head, relationship, tail, int(year)))
+        
+        if self.temporal_store.extend(temporal_rows):
+            self.logger.info(f"收集了 {len(self.temporal_store)} 条时间相关数据")
         else:
-            self.temporal_df = pd.DataFrame(columns=['head', 'relationship', 'tail', 'year'])
             self.logger.warning("没有收集到时间相关数据")
+        
+        trend_cube = TrendCube()
+        trend_cube.add(cube_rows)
+        self.trend_cube = trend_cube
+        self.logger.info(f"行业趋势统计包含 {len(trend_cube.industries)} 个行业的 {len(trend_cube)} 条关系")
+    
+    def _collect_entity_industries(self):
+        """读取带industry属性的实体及其所属行业"""
+        query = "MATCH (n) WHERE n.industry IS NOT NULL RETURN n.name AS name, n.industry AS industry"
+        rows = self.graph_manager.neo4j_manager.stream_query(query, as_tuples=True)
+        self.entity_industries = {name: industry for name, industry in rows if name is not None}
+    
+    def _collect_existing_edges(self):
+        """把图中已有的关系读入内存边集合"""
+        query = "MATCH (h)-[r]->(t) RETURN h.name AS head, type(r) AS relationship, t.name AS tail"
+        rows = self.graph_manager.neo4j_manager.stream_query(query, as_tuples=True)
+        
+        existing_edges = EdgeSet()
+        existing_edges.add_many(rows)
+        self.existing_edges = existing_edges
+        self.logger.info(f"读取了 {len(existing_edges)} 条已有关系")
+    
+    def _get_scorer(self):
+        """当前实体嵌入的批量打分器，嵌入字典被替换或训练更新后重建"""
+        scorer = self._scorer
+        if scorer is None or scorer.source is not self.entity_embeddings:
+            scorer = self._scorer = CandidateScorer(self.entity_embeddings)
+        return scorer
+    
+    @staticmethod
+    def _extract_year(props):
+        """从关系属性中提取年份，依次尝试year、since、created_at"""
+        if 'year' in props:
+            return props['year']
+        if 'since' in props:
+            return props['since']
+        if 'created_at' in props:
+            created_at = props['created_at']
+            # 只解析字符串形式的日期；create_relationship写入的DateTime是变更轮询的水位线，不是业务年份
+            if isinstance(created_at, str):
+                try:
+                    return int(created_at.split('-')[0])
+                except ValueError:
+                    pass
+        return None
+    
+    def apply_graph_changes(self, changes):
+        """
+        应用图数据变更（ChangePoller的订阅回调）
+        
+        为新实体和新关系类型初始化嵌入，并把带时间信息的新关系追加到时间数据中。
+        新嵌入在下一次训练前保持随机初始化。
+        """
+        new_rows = []
+        cube_rows = []
+        names = [node['name'] for node in changes.get('nodes', []) if node.get('name') is not None]
+        for node in changes.get('nodes', []):
+            industry = (node.get('properties') or {}).get('industry')
+            if node.get('name') is not None and industry is not None:
+                self.entity_industries[str(node['name'])] = industry
+        for rel in changes.get('relationships', []):
+            names.extend(rel[key] for key in ('start', 'end') if rel.get(key) is not None)
+            year = self._extract_year(rel.get('properties') or {})
+            if year and rel.get('start') is not None and rel.get('end') is not None:
+                new_rows.append((str(rel['start']), rel['type'], str(rel['end']), int(year)))
+                cube_rows.append((self.entity_industries.get(str(rel['start'])), rel['type'], year))
+        
+        # 新名称加入共享词表，并以相同的初始向量补齐到本模型的嵌入表
+        self.entity_embeddings, self.relationship_embeddings = self.embedding_store.update(
+            self.entity_embeddings, self.relationship_embeddings,
+            [str(name) for name in names], [rel['type'] for rel in changes.get('relationships', [])]
+        )
+        self.existing_edges.add_many(
+            (str(rel['start']), rel['type'], str(rel['end'])) for rel in changes.get('relationships', [])
+            if rel.get('start') is not None and rel.get('end') is not None
+        )
+        self.trend_cube.add(cube_rows)
+        
+        return self.temporal_store.extend(new_rows)
+    
+    def relationships_between(self, entity, start_year=None, end_year=None, relationship=None):
+        """
+        实体作为头实体在某一时间区间（含两端）内的历史关系
+        
+        Args:
+            entity: 实体名称
+            start_year: 起始年份，None表示不限
+            end_year: 结束年份，None表示不限
+            relationship: 关系类型，None表示全部关系类型
+        
+        Returns:
+            [{'relationship', 'target', 'year'}, ...]，按年份升序
+        """
+        store = self.temporal_store
+        if relationship is None:
+            rel_types = [rel_type for rel_type, _ in store.relationship_counts(entity)]
+        else:
+            rel_types = [relationship]
+        
+        results = []
+        for rel_type in rel_types:
+            targets, years = store.targets(entity, rel_type, start_year=start_year, end_year=end_year)
+            results.extend({'relationship': rel_type, 'target': target, 'year': int(year)}
+                           for target, year in zip(targets, years))
+        results.sort(key=lambda item: item['year'])
+        return results
+    
+    def relationships_as_of(self, entity, year, relationship=None):
+        """实体作为头实体在year（含）及之前的历史关系，返回格式同relationships_between"""
+        return self.relationships_between(entity, end_year=year, relationship=relationship)
     
     def predict_future_relationships(self, entity, future_years=5, top_k=5):
         """预测实体未来可能发生的关系"""
@@ -96,90 +215,104 @@ class ExtrapolationModel:
         predictions = []
         current_year = datetime.now().year
         future_year = current_year + future_years
+        scorer = self._get_scorer()
         
-        # 分析实体的历史行为模式
-        entity_history = self.temporal_df[self.temporal_df['head'] == entity]
+        # 分析实体的历史行为模式：各关系类型的出现次数
+        rel_counts = self.temporal_store.relationship_counts(entity)
         
         # 计算实体在不同关系类型上的活跃度
-        if not entity_history.empty:
-            rel_counts = entity_history['relationship'].value_counts()
+        if rel_counts:
             # 对每种关系类型，预测可能的目标实体
-            for rel_type, count in rel_counts.items():
+            for rel_type, count in rel_counts:
                 if rel_type not in self.relationship_embeddings:
                     continue
                 
-                # 基于历史行为和嵌入相似性进行预测
-                rel_predictions = self._predict_relationship_target(entity, rel_type, future_year)
+                # 基于历史行为和嵌入相似性进行预测，每种关系只需保留前top_k个
+                rel_predictions = self._predict_relationship_target(entity, rel_type, future_year,
+                                                                    top_k=top_k, scorer=scorer)
                 predictions.extend(rel_predictions)
         else:
             # 如果没有历史数据，使用一般的嵌入相似性
-            for rel_type, rel_emb in self.relationship_embeddings.items():
-                # 简单的基于嵌入的预测
-                entity_emb = self.entity_embeddings[entity]
-                for target_entity, target_emb in self.entity_embeddings.items():
-                    if target_entity == entity:
-                        continue
-                    
-                    # 检查关系是否已存在
-                    existing = self.graph_manager.query_relationship_between_entities(entity, target_entity)
-                    if not any(r['relationship'] == rel_type for r in existing):
-                        # 计算预测分数
-                        similarity = cosine_similarity([entity_emb + rel_emb], [target_emb])[0][0]
-                        predictions.append({
-                            'source': entity,
-                            'relationship': rel_type,
-                            'target': target_entity,
-                            'predicted_year': future_year,
-                            'confidence': float(similarity),
-                            'reason': '基于语义相似度的预测'
-                        })
+            predictions = self._predict_by_similarity(entity, future_year, top_k, scorer)
         
         # 按置信度排序，返回top_k个预测
         predictions.sort(key=lambda x: x['confidence'], reverse=True)
         return predictions[:top_k]
     
-    def _predict_relationship_target(self, entity, relationship_type, future_year):
-        """预测特定关系类型的目标实体"""
-        predictions = []
+    def _excluded_targets(self, entity, relationship_type, scorer):
+        """不参与预测的候选实体掩码：实体自身和已存在该关系的实体"""
+        excluded = scorer.mask(self.existing_edges.neighbors(entity, relationship_type))
+        row = scorer.index.get(entity)
+        if row is not None:
+            excluded[row] = True
+        return excluded
+    
+    def _predict_by_similarity(self, entity, future_year, top_k, scorer):
+        """
+        没有历史数据时的预测：全部关系类型与全部候选实体一次矩阵乘法打分
+        
+        每种关系的查询向量为 实体嵌入 + 关系嵌入，分数为它与候选实体嵌入的余弦相似度。
+        """
+        rel_types = list(self.relationship_embeddings)
+        if not rel_types or not len(scorer):
+            return []
+        
+        entity_emb = self.entity_embeddings[entity]
+        queries = np.stack([entity_emb + self.relationship_embeddings[rel_type] for rel_type in rel_types])
+        scores = scorer.similarities(queries)
+        for row, rel_type in enumerate(rel_types):
+            scores[row, self._excluded_targets(entity, rel_type, scorer)] = -np.inf
+        
+        rows, columns = np.unravel_index(scorer.top_k(scores, top_k), scores.shape)
+        return [{
+            'source': entity,
+            'relationship': rel_types[row],
+            'target': scorer.names[column],
+            'predicted_year': future_year,
+            'confidence': float(scores[row, column]),
+            'reason': '基于语义相似度的预测'
+        } for row, column in zip(rows, columns)]
+    
+    def _predict_relationship_target(self, entity, relationship_type, future_year, top_k=None, scorer=None):
+        """
+        预测特定关系类型的目标实体
+        
+        全部候选实体一次计算两种相似度：与历史目标平均嵌入的相似度（模式相似度），
+        以及与 实体嵌入 + 关系嵌入 的相似度（平移相似度），按0.6和0.4加权。
+        实体自身、历史目标和已存在该关系的实体不参与预测。
+        
+        Args:
+            top_k: 返回前k个预测，None表示返回全部候选
+            scorer: 批量打分器，默认使用当前实体嵌入的打分器
+        """
+        scorer = scorer or self._get_scorer()
         entity_emb = self.entity_embeddings[entity]
         rel_emb = self.relationship_embeddings[relationship_type]
         
         # 分析历史目标实体的特征
-        entity_history = self.temporal_df[(self.temporal_df['head'] == entity) & 
-                                         (self.temporal_df['relationship'] == relationship_type)]
-        
-        if not entity_history.empty:
-            # 获取历史目标实体的嵌入
-            history_targets = entity_history['tail'].tolist()
-            if history_targets:
-                # 计算历史目标实体的平均嵌入
-                history_embs = np.array([self.entity_embeddings[t] for t in history_targets if t in self.entity_embeddings])
-                if len(history_embs) > 0:
-                    avg_history_emb = np.mean(history_embs, axis=0)
-                    
-                    # 寻找与历史目标实体相似的其他实体
-                    for target_entity, target_emb in self.entity_embeddings.items():
-                        if target_entity == entity or target_entity in history_targets:
-                            continue
-                        
-                        # 检查关系是否已存在
-                        existing = self.graph_manager.query_relationship_between_entities(entity, target_entity)
-                        if not any(r['relationship'] == relationship_type for r in existing):
-                            # 综合得分：与历史模式的相似度 + 基于嵌入模型的预测
-                            pattern_similarity = cosine_similarity([target_emb], [avg_history_emb])[0][0]
-                            embedding_similarity = cosine_similarity([entity_emb + rel_emb], [target_emb])[0][0]
-                            combined_score = 0.6 * pattern_similarity + 0.4 * embedding_similarity
-                            
-                            predictions.append({
-                                'source': entity,
-                                'relationship': relationship_type,
-                                'target': target_entity,
-                                'predicted_year': future_year,
-                                'confidence': float(combined_score),
-                                'reason': f'基于{relationship_type}历史模式的预测'
-                            })
-        
-        return predictions
+        history_targets, _ = self.temporal_store.targets(entity, relationship_type)
+        
+        # 计算历史目标实体的平均嵌入
+        history_embs = [self.entity_embeddings[t] for t in history_targets if t in self.entity_embeddings]
+        if not history_embs or not len(scorer):
+            return []
+        avg_history_emb = np.mean(history_embs, axis=0)
+        
+        # 综合得分：与历史模式的相似度 + 基于嵌入模型的预测
+        queries = np.stack([avg_history_emb, entity_emb + rel_emb])
+        pattern_similarity, embedding_similarity = scorer.similarities(queries)
+        scores = 0.6 * pattern_similarity + 0.4 * embedding_similarity
+        excluded = self._excluded_targets(entity, relationship_type, scorer) | scorer.mask(history_targets)
+        scores[excluded] = -np.inf
+        
+        return [{
+            'source': entity,
+            'relationship': relationship_type,
+            'target': scorer.names[column],
+            'predicted_year': future_year,
+            'confidence': float(scores[column]),
+            'reason': f'基于{relationship_type}历史模式的预测'
+        } for column in scorer.top_k(scores, len(scores) if top_k is None else top_k)]
     
     def predict_market_trend(self, industry, future_years=5, top_k=5):
         """预测特定行业的市场趋势"""
@@ -191,122 +324,171 @@ class ExtrapolationModel:
             self.logger.warning(f"未找到行业 '{industry}' 的公司")
             return []
         
+        # 行业内全部公司一起打分，预测目标限定为同行业的公司
         company_names = [c['company'] for c in companies]
-        trend_predictions = []
-        future_year = datetime.now().year + future_years
-        
-        # 分析行业内的关系模式
-        for company in company_names:
-            if company in self.entity_embeddings:
-                # 预测该公司在行业内的未来行为
-                predictions = self.predict_future_relationships(company, future_years, top_k=3)
-                for pred in predictions:
-                    # 只考虑行业内的关系
-                    if pred['target'] in company_names:
-                        trend_predictions.append({
-                            'industry': industry,
-                            'prediction': f"{pred['source']} 可能在 {pred['predicted_year']} 年与 {pred['target']} 建立 {pred['relationship']} 关系",
-                            'confidence': pred['confidence'],
-                            'reason': pred['reason'],
-                            'participants': [pred['source'], pred['target']]
-                        })
-        
-        # 按置信度排序
-        trend_predictions.sort(key=lambda x: x['confidence'], reverse=True)
-        return trend_predictions[:top_k]
+        return self.trend_engine.predict(industry, company_names, future_years=future_years, top_k=top_k)
     
-    def train(self, epochs=10, learning_rate=0.01):
-        """训练时间感知嵌入模型"""
-        if not self.temporal_data:
+    def train(self, epochs=10, learning_rate=0.01, batch_size=1024, num_negatives=4, margin=1.0):
+        """
+        训练时间感知嵌入模型
+        
+        实体和关系嵌入放在两个稀疏更新的嵌入表中，时间样本编码为下标张量，每个样本的时间权重在训练前一次算好。
+        每轮打乱样本后按小批量训练，损失为带时间权重的TransE间隔损失，负样本随机替换尾实体。
+        
+        Args:
+            epochs: 训练轮数
+            learning_rate: 学习率
+            batch_size: 小批量大小
+            num_negatives: 每个样本的负样本数
+            margin: 间隔损失的间隔
+        """
+        import torch
+        import torch.nn as nn
+        import torch.optim as optim
+        
+        if not len(self.temporal_store):
             self.logger.warning("没有时间数据可供训练")
             return
         
-        # 将嵌入转换为PyTorch张量
-        entity_params = {}
-        for entity, emb in self.entity_embeddings.items():
-            entity_params[entity] = nn.Parameter(torch.tensor(emb, dtype=torch.float32))
+        entity_names = list(self.entity_embeddings)
+        rel_names = list(self.relationship_embeddings)
+        entity_rows = {name: i for i, name in enumerate(entity_names)}
+        rel_rows = {name: i for i, name in enumerate(rel_names)}
         
-        rel_params = {}
-        for rel, emb in self.relationship_embeddings.items():
-            rel_params[rel] = nn.Parameter(torch.tensor(emb, dtype=torch.float32))
+        # 时间数据的编码映射到嵌入表的行号，不在嵌入表中的样本跳过
+        store = self.temporal_store
+        heads, rels, tails, years = store.columns()
+        entity_lookup = np.array([entity_rows.get(name, -1) for name in store.entities], dtype=np.int64)
+        rel_lookup = np.array([rel_rows.get(name, -1) for name in store.relationships], dtype=np.int64)
+        heads, rels, tails = entity_lookup[heads], rel_lookup[rels], entity_lookup[tails]
+        valid = (heads >= 0) & (rels >= 0) & (tails >= 0)
+        heads, rels, tails, years = heads[valid], rels[valid], tails[valid], years[valid]
+        if len(heads) == 0:
+            self.logger.warning("时间数据中的实体和关系不在嵌入表中，跳过训练")
+            return
         
-        # 创建优化器
-        parameters = list(entity_params.values()) + list(rel_params.values())
-        optimizer = optim.Adam(parameters, lr=learning_rate)
+        # 时间衰减因子：越近期的数据权重越高
+        min_year, max_year = int(years.min()), int(years.max())
+        time_weights = 1.0 - (max_year - years) / (max_year - np.minimum(min_year, years - 10))
+        time_weights = np.clip(time_weights, 0.1, 1.0)
         
-        # 定义带时间权重的损失函数
-        def temporal_loss(head, rel, tail, year, max_year):
-            # 时间衰减因子：越近期的数据权重越高
-            time_weight = 1.0 - (max_year - year) / (max_year - min(self.temporal_df['year'].min(), year - 10))
-            time_weight = max(0.1, min(1.0, time_weight))
-            
-            # 基本的TransE损失
-            score = torch.norm(head + rel - tail, dim=1)
-            weighted_loss = time_weight * torch.mean(score)
-            return weighted_loss
+        heads, rels, tails = torch.from_numpy(heads), torch.from_numpy(rels), torch.from_numpy(tails)
+        time_weights = torch.tensor(time_weights, dtype=torch.float32)
         
-        # 获取最大年份
-        max_year = self.temporal_df['year'].max() if not self.temporal_df.empty else datetime.now().year
+        # 嵌入表只更新每个批次涉及的行
+        entity_table = nn.Embedding.from_pretrained(
+            torch.tensor(self.entity_embeddings.rows(entity_names), dtype=torch.float32),
+            freeze=False, sparse=True
+        )
+        rel_table = nn.Embedding.from_pretrained(
+            torch.tensor(self.relationship_embeddings.rows(rel_names), dtype=torch.float32),
+            freeze=False, sparse=True
+        )
+        optimizer = optim.SparseAdam(list(entity_table.parameters()) + list(rel_table.parameters()), lr=learning_rate)
         
-        self.logger.info(f"开始训练时间感知模型，共 {len(self.temporal_data)} 个时间样本")
+        num_samples = len(heads)
+        self.logger.info(f"开始训练时间感知模型，共 {num_samples} 个时间样本，批大小 {batch_size}")
         
         for epoch in range(epochs):
-            total_loss = 0
+            start_time = time.perf_counter()
+            total_loss = 0.0
+            permutation = torch.randperm(num_samples)
             
-            for _, row in self.temporal_df.iterrows():
-                head, rel, tail, year = row['head'], row['relationship'], row['tail'], row['year']
+            for start in range(0, num_samples, batch_size):
+                batch = permutation[start:start + batch_size]
+                translated = entity_table(heads[batch]) + rel_table(rels[batch])
                 
-                if head in entity_params and rel in rel_params and tail in entity_params:
-                    # 计算损失
-                    loss = temporal_loss(
-                        entity_params[head].unsqueeze(0),
-                        rel_params[rel].unsqueeze(0),
-                        entity_params[tail].unsqueeze(0),
-                        year,
-                        max_year
-                    )
-                    
-                    # 反向传播和优化
-                    optimizer.zero_grad()
-                    loss.backward()
-                    optimizer.step()
-                    
-                    total_loss += loss.item()
-            
-            # 更新嵌入字典
-            for entity, param in entity_params.items():
-                self.entity_embeddings[entity] = param.detach().numpy()
-            
-            for rel, param in rel_params.items():
-                self.relationship_embeddings[rel] = param.detach().numpy()
+                # 正样本距离 (B,) 与负样本距离 (B, num_negatives)
+                positive = torch.norm(translated - entity_table(tails[batch]), dim=1)
+                negative_tails = torch.randint(0, len(entity_names), (len(batch), num_negatives))
+                negative = torch.norm(translated.unsqueeze(1) - entity_table(negative_tails), dim=2)
+                
+                losses = torch.relu(margin + positive.unsqueeze(1) - negative).mean(dim=1)
+                loss = (time_weights[batch] * losses).mean()
+                
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+                total_loss += loss.item() * len(batch)
             
-            self.logger.info(f"Epoch {epoch+1}/{epochs}, 平均损失: {total_loss/len(self.temporal_data):.6f}")
+            elapsed = time.perf_counter() - start_time
+            self.logger.info(f"Epoch {epoch+1}/{epochs}, 平均损失: {total_loss/num_samples:.6f}, "
+                             f"{num_samples/elapsed:.0f} 三元组/秒")
+        
+        # 训练结果写入本模型的新表后整体替换，训练期间新增的实体保留原有嵌入
+        entity_embeddings = EmbeddingTable(entity_names, entity_table.weight.detach().numpy(), entity_rows)
+        relationship_embeddings = EmbeddingTable(rel_names, rel_table.weight.detach().numpy(), rel_rows)
+        current_entities, current_relationships = self.entity_embeddings, self.relationship_embeddings
+        self.entity_embeddings = entity_embeddings.extended(current_entities, current_entities.rows)
+        self.relationship_embeddings = relationship_embeddings.extended(current_relationships,
+                                                                        current_relationships.rows)
+    
+    def predict_industry_activity(self, industry, future_years=5, top_k=5):
+        """
+        预测行业内各关系类型未来每年的数量
+        
+        基于行业趋势统计（TrendCube）的最近十年线性趋势，不逐个公司打分。
+        
+        Returns:
+            [{'industry', 'relationship', 'slope', 'history', 'forecast', 'trend'}]，按预测总量降序
+        """
+        results = self.trend_cube.forecast(industry, future_years=future_years, top_k=top_k,
+                                           current_year=datetime.now().year)
+        if not results:
+            self.logger.warning(f"行业 '{industry}' 没有带时间的关系数据")
+        return results
     
     def save_model(self, filepath):
-        """保存模型"""
-        import pickle
-        with open(filepath, 'wb') as f:
-            pickle.dump({
-                'entity_embeddings': self.entity_embeddings,
-                'relationship_embeddings': self.relationship_embeddings,
-                'temporal_data': self.temporal_data,
-                'embedding_dim': self.embedding_dim
-            }, f)
-        self.logger.info(f"模型已保存到 {filepath}")
+        """
+        保存模型到目录
+        
+        实体和关系嵌入各保存为一个float32的.npy矩阵和按行排列的名称文件（格式见EmbeddingTable.save_many），
+        时间数据保存为temporal_data.json，记录格式与旧版模型文件中的temporal_data一致。
+        """
+        try:
+            os.makedirs(filepath, exist_ok=True)
+            with open(os.path.join(filepath, 'temporal_data.json'), 'w', encoding='utf-8') as f:
+                json.dump(self.temporal_store.to_records(), f, ensure_ascii=False)
+            EmbeddingTable.save_many(filepath, {
+                'entities': self.entity_embeddings,
+                'relationships': self.relationship_embeddings
+            }, model='extrapolation', embedding_dim=self.embedding_dim, temporal_data='temporal_data.json')
+            self.logger.info(f"模型已保存到 {filepath}")
+            return True
+        except Exception as e:
+            self.logger.error(f"保存模型失败: {str(e)}")
+            return False
     
-    def load_model(self, filepath):
-        """加载模型"""
-        import pickle
+    def load_model(self, filepath, mmap=True):
+        """
+        从目录加载模型，嵌入矩阵默认以只读内存映射方式打开
+        
+        filepath是文件时按旧版pickle格式读取。
+        """
         try:
-            with open(filepath, 'rb') as f:
-                data = pickle.load(f)
-                self.entity_embeddings = data['entity_embeddings']
-                self.relationship_embeddings = data['relationship_embeddings']
-                self.temporal_data = data['temporal_data']
+            if os.path.isfile(filepath):
+                import pickle
+                with open(filepath, 'rb') as f:
+                    data = pickle.load(f)
                 self.embedding_dim = data['embedding_dim']
-                # 重新构建DataFrame
-                if self.temporal_data:
-                    self.temporal_df = pd.DataFrame(self.temporal_data)
+                entity_embeddings = EmbeddingTable.from_dict(data['entity_embeddings'], self.embedding_dim)
+                relationship_embeddings = EmbeddingTable.from_dict(data['relationship_embeddings'], self.embedding_dim)
+                temporal_data = data['temporal_data']
+            else:
+                tables, manifest = EmbeddingTable.load_many(filepath, mmap=mmap)
+                self.embedding_dim = manifest['embedding_dim']
+                entity_embeddings, relationship_embeddings = tables['entities'], tables['relationships']
+                with open(os.path.join(filepath, manifest['temporal_data']), encoding='utf-8') as f:
+                    temporal_data = json.load(f)
+            
+            # 重新构建时间数据索引
+            temporal_store = TemporalStore()
+            temporal_store.extend(
+                (row['head'], row['relationship'], row['tail'], row['year']) for row in temporal_data
+            )
+            self.entity_embeddings = entity_embeddings
+            self.relationship_embeddings = relationship_embeddings
+            self.temporal_store = temporal_store
             self.logger.info(f"从 {filepath} 加载模型成功")
             return True
         except Exception as e:
@@ -0,0 +1,145 @@
+from datetime import datetime
+import logging
+import numpy as np
+from .candidate_scorer import CandidateScorer
+
+class ForecastEngine:
+    """
+    实体未来关系的按年预测
+    
+    实体对全部关系类型、全部候选实体的得分一次算出：平移相似度是 (关系类型, 维度) × (维度, 候选实体)
+    的一次矩阵乘法，有历史记录的关系类型的模式相似度也合并为一次矩阵乘法，打分规则与
+    ExtrapolationModel.predict_future_relationships一致。之后按得分一次取出 top_k × future_years
+    个预测，得分越高的预测排在越近的年份，每年top_k个；置信度按距今年数乘以decay的幂次衰减。
+    
+    返回 (predictions_by_year, relationship_stats, general_insights)，即web_interface外推页面所用的结构。
+    """
+    def __init__(self, model, decay=0.85):
+        """
+        初始化预测引擎
+        
+        Args:
+            model: ExtrapolationModel实例，提供嵌入、时间数据和已有关系
+            decay: 置信度的年衰减系数，第h年的置信度乘以 decay ** (h - 1)
+        """
+        self.model = model
+        self.decay = decay
+        self.logger = logging.getLogger(__name__)
+    
+    @staticmethod
+    def empty_result(message):
+        """没有预测结果时返回的结构"""
+        return {}, {'labels': [], 'data': [], 'history': []}, message
+    
+    def forecast(self, entity, future_years=5, top_k=5):
+        """
+        预测实体未来每年可能建立的关系
+        
+        Args:
+            entity: 实体名称
+            future_years: 预测未来的年数
+            top_k: 每年返回的预测数
+        
+        Returns:
+            (predictions_by_year, relationship_stats, general_insights)
+            predictions_by_year: {年份: [{'confidence', 'source_entity', 'relationship_type', 'target_entity', 'evidence'}]}
+            relationship_stats: {'labels': 关系类型列表, 'data': 各关系类型的预测数, 'history': 各关系类型的历史次数}
+            general_insights: 趋势总结文本
+        """
+        model = self.model
+        if entity not in model.entity_embeddings:
+            self.logger.warning(f"实体 '{entity}' 不在模型中")
+            return self.empty_result(f"知识图谱中没有实体 '{entity}' 的嵌入，无法进行外推预测。")
+        
+        scorer = model._get_scorer()
+        store = model.temporal_store
+        history_counts = dict(store.relationship_counts(entity))
+        rel_types = [rel_type for rel_type in model.relationship_embeddings
+                     if not history_counts or rel_type in history_counts]
+        
+        # 有历史记录的实体只预测历史中出现过且历史目标有嵌入的关系类型
+        history = {}
+        for rel_type in list(rel_types):
+            if not history_counts:
+                break
+            targets, years = store.targets(entity, rel_type)
+            embs = [model.entity_embeddings[t] for t in targets if t in model.entity_embeddings]
+            if embs:
+                history[rel_type] = (targets, years, np.mean(embs, axis=0))
+            else:
+                rel_types.remove(rel_type)
+        if not rel_types or not len(scorer):
+            return self.empty_result(f"{entity} 没有可用于外推预测的关系数据。")
+        
+        # 平移相似度：(关系类型, 候选实体)
+        entity_emb = model.entity_embeddings[entity]
+        rel_matrix = np.stack([model.relationship_embeddings[rel_type] for rel_type in rel_types])
+        translation = scorer.similarities(entity_emb[None, :] + rel_matrix)
+        scores = translation.copy()
+        pattern = np.zeros_like(scores)
+        if history:
+            rows = [row for row, rel_type in enumerate(rel_types) if rel_type in history]
+            pattern[rows] = scorer.similarities(np.stack([history[rel_types[row]][2] for row in rows]))
+            scores[rows] = 0.6 * pattern[rows] + 0.4 * translation[rows]
+        
+        # 排除实体自身、历史目标和已存在该关系的实体
+        for row, rel_type in enumerate(rel_types):
+            excluded = model._excluded_targets(entity, rel_type, scorer)
+            if rel_type in history:
+                excluded |= scorer.mask(history[rel_type][0])
+            scores[row, excluded] = -np.inf
+        
+        # 一次取出全部年份的预测，第i个预测属于第 i // top_k + 1 年
+        top = CandidateScorer.top_k(scores, top_k * future_years)
+        rows, columns = np.unravel_index(top, scores.shape)
+        horizons = np.arange(len(top)) // top_k
+        confidences = np.maximum(scores[rows, columns], 0.0) * self.decay ** horizons
+        
+        current_year = datetime.now().year
+        predictions_by_year = {current_year + h: [] for h in range(1, future_years + 1)}
+        predicted_counts = dict.fromkeys(rel_types, 0)
+        for row, column, horizon, confidence in zip(rows, columns, horizons, confidences):
+            rel_type = rel_types[row]
+            predicted_counts[rel_type] += 1
+            predictions_by_year[current_year + int(horizon) + 1].append({
+                'confidence': float(confidence),
+                'source_entity': entity,
+                'relationship_type': rel_type,
+                'target_entity': scorer.names[column],
+                'evidence': self._evidence(entity, rel_type, history.get(rel_type), float(pattern[row, column]),
+                                           float(translation[row, column]), int(horizon))
+            })
+        
+        labels = [rel_type for rel_type in rel_types if predicted_counts[rel_type]]
+        relationship_stats = {
+            'labels': labels,
+            'data': [predicted_counts[rel_type] for rel_type in labels],
+            'history': [history_counts.get(rel_type, 0) for rel_type in labels]
+        }
+        return predictions_by_year, relationship_stats, self._insights(entity, future_years, relationship_stats,
+                                                                        history_counts)
+    
+    def _evidence(self, entity, rel_type, history, pattern, translation, horizon):
+        """一条预测的支持依据"""
+        evidence = []
+        if history is not None:
+            targets, years, _ = history
+            evidence.append(f"{entity}历史上有{len(targets)}次{rel_type}关系，最近一次在{int(years[-1])}年")
+            evidence.append(f"与历史{rel_type}目标的模式相似度为{pattern:.2f}")
+        else:
+            evidence.append(f"{entity}没有带时间的历史关系，基于语义相似度预测")
+        evidence.append(f"嵌入平移相似度为{translation:.2f}")
+        if horizon:
+            evidence.append(f"预测距今{horizon + 1}年，置信度按每年{self.decay}的系数衰减")
+        return evidence
+    
+    @staticmethod
+    def _insights(entity, future_years, relationship_stats, history_counts):
+        """整体趋势总结"""
+        if not relationship_stats['labels']:
+            return f"{entity}在未来{future_years}年内没有可预测的新关系。"
+        top_index = int(np.argmax(relationship_stats['data']))
+        top_relation = relationship_stats['labels'][top_index]
+        basis = f"历史上共有{sum(history_counts.values())}条带时间的关系" if history_counts else "没有带时间的历史关系"
+        return f"{entity}{basis}。基于预测分析，{entity}在未来{future_years}年内最可能发生的关系类型是{top_relation}。" \
+               f"近期的预测置信度较高，远期预测的不确定性随年份增加。"
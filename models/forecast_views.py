@@ -0,0 +1,250 @@
+from collections import Counter
+import copy
+import logging
+import threading
+import time
+
+class ForecastViews:
+    """
+    趋势和外推预测的物化视图
+    
+    后台线程定期预先计算全部行业的趋势预测（predict_market_trend）和查询次数最多的前N个
+    实体的按年预测（ForecastEngine.forecast），结果存放在以 (类型, 实体或行业, future_years, top_k)
+    为键的表中，请求命中时直接返回。每次刷新在新表上完成后连同版本号整体替换，读取方不会看到
+    刷新到一半的表。
+    
+    刷新是增量的：已知实体之间、已知类型的新关系只把两端的实体及其所属行业标记为需要重算，
+    其余条目沿用上一版本的结果。新实体和新关系类型会进入每个预测的候选集合，所有条目都可能变化，
+    此时与模型重新训练后调用invalidate_all一样全部重算。
+    """
+    INDUSTRY_QUERY = """
+    MATCH (c:Company)
+    WHERE c.industry IS NOT NULL
+    RETURN c.industry AS industry, collect(c.name) AS companies
+    """
+    
+    def __init__(self, model, refresh_interval=300.0, top_entities=100, view_params=((5, 5),),
+                 max_tracked=10000):
+        """
+        初始化物化视图
+        
+        Args:
+            model: ExtrapolationModel实例
+            refresh_interval: 后台刷新间隔（秒）
+            top_entities: 预先计算的实体预测数量（按查询次数取前N个）
+            view_params: 为每个行业预先计算的 (future_years, top_k) 组合
+            max_tracked: 查询计数最多跟踪的键数，超出时全部计数减半并丢弃归零的键
+        """
+        self.model = model
+        self.refresh_interval = refresh_interval
+        self.top_entities = top_entities
+        self.view_params = tuple(view_params)
+        self.max_tracked = max_tracked
+        self.logger = logging.getLogger(__name__)
+        
+        # (版本号, {键: 结果})，整体替换
+        self._views = (0, {})
+        self._query_counts = Counter()
+        self._company_industry = {}
+        # 上次刷新时模型的关系类型，出现新类型时全部重算
+        self._relationship_types = set()
+        
+        # 需要重算的条目
+        self._dirty_entities = set()
+        self._dirty_industries = set()
+        self._full_refresh = True
+        
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        
+        # 运行统计
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.last_refresh_seconds = None
+        self.last_recomputed = 0
+    
+    @property
+    def version(self):
+        """当前视图的版本号，每次刷新加一"""
+        return self._views[0]
+    
+    def get(self, kind, name, future_years, top_k):
+        """
+        读取视图并记录一次查询
+        
+        Args:
+            kind: 'industry'或'entity'
+            name: 行业名称或实体名称
+        
+        Returns:
+            预先计算的结果（副本），未命中时返回None
+        """
+        key = (kind, name, future_years, top_k)
+        with self._lock:
+            self._query_counts[key] += 1
+            if len(self._query_counts) > self.max_tracked:
+                self._decay_counts()
+        result = self._views[1].get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy.deepcopy(result)
+    
+    def _decay_counts(self):
+        """
+        全部计数减半并丢弃归零的键，直到跟踪的键数不超过max_tracked的一半（调用方持有_lock）
+        
+        只出现过一次的键（包括不存在的实体名）最先被丢弃，持续被查询的键保留相对次序。
+        """
+        counts = self._query_counts
+        while len(counts) > self.max_tracked // 2:
+            counts = Counter({key: count // 2 for key, count in counts.items() if count > 1})
+        self._query_counts = counts
+    
+    def mark_changed(self, changes):
+        """
+        标记图数据变更涉及的实体和行业（ChangePoller的订阅回调）
+        
+        Args:
+            changes: {'nodes': [...], 'relationships': [...]}
+        """
+        # 新实体成为所有实体预测的候选（新关系类型在刷新时按模型的关系集合检查）
+        candidates_changed = any(node.get('name') is not None for node in changes.get('nodes', []))
+        
+        entities = set()
+        industries = set()
+        for node in changes.get('nodes', []):
+            if node.get('name') is not None:
+                entities.add(str(node['name']))
+            industry = (node.get('properties') or {}).get('industry')
+            if industry is not None:
+                industries.add(industry)
+        for rel in changes.get('relationships', []):
+            entities.update(str(rel[key]) for key in ('start', 'end') if rel.get(key) is not None)
+        
+        company_industry = self._company_industry
+        industries.update(company_industry[name] for name in entities if name in company_industry)
+        with self._lock:
+            self._full_refresh = self._full_refresh or candidates_changed
+            self._dirty_entities |= entities
+            self._dirty_industries |= industries
+    
+    def invalidate_all(self):
+        """下次刷新时重算全部条目（模型重新训练后调用）"""
+        with self._lock:
+            self._full_refresh = True
+    
+    def _load_industries(self):
+        """一次查询取回全部行业及其公司"""
+        rows = self.model.graph_manager.neo4j_manager.execute_query(self.INDUSTRY_QUERY) or []
+        return {row['industry']: row['companies'] for row in rows}
+    
+    def refresh(self):
+        """
+        刷新视图：重算被标记的条目和新增的条目，其余条目沿用上一版本
+        
+        Returns:
+            本次重算的条目数
+        """
+        with self._refresh_lock:
+            start_time = time.perf_counter()
+            with self._lock:
+                full = self._full_refresh
+                dirty_entities, dirty_industries = self._dirty_entities, self._dirty_industries
+                self._full_refresh = False
+                self._dirty_entities, self._dirty_industries = set(), set()
+                popular = [key for key, _ in self._query_counts.most_common()]
+            
+            try:
+                # 与变更通知的先后无关：只要模型的关系集合与上次刷新时不同就全部重算
+                relationship_types = set(self.model.relationship_embeddings)
+                full = full or relationship_types != self._relationship_types
+                self._relationship_types = relationship_types
+                industries = self._load_industries()
+                self._company_industry = {
+                    name: industry for industry, companies in industries.items() for name in companies
+                }
+                
+                wanted = {('industry', industry, future_years, top_k)
+                          for industry in industries for future_years, top_k in self.view_params}
+                wanted.update(key for key in popular if key[0] == 'industry' and key[1] in industries)
+                wanted.update([key for key in popular if key[0] == 'entity'][:self.top_entities])
+                
+                version, views = self._views
+                new_views = {}
+                recomputed = 0
+                for key in wanted:
+                    kind, name, future_years, top_k = key
+                    dirty = name in (dirty_industries if kind == 'industry' else dirty_entities)
+                    if not full and not dirty and key in views:
+                        new_views[key] = views[key]
+                        continue
+                    if kind == 'industry':
+                        new_views[key] = self.model.trend_engine.predict(
+                            name, industries[name], future_years=future_years, top_k=top_k
+                        )
+                    else:
+                        new_views[key] = self.model.forecast_engine.forecast(
+                            name, future_years=future_years, top_k=top_k
+                        )
+                    recomputed += 1
+            except Exception:
+                # 刷新失败时恢复标记，下次刷新重试
+                with self._lock:
+                    self._full_refresh = self._full_refresh or full
+                    self._dirty_entities |= dirty_entities
+                    self._dirty_industries |= dirty_industries
+                raise
+            
+            self._views = (version + 1, new_views)
+            self.refreshes += 1
+            self.last_recomputed = recomputed
+            self.last_refresh_seconds = time.perf_counter() - start_time
+            self.logger.info(f"预测视图刷新完成（版本 {version + 1}），重算 {recomputed}/{len(new_views)} 个条目，"
+                             f"耗时 {self.last_refresh_seconds:.2f} 秒")
+            return recomputed
+    
+    def _run(self):
+        """后台刷新线程：启动后立即刷新一次，之后按间隔刷新"""
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                self.logger.error(f"刷新预测视图失败: {str(e)}")
+            if self._stop.wait(self.refresh_interval):
+                break
+    
+    def start(self):
+        """启动后台刷新"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='forecast-view-refresher', daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        """停止后台刷新"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def get_stats(self):
+        """获取视图统计信息"""
+        total = self.hits + self.misses
+        version, views = self._views
+        return {
+            'version': version,
+            'entries': len(views),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'tracked_keys': len(self._query_counts),
+            'refreshes': self.refreshes,
+            'last_recomputed': self.last_recomputed,
+            'last_refresh_seconds': self.last_refresh_seconds
+        }
@@ -1,46 +1,53 @@
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-import torch
-import torch.nn as nn
-import torch.optim as optim
 import logging
+import os
+from .embedding_store import EmbeddingStore, EmbeddingTable
 
 class InterpolationModel:
-    def __init__(self, graph_manager, embedding_dim=128):
-        """初始化内推模型"""
+    def __init__(self, graph_manager, embedding_dim=128, embedding_store=None):
+        """
+        初始化内推模型
+        
+        Args:
+            graph_manager: 知识图谱管理器
+            embedding_dim: 嵌入维度，传入embedding_store时以其维度为准
+            embedding_store: 与外推模型共享的词表和初始嵌入，默认单独读取
+        """
         self.graph_manager = graph_manager
-        self.embedding_dim = embedding_dim
         self.logger = logging.getLogger(__name__)
+        self.embedding_store = embedding_store or EmbeddingStore(embedding_dim).load_vocabulary(graph_manager)
+        self.embedding_dim = self.embedding_store.embedding_dim
         
-        # 初始化实体和关系的嵌入
-        self.entity_embeddings = {}
-        self.relationship_embeddings = {}
+        # 实体和关系的嵌入（EmbeddingTable），训练前引用共享表
+        self.entity_embeddings = self.embedding_store.entities
+        self.relationship_embeddings = self.embedding_store.relationships
         
         # 构建嵌入模型
         self._build_embeddings()
     
     def _build_embeddings(self):
         """构建实体和关系的嵌入"""
-        # 获取所有实体
-        entities = self.graph_manager.get_all_entities(limit=1000)
-        for entity_data in entities:
-            if isinstance(entity_data, dict) and 'properties' in entity_data:
-                entity_id = entity_data['properties'].get('name', str(entity_data['properties'].get('id', 'unknown')))
-                # 为每个实体创建随机嵌入
-                self.entity_embeddings[entity_id] = np.random.normal(0, 0.1, self.embedding_dim)
-        
-        # 获取所有关系类型
-        relationships = self.graph_manager.get_all_relationships(limit=100)
-        for rel_data in relationships:
-            if isinstance(rel_data, dict) and 'relationship_type' in rel_data:
-                rel_type = rel_data['relationship_type']
-                # 为每个关系类型创建随机嵌入
-                self.relationship_embeddings[rel_type] = np.random.normal(0, 0.1, self.embedding_dim)
-        
         self.logger.info(f"构建了 {len(self.entity_embeddings)} 个实体嵌入和 {len(self.relationship_embeddings)} 个关系嵌入")
     
+    def apply_graph_changes(self, changes):
+        """
+        应用图数据变更（ChangePoller的订阅回调）
+        
+        新实体和新关系类型加入共享词表，新嵌入在下一次训练前保持随机初始化。
+        """
+        names = [node['name'] for node in changes.get('nodes', []) if node.get('name') is not None]
+        for rel in changes.get('relationships', []):
+            names.extend(rel[key] for key in ('start', 'end') if rel.get(key) is not None)
+        # 新表整体替换，其他线程遍历嵌入表时不会遇到大小变化
+        self.entity_embeddings, self.relationship_embeddings = self.embedding_store.update(
+            self.entity_embeddings, self.relationship_embeddings,
+            [str(name) for name in names], [rel['type'] for rel in changes.get('relationships', [])]
+        )
+    
     def predict_missing_relationships(self, entity, top_k=5):
         """预测与给定实体可能存在的缺失关系"""
+        from sklearn.metrics.pairwise import cosine_similarity
+        
         if entity not in self.entity_embeddings:
             self.logger.warning(f"实体 '{entity}' 不在嵌入模型中")
             return []
@@ -48,19 +55,26 @@ class InterpolationModel:
         entity_emb = self.entity_embeddings[entity]
         predictions = []
         
+        # 所有候选实体对的已有关系通过一次批量查询取回
+        loader = self.graph_manager.dataloader()
+        loader.prefetch_relationship_between(
+            (entity, target_entity) for target_entity in self.entity_embeddings if target_entity != entity
+        )
+        
         # 对每个可能的目标实体和关系类型进行预测
         for target_entity, target_emb in self.entity_embeddings.items():
             if target_entity == entity:  # 跳过自身
                 continue
             
+            # 检查这种关系是否已经存在
+            existing_rels = loader.query_relationship_between_entities(entity, target_entity)
+            
             for rel_type, rel_emb in self.relationship_embeddings.items():
                 # 使用简单的评分函数：实体嵌入 + 关系嵌入 与 目标实体嵌入的相似度
                 # 这是TransE模型的简化版本
                 predicted_target = entity_emb + rel_emb
                 similarity = cosine_similarity([predicted_target], [target_emb])[0][0]
                 
-                # 检查这种关系是否已经存在
-                existing_rels = self.graph_manager.query_relationship_between_entities(entity, target_entity)
                 if not any(r['relationship'] == rel_type for r in existing_rels):
                     predictions.append({
                         'source': entity,
@@ -75,6 +89,8 @@ class InterpolationModel:
     
     def predict_related_entities(self, entity, relationship_type, top_k=5):
         """预测与给定实体存在特定关系的其他实体"""
+        from sklearn.metrics.pairwise import cosine_similarity
+        
         if entity not in self.entity_embeddings:
             self.logger.warning(f"实体 '{entity}' 不在嵌入模型中")
             return []
@@ -89,6 +105,9 @@ class InterpolationModel:
         # 预测目标实体的嵌入
         predicted_target_emb = entity_emb + rel_emb
         
+        # 已有关系与候选实体无关，只需查询一次
+        existing_rels = self.graph_manager.query_entities_relationships(entity, relationship_type) or []
+        
         # 计算与所有其他实体的相似度
         similarities = []
         for target_entity, target_emb in self.entity_embeddings.items():
@@ -98,7 +117,6 @@ class InterpolationModel:
             similarity = cosine_similarity([predicted_target_emb], [target_emb])[0][0]
             
             # 检查这种关系是否已经存在
-            existing_rels = self.graph_manager.query_entities_relationships(entity, relationship_type)
             if not any(r['related_entity'] == target_entity for r in existing_rels):
                 similarities.append({
                     'entity': entity,
@@ -113,17 +131,21 @@ class InterpolationModel:
     
     def train(self, epochs=10, learning_rate=0.01):
         """训练嵌入模型（简化版）"""
+        import torch
+        import torch.nn as nn
+        import torch.optim as optim
+        
         # 收集训练数据：已知的三元组 (head, relation, tail)
         training_data = []
         
         # 查询所有关系作为训练数据
         for rel_type in self.relationship_embeddings.keys():
             query = f"MATCH (h)-[r:{rel_type}]->(t) RETURN h.name AS head, t.name AS tail"
-            results = self.graph_manager.neo4j_manager.execute_query(query)
+            rows = self.graph_manager.neo4j_manager.stream_query(query, as_tuples=True)
             
-            for result in results:
-                if result['head'] in self.entity_embeddings and result['tail'] in self.entity_embeddings:
-                    training_data.append((result['head'], rel_type, result['tail']))
+            for head, tail in rows:
+                if head in self.entity_embeddings and tail in self.entity_embeddings:
+                    training_data.append((head, rel_type, tail))
         
         if not training_data:
             self.logger.warning("没有找到训练数据")
@@ -181,40 +203,74 @@ class InterpolationModel:
                     
                     total_loss += loss.item()
             
-            # 更新嵌入字典
-            for entity, param in entity_emb_tensor.items():
-                self.entity_embeddings[entity] = param.detach().numpy()
-            
-            for rel, param in rel_emb_tensor.items():
-                self.relationship_embeddings[rel] = param.detach().numpy()
+            # 训练结果写入本模型的新表后整体替换，训练期间新增的实体保留原有嵌入
+            entity_embeddings = EmbeddingTable(
+                list(entity_emb_tensor), np.stack([param.detach().numpy() for param in entity_emb_tensor.values()])
+            )
+            relationship_embeddings = EmbeddingTable(
+                list(rel_emb_tensor), np.stack([param.detach().numpy() for param in rel_emb_tensor.values()])
+            )
+            current_entities, current_relationships = self.entity_embeddings, self.relationship_embeddings
+            self.entity_embeddings = entity_embeddings.extended(current_entities, current_entities.rows)
+            self.relationship_embeddings = relationship_embeddings.extended(current_relationships,
+                                                                            current_relationships.rows)
             
             self.logger.info(f"Epoch {epoch+1}/{epochs}, 平均损失: {total_loss/len(training_data):.6f}")
     
     def save_embeddings(self, filepath):
-        """保存嵌入到文件"""
-        import pickle
-        with open(filepath, 'wb') as f:
-            pickle.dump({
-                'entity_embeddings': self.entity_embeddings,
-                'relationship_embeddings': self.relationship_embeddings,
-                'embedding_dim': self.embedding_dim
-            }, f)
-        self.logger.info(f"嵌入已保存到 {filepath}")
+        """
+        保存嵌入到目录
+        
+        实体和关系嵌入各保存为一个float32的.npy矩阵和按行排列的名称文件，并写入manifest.json，
+        格式见EmbeddingTable.save_many。
+        """
+        try:
+            EmbeddingTable.save_many(filepath, {
+                'entities': self.entity_embeddings,
+                'relationships': self.relationship_embeddings
+            }, model='interpolation', embedding_dim=self.embedding_dim)
+            self.logger.info(f"嵌入已保存到 {filepath}")
+            return True
+        except Exception as e:
+            self.logger.error(f"保存嵌入失败: {str(e)}")
+            return False
     
-    def load_embeddings(self, filepath):
-        """从文件加载嵌入"""
-        import pickle
+    def load_embeddings(self, filepath, mmap=True):
+        """
+        从目录加载嵌入，矩阵默认以只读内存映射方式打开
+        
+        filepath是文件时按旧版pickle格式读取。
+        """
         try:
-            with open(filepath, 'rb') as f:
-                data = pickle.load(f)
-                self.entity_embeddings = data['entity_embeddings']
-                self.relationship_embeddings = data['relationship_embeddings']
-                self.embedding_dim = data['embedding_dim']
+            if os.path.isfile(filepath):
+                self._load_pickle(filepath)
+            else:
+                tables, manifest = EmbeddingTable.load_many(filepath, mmap=mmap)
+                self.embedding_dim = manifest['embedding_dim']
+                self.entity_embeddings = tables['entities']
+                self.relationship_embeddings = tables['relationships']
             self.logger.info(f"从 {filepath} 加载嵌入成功")
             return True
         except Exception as e:
             self.logger.error(f"加载嵌入失败: {str(e)}")
             return False
+    
+    def _load_pickle(self, filepath):
+        """读取旧版pickle格式的嵌入文件"""
+        import pickle
+        with open(filepath, 'rb') as f:
+            data = pickle.load(f)
+        self.embedding_dim = data['embedding_dim']
+        self.entity_embeddings = EmbeddingTable.from_dict(data['entity_embeddings'], self.embedding_dim)
+        self.relationship_embeddings = EmbeddingTable.from_dict(data['relationship_embeddings'], self.embedding_dim)
+    
+    def save_model(self, filepath):
+        """保存模型（与save_embeddings相同，供QAEngine.save_models调用）"""
+        return self.save_embeddings(filepath)
+    
+    def load_model(self, filepath, mmap=True):
+        """加载模型（与load_embeddings相同，供QAEngine.load_models调用）"""
+        return self.load_embeddings(filepath, mmap=mmap)
 
 # 测试代码
 if __name__ == "__main__":
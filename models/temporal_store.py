@@ -0,0 +1,168 @@
+import threading
+import numpy as np
+
+class TemporalStore:
+    """
+    带时间信息的关系三元组存储
+    
+    实体和关系类型编码为整数，头实体、关系、尾实体、年份四列各存为一个int32数组，
+    按 (头实体, 关系, 年份) 排序，并为每个头实体预计算行偏移（CSR格式）：
+    取一个实体的历史只需一次偏移查找，某个关系的尾实体再在该实体的行内二分查找，
+    耗时与三元组总数无关。追加数据时在新数组上重新排序并计算偏移，完成后整体替换，
+    并发读取的线程始终看到一致的快照。
+    """
+    def __init__(self):
+        """初始化空存储"""
+        self.entities = []
+        self.entity_ids = {}
+        self.relationships = []
+        self.relationship_ids = {}
+        self._lock = threading.Lock()
+        
+        empty = np.empty(0, dtype=np.int32)
+        # (头实体, 关系, 尾实体, 年份, 头实体行偏移)，整体替换
+        self._columns = (empty, empty, empty, empty, np.zeros(1, dtype=np.int64))
+    
+    def __len__(self):
+        return len(self._columns[0])
+    
+    @staticmethod
+    def _encode(value, ids, values):
+        """取value的整数编码，新值追加到编码表末尾"""
+        code = ids.get(value)
+        if code is None:
+            code = len(values)
+            values.append(value)
+            ids[value] = code
+        return code
+    
+    def extend(self, rows):
+        """
+        追加三元组
+        
+        Args:
+            rows: [(头实体, 关系, 尾实体, 年份), ...]
+        
+        Returns:
+            追加的行数
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        
+        with self._lock:
+            encoded = np.array([
+                (self._encode(head, self.entity_ids, self.entities),
+                 self._encode(relationship, self.relationship_ids, self.relationships),
+                 self._encode(tail, self.entity_ids, self.entities),
+                 int(year))
+                for head, relationship, tail, year in rows
+            ], dtype=np.int32)
+            
+            heads, rels, tails, years, _ = self._columns
+            heads = np.concatenate([heads, encoded[:, 0]])
+            rels = np.concatenate([rels, encoded[:, 1]])
+            tails = np.concatenate([tails, encoded[:, 2]])
+            years = np.concatenate([years, encoded[:, 3]])
+            
+            order = np.lexsort((years, rels, heads))
+            heads, rels, tails, years = heads[order], rels[order], tails[order], years[order]
+            offsets = np.searchsorted(heads, np.arange(len(self.entities) + 1))
+            self._columns = (heads, rels, tails, years, offsets)
+        return len(rows)
+    
+    def _head_range(self, head, columns):
+        """head作为头实体的行范围"""
+        head_id = self.entity_ids.get(head)
+        offsets = columns[4]
+        if head_id is None or head_id + 1 >= len(offsets):
+            return 0, 0
+        return int(offsets[head_id]), int(offsets[head_id + 1])
+    
+    def has_history(self, head):
+        """head是否有作为头实体的历史记录"""
+        start, end = self._head_range(head, self._columns)
+        return end > start
+    
+    def relationship_counts(self, head):
+        """
+        head作为头实体的各关系类型的出现次数
+        
+        Returns:
+            [(关系类型, 次数), ...]，按次数降序
+        """
+        columns = self._columns
+        start, end = self._head_range(head, columns)
+        if start == end:
+            return []
+        codes, counts = np.unique(columns[1][start:end], return_counts=True)
+        order = np.argsort(-counts, kind='stable')
+        return [(self.relationships[codes[i]], int(counts[i])) for i in order]
+    
+    def targets(self, head, relationship, start_year=None, end_year=None):
+        """
+        head经relationship指向的历史尾实体
+        
+        Args:
+            start_year: 起始年份（含），None表示不限
+            end_year: 结束年份（含），None表示不限
+        
+        Returns:
+            (尾实体名称列表, 年份数组)，按年份升序
+        """
+        columns = self._columns
+        start, end = self._head_range(head, columns)
+        rel_id = self.relationship_ids.get(relationship)
+        if start == end or rel_id is None:
+            return [], np.empty(0, dtype=np.int32)
+        
+        rels = columns[1][start:end]
+        low = start + int(np.searchsorted(rels, rel_id, side='left'))
+        high = start + int(np.searchsorted(rels, rel_id, side='right'))
+        # 同一 (头实体, 关系) 的行按年份排序，时间范围再做一次二分查找
+        run_start, years = low, columns[3][low:high]
+        if start_year is not None:
+            low = run_start + int(np.searchsorted(years, start_year, side='left'))
+        if end_year is not None:
+            high = max(low, run_start + int(np.searchsorted(years, end_year, side='right')))
+        return [self.entities[code] for code in columns[2][low:high]], columns[3][low:high]
+    
+    def year_range(self):
+        """全部记录的 (最早年份, 最晚年份)，没有记录时返回None"""
+        years = self._columns[3]
+        if len(years) == 0:
+            return None
+        return int(years.min()), int(years.max())
+    
+    def columns(self):
+        """
+        当前快照的编码列
+        
+        Returns:
+            (头实体编码, 关系编码, 尾实体编码, 年份)，编码分别对应entities和relationships中的下标
+        """
+        heads, rels, tails, years, _ = self._columns
+        return heads, rels, tails, years
+    
+    def rows(self):
+        """按 (头实体, 关系, 尾实体, 年份) 逐行迭代"""
+        heads, rels, tails, years, _ = self._columns
+        for head, rel, tail, year in zip(heads, rels, tails, years):
+            yield self.entities[head], self.relationships[rel], self.entities[tail], int(year)
+    
+    def to_records(self):
+        """导出为 [{'head', 'relationship', 'tail', 'year'}, ...]，与模型文件中的格式一致"""
+        return [
+            {'head': head, 'relationship': relationship, 'tail': tail, 'year': year}
+            for head, relationship, tail, year in self.rows()
+        ]
+    
+    def get_stats(self):
+        """获取存储统计信息"""
+        columns = self._columns
+        return {
+            'rows': len(columns[0]),
+            'entities': len(self.entities),
+            'relationships': len(self.relationships),
+            'column_bytes': sum(column.nbytes for column in columns)
+        }
@@ -0,0 +1,206 @@
+import threading
+import numpy as np
+
+class TrendCube:
+    """
+    行业 × 关系类型 × 年份的关系数量立方体
+    
+    每条带年份的关系按头实体所属行业计入 counts[行业, 关系类型, 年份]，行业和关系类型编码为整数下标，
+    年份按与first_year的差值作为下标。聚合查询是对稠密数组的切片，趋势拟合对全部单元格一次完成：
+    最近window年的最小二乘斜率和均值按 (行业, 关系类型) 向量化计算，结果缓存到下一次写入。
+    写入时在新数组上累加（需要时扩展维度）后整体替换，读取方始终看到一致的快照。
+    """
+    def __init__(self, window=10):
+        """
+        初始化立方体
+        
+        Args:
+            window: 趋势拟合使用的最近年数
+        """
+        self.window = window
+        self.industries = []
+        self.industry_ids = {}
+        self.relationships = []
+        self.relationship_ids = {}
+        self._lock = threading.Lock()
+        
+        # (起始年份, 计数数组)，整体替换
+        self._state = (None, np.zeros((0, 0, 0), dtype=np.int64))
+        self._fit = None
+    
+    def __len__(self):
+        """已计入的关系数"""
+        return int(self._state[1].sum())
+    
+    @staticmethod
+    def _encode(value, ids, values):
+        code = ids.get(value)
+        if code is None:
+            code = len(values)
+            values.append(value)
+            ids[value] = code
+        return code
+    
+    def add(self, rows):
+        """
+        计入带年份的关系
+        
+        Args:
+            rows: [(行业, 关系类型, 年份), ...]
+        
+        Returns:
+            计入的关系数
+        """
+        rows = [(industry, relationship, int(year)) for industry, relationship, year in rows
+                if industry is not None and year is not None]
+        if not rows:
+            return 0
+        
+        with self._lock:
+            industry_codes = np.array([self._encode(row[0], self.industry_ids, self.industries) for row in rows])
+            relationship_codes = np.array([
+                self._encode(row[1], self.relationship_ids, self.relationships) for row in rows
+            ])
+            years = np.array([row[2] for row in rows])
+            
+            first_year, counts = self._state
+            old_first = years.min() if first_year is None else first_year
+            new_first = min(old_first, int(years.min()))
+            new_last = max(old_first + counts.shape[2] - 1, int(years.max()))
+            
+            # 扩展到新的维度，原有计数按年份偏移复制
+            expanded = np.zeros((len(self.industries), len(self.relationships), new_last - new_first + 1),
+                                dtype=np.int64)
+            offset = old_first - new_first
+            expanded[:counts.shape[0], :counts.shape[1], offset:offset + counts.shape[2]] = counts
+            np.add.at(expanded, (industry_codes, relationship_codes, years - new_first), 1)
+            
+            self._state = (new_first, expanded)
+            self._fit = None
+        return len(rows)
+    
+    @staticmethod
+    def _years(state):
+        """某个快照的年份轴"""
+        first_year, counts = state
+        if first_year is None:
+            return np.empty(0, dtype=np.int64)
+        return np.arange(first_year, first_year + counts.shape[2])
+    
+    def years(self):
+        """年份轴"""
+        return self._years(self._state)
+    
+    def series(self, industry, relationship=None):
+        """
+        某个行业每年的关系数量
+        
+        Args:
+            industry: 行业名称
+            relationship: 关系类型，None表示全部关系类型之和
+        
+        Returns:
+            (年份数组, 数量数组)，行业或关系类型不存在时数量全为0
+        """
+        state = self._state
+        first_year, counts = state
+        years = self._years(state)
+        industry_id = self.industry_ids.get(industry)
+        if industry_id is None or industry_id >= counts.shape[0]:
+            return years, np.zeros(len(years), dtype=np.int64)
+        if relationship is None:
+            return years, counts[industry_id].sum(axis=0)
+        relationship_id = self.relationship_ids.get(relationship)
+        if relationship_id is None or relationship_id >= counts.shape[1]:
+            return years, np.zeros(len(years), dtype=np.int64)
+        return years, counts[industry_id, relationship_id]
+    
+    def _fit_trends(self, state):
+        """
+        对一个快照的全部 (行业, 关系类型) 单元格拟合最近window年的线性趋势
+        
+        Args:
+            state: 调用方读取的 (起始年份, 计数数组) 快照，年份轴和计数都取自该快照
+        
+        Returns:
+            (拟合窗口的年份均值, 斜率数组, 均值数组)，斜率和均值的形状为 (行业数, 关系类型数)
+        """
+        fit = self._fit
+        if fit is not None and fit[0] is state:
+            return fit[1:]
+        
+        first_year, counts = state
+        window = counts[:, :, -self.window:].astype(np.float64)
+        x = self._years(state)[-self.window:].astype(np.float64)
+        x_mean = x.mean() if len(x) else 0.0
+        centered = x - x_mean
+        denominator = (centered ** 2).sum()
+        means = window.mean(axis=2) if len(x) else np.zeros(counts.shape[:2])
+        if denominator > 0:
+            slopes = (window - means[:, :, None]) @ centered / denominator
+        else:
+            slopes = np.zeros(counts.shape[:2])
+        
+        self._fit = (state, x_mean, slopes, means)
+        return x_mean, slopes, means
+    
+    def forecast(self, industry, future_years=5, top_k=None, current_year=None):
+        """
+        预测行业内各关系类型未来每年的数量
+        
+        Args:
+            industry: 行业名称
+            future_years: 预测未来的年数
+            top_k: 返回预测总量最大的前k种关系类型，None表示全部
+            current_year: 预测的起始年份（不含），默认使用数据中的最后一年
+        
+        Returns:
+            [{'industry', 'relationship', 'slope', 'history': [{'year', 'count'}], 'forecast': [{'year', 'count'}], 'trend'}]，
+            按预测总量降序
+        """
+        # 拟合、历史和年份轴都取自同一个快照，期间的写入不会造成维度错位
+        state = self._state
+        x_mean, slopes, means = self._fit_trends(state)
+        first_year, counts = state
+        industry_id = self.industry_ids.get(industry)
+        if industry_id is None or industry_id >= counts.shape[0]:
+            return []
+        
+        years = self._years(state)
+        start_year = int(years[-1]) if current_year is None else current_year
+        future = np.arange(start_year + 1, start_year + future_years + 1)
+        # (关系类型, 未来年份) 的预测值，不小于0
+        predicted = np.maximum(means[industry_id, :, None] + slopes[industry_id, :, None] * (future - x_mean), 0.0)
+        
+        order = np.argsort(-predicted.sum(axis=1), kind='stable')
+        if top_k is not None:
+            order = order[:top_k]
+        results = []
+        for relationship_id in order:
+            history = counts[industry_id, relationship_id]
+            if not history.any():
+                continue
+            slope = float(slopes[industry_id, relationship_id])
+            results.append({
+                'industry': industry,
+                'relationship': self.relationships[relationship_id],
+                'slope': slope,
+                'history': [{'year': int(year), 'count': int(count)} for year, count in zip(years, history) if count],
+                'forecast': [{'year': int(year), 'count': float(value)}
+                             for year, value in zip(future, predicted[relationship_id])],
+                'trend': '上升' if slope > 0.05 else '下降' if slope < -0.05 else '平稳'
+            })
+        return results
+    
+    def get_stats(self):
+        """获取立方体统计信息"""
+        state = self._state
+        first_year, counts = state
+        years = self._years(state)
+        return {
+            'industries': counts.shape[0],
+            'relationships': counts.shape[1],
+            'years': [int(years[0]), int(years[-1])] if len(years) else None,
+            'edges': int(counts.sum()),
+            'size_bytes': counts.nbytes
+        }
@@ -0,0 +1,157 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import threading
+import numpy as np
+from .candidate_scorer import CandidateScorer
+
+class TrendEngine:
+    """
+    行业趋势的批量计算
+    
+    行业内的全部公司一起打分，候选目标在打分前就限定为同行业的公司：
+    一块公司对全部关系类型的平移相似度是一次 (公司, 关系, 维度) × (维度, 行业公司) 的矩阵乘法，
+    有历史记录的 (公司, 关系) 的模式相似度也合并为一次矩阵乘法。公司较多时按块分发到线程池
+    （NumPy矩阵乘法执行时释放GIL）。
+    
+    打分规则与ExtrapolationModel.predict_future_relationships一致：有历史记录的公司只预测历史中
+    出现过的关系类型，分数为 0.6 * 模式相似度 + 0.4 * 平移相似度，并排除历史目标；没有历史记录的
+    公司对全部关系类型按平移相似度打分。公司自身和已存在该关系的公司都不参与预测。
+    """
+    def __init__(self, model, max_workers=4, chunk_size=128, per_company=3):
+        """
+        初始化趋势引擎
+        
+        Args:
+            model: ExtrapolationModel实例，提供嵌入、时间数据和已有关系
+            max_workers: 线程池大小
+            chunk_size: 每个任务处理的公司数，行业公司数不超过该值时不使用线程池
+            per_company: 每个公司保留的预测数
+        """
+        self.model = model
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.per_company = per_company
+        self._executor = None
+        self._lock = threading.Lock()
+    
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='trend-engine')
+            return self._executor
+    
+    def close(self):
+        """关闭线程池"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+    
+    def predict(self, industry, companies, future_years=5, top_k=5):
+        """
+        预测行业内公司之间未来可能建立的关系
+        
+        Args:
+            industry: 行业名称
+            companies: 行业内的公司名称列表
+            future_years: 预测未来的年数
+            top_k: 返回前k个预测
+        
+        Returns:
+            趋势预测列表，格式与ExtrapolationModel.predict_market_trend一致
+        """
+        model = self.model
+        scorer = model._get_scorer()
+        targets = [name for name in dict.fromkeys(companies) if name in scorer.index]
+        rel_types = list(model.relationship_embeddings)
+        if len(targets) < 2 or not rel_types:
+            return []
+        
+        target_matrix = scorer.normalized[[scorer.index[name] for name in targets]]
+        rel_matrix = np.stack([model.relationship_embeddings[rel_type] for rel_type in rel_types]).astype(np.float32)
+        context = (targets, target_matrix, rel_types, rel_matrix)
+        
+        chunks = [targets[i:i + self.chunk_size] for i in range(0, len(targets), self.chunk_size)]
+        if len(chunks) == 1:
+            results = [self._score_chunk(chunks[0], context)]
+        else:
+            results = list(self._get_executor().map(lambda chunk: self._score_chunk(chunk, context), chunks))
+        
+        predictions = [prediction for chunk_predictions in results for prediction in chunk_predictions]
+        predictions.sort(key=lambda prediction: prediction[0], reverse=True)
+        
+        future_year = datetime.now().year + future_years
+        return [{
+            'industry': industry,
+            'prediction': f"{source} 可能在 {future_year} 年与 {target} 建立 {rel_type} 关系",
+            'confidence': confidence,
+            'reason': f'基于{rel_type}历史模式的预测' if from_history else '基于语义相似度的预测',
+            'participants': [source, target]
+        } for confidence, source, rel_type, target, from_history in predictions[:top_k]]
+    
+    def _score_chunk(self, sources, context):
+        """
+        为一块公司打分
+        
+        Returns:
+            [(置信度, 公司, 关系类型, 目标公司, 是否基于历史), ...]，每个公司最多per_company个
+        """
+        targets, target_matrix, rel_types, rel_matrix = context
+        model = self.model
+        entity_embeddings = model.entity_embeddings
+        store = model.temporal_store
+        target_index = {name: i for i, name in enumerate(targets)}
+        rel_index = {rel_type: i for i, rel_type in enumerate(rel_types)}
+        
+        # 平移相似度：(公司, 关系, 目标)
+        source_matrix = np.stack([entity_embeddings[name] for name in sources]).astype(np.float32)
+        translated = CandidateScorer.normalize(source_matrix[:, None, :] + rel_matrix[None, :, :])
+        scores = translated @ target_matrix.T
+        
+        # 有历史记录的 (公司, 关系) 的历史目标平均嵌入，稍后一次计算模式相似度
+        history_cells = []
+        history_means = []
+        from_history = np.zeros(len(sources), dtype=bool)
+        for row, source in enumerate(sources):
+            rel_counts = store.relationship_counts(source)
+            if rel_counts:
+                from_history[row] = True
+                allowed = np.zeros(len(rel_types), dtype=bool)
+                for rel_type, _ in rel_counts:
+                    column = rel_index.get(rel_type)
+                    if column is None:
+                        continue
+                    history_targets, _ = store.targets(source, rel_type)
+                    history_embs = [entity_embeddings[t] for t in history_targets if t in entity_embeddings]
+                    if not history_embs:
+                        continue
+                    allowed[column] = True
+                    history_cells.append((row, column))
+                    history_means.append(np.mean(history_embs, axis=0))
+                    excluded = [target_index[t] for t in history_targets if t in target_index]
+                    scores[row, column, excluded] = -np.inf
+                scores[row, ~allowed] = -np.inf
+            
+            # 排除公司自身和已存在该关系的公司
+            self_column = target_index.get(source)
+            if self_column is not None:
+                scores[row, :, self_column] = -np.inf
+            for column, rel_type in enumerate(rel_types):
+                neighbors = model.existing_edges.neighbors(source, rel_type)
+                existing = [target_index[t] for t in neighbors if t in target_index]
+                if existing:
+                    scores[row, column, existing] = -np.inf
+        
+        if history_cells:
+            rows, columns = map(list, zip(*history_cells))
+            pattern = CandidateScorer.normalize(np.stack(history_means)) @ target_matrix.T
+            scores[rows, columns] = 0.6 * pattern + 0.4 * scores[rows, columns]
+        
+        predictions = []
+        flat_scores = scores.reshape(len(sources), -1)
+        for row, source in enumerate(sources):
+            for position in CandidateScorer.top_k(flat_scores[row], self.per_company):
+                column, target = divmod(int(position), len(targets))
+                predictions.append((float(flat_scores[row, position]), source, rel_types[column],
+                                    targets[target], bool(from_history[row])))
+        return predictions
@@ -1,15 +1,56 @@
 from .text_processor import TextProcessor
 from .ac_matcher import ACMatcher
 from .bert_encoder import BertEncoder
+from .bm25_index import BM25Index
+from .span_linker import SpanLinker
+from .result_cache import shared_cache
+from text_index import NGramIndex
+from types import MappingProxyType
+import itertools
+import threading
 import numpy as np
 
+# 预处理器编号，区分共享结果缓存中不同知识库的条目
+_instance_ids = itertools.count()
+
 class QueryPreprocessor:
-    def __init__(self, entities=None, relationships=None):
-        """初始化查询预处理器"""
+    # 参与BM25检索的实体属性及各字段权重
+    ENTITY_DOCUMENT_FIELDS = {'industry': 1.0, 'category': 1.0, 'headquarters': 0.5}
+    ENTITY_NAME_WEIGHT = 2.0
+    
+    def __init__(self, entities=None, relationships=None, retrieval_mode='dense', 
+                 entity_properties=None, candidate_pool=200, cache_bytes=64 * 1024 * 1024,
+                 encoder_loading='eager'):
+        """
+        初始化查询预处理器
+        
+        Args:
+            entities: 实体名称列表
+            relationships: 关系类型列表
+            retrieval_mode: 实体链接方式，'dense'为与全部实体嵌入比较，
+                            'hybrid'为先用BM25召回candidate_pool个候选、再用BERT相似度重排
+            entity_properties: {实体名称: 属性字典}，用于构建BM25文档
+            candidate_pool: hybrid模式下BM25召回的候选数量
+            cache_bytes: 预处理结果缓存（进程内共享）的字节上限，0表示不使用缓存
+            encoder_loading: BERT权重的加载方式，'eager'为立即加载，'lazy'为第一次编码时加载，
+                             'background'为在后台线程中加载
+        """
+        if retrieval_mode not in ('dense', 'hybrid'):
+            raise ValueError(f"不支持的检索方式: {retrieval_mode}")
+        if encoder_loading not in ('eager', 'lazy', 'background'):
+            raise ValueError(f"不支持的编码器加载方式: {encoder_loading}")
+        self.retrieval_mode = retrieval_mode
+        self.candidate_pool = candidate_pool
+        
+        # 知识库版本号，每次增量更新全部完成后递增；片段链接缓存和预处理结果缓存按版本号区分
+        self.kb_generation = 0
+        self._update_lock = threading.Lock()
+        
         # 初始化各个组件
         self.text_processor = TextProcessor()
         self.ac_matcher = ACMatcher()
-        self.bert_encoder = BertEncoder()
+        self.bert_encoder = BertEncoder(lazy=encoder_loading == 'lazy',
+                                        background=encoder_loading == 'background')
         
         # 添加实体和关系到AC自动机
         if entities:
@@ -18,10 +59,36 @@ class QueryPreprocessor:
             self.ac_matcher.add_relationships(relationships)
         self.ac_matcher.build()
         
+        # 实体名n-gram索引，用于按分词结果做部分名称和模糊链接
+        self.entity_index = NGramIndex()
+        self.entity_index.add_many(self.ac_matcher.entities)
+        
         # 预计算实体和关系的嵌入向量
         self.entity_embeddings = None
         self.relationship_embeddings = None
         self._precompute_embeddings()
+        
+        # 实体文档的BM25索引，文档编号与实体下标一致
+        self.entity_documents = BM25Index()
+        self._index_entity_documents(self.ac_matcher.entities, entity_properties)
+        
+        # 片段级实体链接
+        self.span_linker = SpanLinker(self)
+        
+        # 预处理结果缓存，进程内共享，键为 (预处理器编号, 知识库版本, 清理后的查询文本)
+        self.result_cache = shared_cache('preprocess_results', cache_bytes) if cache_bytes else None
+        self._cache_namespace = next(_instance_ids)
+    
+    def _index_entity_documents(self, entities, entity_properties=None):
+        """按实体下标顺序把实体名称和属性写入BM25索引"""
+        entity_properties = entity_properties or {}
+        for entity in entities:
+            properties = entity_properties.get(entity) or {}
+            fields = [(entity, self.ENTITY_NAME_WEIGHT)]
+            fields.extend(
+                (properties.get(field), weight) for field, weight in self.ENTITY_DOCUMENT_FIELDS.items()
+            )
+            self.entity_documents.add_document(fields)
     
     def _precompute_embeddings(self):
         """预计算实体和关系的嵌入向量"""
@@ -30,48 +97,135 @@ class QueryPreprocessor:
         if self.ac_matcher.relationships:
             self.relationship_embeddings = self.bert_encoder.get_batch_embeddings(self.ac_matcher.relationships)
     
-    def update_knowledge_base(self, entities=None, relationships=None):
-        """更新知识库中的实体和关系"""
-        if entities:
-            self.ac_matcher.add_entities(entities)
-        if relationships:
-            self.ac_matcher.add_relationships(relationships)
-        self.ac_matcher.build()
-        self._precompute_embeddings()
+    def _append_embeddings(self, existing, items):
+        """只为新增条目计算嵌入向量，并追加到已有矩阵之后"""
+        if not items:
+            return existing
+        new_embeddings = self.bert_encoder.get_batch_embeddings(items)
+        if existing is None:
+            return new_embeddings
+        return np.vstack([existing, new_embeddings])
+    
+    def update_knowledge_base(self, entities=None, relationships=None, entity_properties=None):
+        """
+        增量更新知识库中的实体和关系
+        
+        已存在的实体和关系会被跳过，只为新增条目计算嵌入向量。
+        更新在副本上完成后再替换，可以在其他线程处理查询的同时调用；并发的更新依次执行。
+        
+        Args:
+            entities: 实体名称列表
+            relationships: 关系类型列表
+            entity_properties: {实体名称: 属性字典}，用于构建新实体的BM25文档
+        
+        Returns:
+            (新增实体列表, 新增关系列表)
+        """
+        with self._update_lock:
+            matcher = self.ac_matcher.copy()
+            added_entities = matcher.add_entities(entities) if entities else []
+            added_relationships = matcher.add_relationships(relationships) if relationships else []
+            if not added_entities and not added_relationships:
+                return added_entities, added_relationships
+            
+            matcher.build()
+            entity_embeddings = self._append_embeddings(self.entity_embeddings, added_entities)
+            relationship_embeddings = self._append_embeddings(self.relationship_embeddings, added_relationships)
+            
+            # 条目只追加不删除，先替换匹配器再替换嵌入矩阵，读取方得到的下标始终有效
+            self.ac_matcher = matcher
+            self.entity_index.add_many(added_entities)
+            self.entity_embeddings = entity_embeddings
+            self.relationship_embeddings = relationship_embeddings
+            # BM25文档最后写入，召回的文档编号在嵌入矩阵中总是存在
+            self._index_entity_documents(added_entities, entity_properties)
+            # 全部结构替换完成后才递增版本号，更新期间计算的缓存结果都记在旧版本号下
+            self.kb_generation += 1
+            return added_entities, added_relationships
+    
+    def apply_graph_changes(self, changes):
+        """
+        应用图数据变更（ChangePoller的订阅回调）
+        
+        Args:
+            changes: {'nodes': [...], 'relationships': [...]}，格式见knowledge_graph.ChangePoller
+        """
+        nodes = [node for node in changes.get('nodes', []) if node.get('name') is not None]
+        entities = [node['name'] for node in nodes]
+        entity_properties = {str(node['name']): node.get('properties') or {} for node in nodes}
+        relationships = []
+        for rel in changes.get('relationships', []):
+            entities.extend(rel[key] for key in ('start', 'end') if rel.get(key) is not None)
+            relationships.append(rel['type'])
+        return self.update_knowledge_base([str(e) for e in entities], relationships, entity_properties)
     
     def preprocess_query(self, query):
-        """预处理用户查询"""
-        # 1. 清理和分词
+        """
+        预处理用户查询
+        
+        分词、匹配、编码和链接都在清理后的文本上进行，清理后相同的查询（只差空白或标点）共享同一份缓存结果，
+        只有original_query按当次请求填写。命中缓存时返回只读映射，其中的列表为元组、数组不可写。
+        """
         cleaned_text = self.text_processor.clean_text(query)
-        tokens = self.text_processor.tokenize(query)
+        if self.result_cache is None:
+            return {'original_query': query, **self._preprocess_query(cleaned_text)}
+        
+        # 先读取版本号再计算，计算期间发生的知识库更新会使该结果在下次读取时失效
+        key = (self._cache_namespace, self.kb_generation, cleaned_text)
+        result = self.result_cache.get(key)
+        if result is None:
+            result = self.result_cache.put(key, self._preprocess_query(cleaned_text))
+        return MappingProxyType({'original_query': query, **result})
+    
+    def get_cache_stats(self):
+        """获取预处理结果缓存、句子嵌入缓存和片段链接缓存的统计信息"""
+        embedding_cache = self.bert_encoder.embedding_cache
+        return {
+            'result_cache': self.result_cache.get_stats() if self.result_cache is not None else {'enabled': False},
+            'embedding_cache': embedding_cache.get_stats() if embedding_cache is not None else {'enabled': False},
+            'span_cache': self.span_linker.get_stats()
+        }
+    
+    def _preprocess_query(self, cleaned_text):
+        """预处理清理后的查询文本（不经过缓存），匹配位置都相对于清理后的文本"""
+        # 1. 分词
+        tokens = self.text_processor.tokenize(cleaned_text)
         
         # 2. 使用AC自动机匹配实体和关系
         matches = self.ac_matcher.extract_entities_and_relationships(cleaned_text)
         
-        # 3. 获取查询的嵌入向量
-        query_embedding = self.bert_encoder.get_sentence_embedding(query)
+        # 3. 查询句与候选片段一起编码（一次批量编码），逐个片段链接实体
+        spans = self.span_linker.candidate_spans(cleaned_text, matches)
+        query_embedding, span_links = self.span_linker.link(cleaned_text, spans)
         
         # 4. 基于相似度进行实体链接
-        entity_links = self._link_entities(query_embedding)
+        entity_links = self._link_entities(query_embedding, query_text=cleaned_text)
+        
+        # 5. 基于n-gram索引的字面实体链接
+        lexical_links = self._link_entities_lexical(tokens)
         
-        # 5. 基于相似度进行关系链接
+        # 6. 基于相似度进行关系链接
         relationship_links = self._link_relationships(query_embedding)
         
         return {
-            'original_query': query,
             'cleaned_text': cleaned_text,
             'tokens': tokens,
             'ac_matches': matches,
             'query_embedding': query_embedding,
             'entity_links': entity_links,
+            'lexical_links': lexical_links,
+            'span_links': span_links,
             'relationship_links': relationship_links
         }
     
-    def _link_entities(self, query_embedding, top_k=3):
-        """基于相似度进行实体链接"""
+    def _link_entities(self, query_embedding, top_k=3, query_text=None):
+        """基于相似度进行实体链接，hybrid模式下只对BM25召回的候选计算相似度"""
         if self.entity_embeddings is None or len(self.ac_matcher.entities) == 0:
             return []
         
+        if self.retrieval_mode == 'hybrid' and query_text is not None:
+            return self._link_entities_hybrid(query_embedding, query_text, top_k)
+        
         indices, similarities = self.bert_encoder.find_most_similar(
             query_embedding, 
             self.entity_embeddings, 
@@ -86,6 +240,51 @@ class QueryPreprocessor:
             for idx, sim in zip(indices, similarities)
         ]
     
+    def _link_entities_hybrid(self, query_embedding, query_text, top_k=3):
+        """两阶段实体链接：BM25召回候选，BERT相似度重排"""
+        entities = self.ac_matcher.entities
+        entity_embeddings = self.entity_embeddings
+        candidates = [
+            (doc_id, score) for doc_id, score in self.entity_documents.search(query_text, self.candidate_pool)
+            if doc_id < len(entity_embeddings)
+        ]
+        if not candidates:
+            return []
+        
+        candidate_ids = np.array([doc_id for doc_id, _ in candidates])
+        indices, similarities = self.bert_encoder.find_most_similar(
+            query_embedding, 
+            entity_embeddings[candidate_ids], 
+            top_k=top_k
+        )
+        
+        return [
+            {
+                'entity': entities[candidate_ids[idx]],
+                'similarity': float(sim),
+                'lexical_score': float(candidates[idx][1])
+            }
+            for idx, sim in zip(indices, similarities)
+        ]
+    
+    def _link_entities_lexical(self, tokens, top_k=3, min_score=0.5):
+        """
+        基于n-gram索引进行实体链接：分词结果作为部分名称查找实体（如"苹果" → "苹果公司"）
+        
+        Returns:
+            [{'entity', 'similarity', 'token'}, ...]，similarity为字面匹配分数
+        """
+        best = {}
+        for token in tokens:
+            if len(token) < 2:
+                continue
+            for entity, score in self.entity_index.lookup(token, limit=top_k, min_score=min_score):
+                if entity not in best or score > best[entity]['similarity']:
+                    best[entity] = {'entity': entity, 'similarity': float(score), 'token': token}
+        
+        links = sorted(best.values(), key=lambda link: link['similarity'], reverse=True)
+        return links[:top_k]
+    
     def _link_relationships(self, query_embedding, top_k=3):
         """基于相似度进行关系链接"""
         if self.relationship_embeddings is None or len(self.ac_matcher.relationships) == 0:
@@ -109,9 +308,16 @@ class QueryPreprocessor:
         """获取最佳匹配的实体和关系组合"""
         preprocessed = self.preprocess_query(query)
         
+        # 合并整句链接、字面链接和各片段的最佳候选，同一实体取较高分数
+        span_best = [span['candidates'][0] for span in preprocessed['span_links'] if span['candidates']]
+        entity_links = {}
+        for link in [*preprocessed['entity_links'], *preprocessed['lexical_links'], *span_best]:
+            if link['entity'] not in entity_links or link['similarity'] > entity_links[link['entity']]['similarity']:
+                entity_links[link['entity']] = link
+        
         # 组合实体和关系
         combinations = []
-        for entity in preprocessed['entity_links']:
+        for entity in entity_links.values():
             for rel in preprocessed['relationship_links']:
                 # 计算组合分数
                 score = (entity['similarity'] + rel['similarity']) / 2
@@ -16,22 +16,40 @@ class ACMatcher:
         self.is_built = False
         self.entities = []
         self.relationships = []
+        self._entity_set = set()
+        self._relationship_set = set()
     
     def add_entities(self, entities):
-        """添加实体到AC自动机"""
+        """添加实体到AC自动机，返回新增的实体（已存在的跳过）"""
+        added = [e for e in dict.fromkeys(entities) if e not in self._entity_set]
         if USE_AHOCORASICK:
-            for i, entity in enumerate(entities):
-                self.automaton.add_word(entity, (i, entity))
-        self.entities.extend(entities)
-        self.is_built = False
+            for entity in added:
+                # 匹配类型随词条保存，增量添加实体和关系时不依赖添加顺序
+                self.automaton.add_word(entity, ('entity', entity))
+        self.entities.extend(added)
+        self._entity_set.update(added)
+        if added:
+            self.is_built = False
+        return added
     
     def add_relationships(self, relationships):
-        """添加关系到AC自动机"""
+        """添加关系到AC自动机，返回新增的关系（已存在的跳过）"""
+        added = [r for r in dict.fromkeys(relationships) if r not in self._relationship_set]
         if USE_AHOCORASICK:
-            for i, rel in enumerate(relationships):
-                self.automaton.add_word(rel, (i + len(self.entities), rel))
-        self.relationships.extend(relationships)
-        self.is_built = False
+            for rel in added:
+                self.automaton.add_word(rel, ('relationship', rel))
+        self.relationships.extend(added)
+        self._relationship_set.update(added)
+        if added:
+            self.is_built = False
+        return added
+    
+    def copy(self):
+        """复制一个包含相同实体和关系的匹配器"""
+        matcher = ACMatcher()
+        matcher.add_entities(self.entities)
+        matcher.add_relationships(self.relationships)
+        return matcher
     
     def build(self):
         """构建AC自动机"""
@@ -46,13 +64,8 @@ class ACMatcher:
                 self.build()
             
             matches = []
-            for end_idx, (idx, matched_str) in self.automaton.iter(text):
+            for end_idx, (match_type, matched_str) in self.automaton.iter(text):
                 start_idx = end_idx - len(matched_str) + 1
-                # 判断是实体还是关系
-                if idx < len(self.entities):
-                    match_type = 'entity'
-                else:
-                    match_type = 'relationship'
                 matches.append({
                     'text': matched_str,
                     'type': match_type,
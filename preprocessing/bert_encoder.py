@@ -1,20 +1,96 @@
-import torch
-from transformers import BertModel, BertTokenizer
+from .result_cache import shared_cache
+import threading
+import time
+import logging
 import numpy as np
 
+logger = logging.getLogger(__name__)
+
 class BertEncoder:
-    def __init__(self, model_name='bert-base-chinese'):
-        """初始化BERT编码器"""
-        self.tokenizer = BertTokenizer.from_pretrained(model_name)
-        self.model = BertModel.from_pretrained(model_name)
-        # 设置为评估模式
-        self.model.eval()
-        # 检查是否有GPU可用
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        self.model.to(self.device)
+    """
+    BERT编码器
+    
+    torch和transformers在加载权重时才导入。lazy=True时权重在第一次编码时加载，
+    background=True时在后台线程中加载，进程可以先开始服务，编码请求会等待加载完成。
+    句子嵌入按 (模型名称, 文本) 缓存在进程内共享的LRU中，同一模型的编码器共用缓存。
+    """
+    def __init__(self, model_name='bert-base-chinese', lazy=False, background=False,
+                 cache_bytes=16 * 1024 * 1024):
+        """
+        初始化BERT编码器
+        
+        Args:
+            model_name: 预训练模型名称或路径
+            lazy: 是否推迟到第一次编码时加载权重
+            background: 是否立即在后台线程中加载权重
+            cache_bytes: 句子嵌入缓存（进程内共享）的字节上限，0表示不使用缓存
+        """
+        self.model_name = model_name
+        self.embedding_cache = shared_cache('sentence_embeddings', cache_bytes) if cache_bytes else None
+        self.tokenizer = None
+        self.model = None
+        self.device = None
+        self.load_seconds = None
+        self.load_error = None
+        self._load_lock = threading.Lock()
+        self._loaded = threading.Event()
+        
+        if background:
+            threading.Thread(target=self._load_in_background, name='bert-encoder-loader', daemon=True).start()
+        elif not lazy:
+            self.load()
+    
+    @property
+    def is_loaded(self):
+        """权重是否已加载"""
+        return self._loaded.is_set()
+    
+    def load(self):
+        """加载分词器和模型权重，重复调用时直接返回"""
+        if self._loaded.is_set():
+            return
+        with self._load_lock:
+            if self._loaded.is_set():
+                return
+            start_time = time.perf_counter()
+            import torch
+            from transformers import BertModel, BertTokenizer
+            
+            self.tokenizer = BertTokenizer.from_pretrained(self.model_name)
+            self.model = BertModel.from_pretrained(self.model_name)
+            # 设置为评估模式
+            self.model.eval()
+            # 检查是否有GPU可用
+            self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+            self.model.to(self.device)
+            
+            self.load_seconds = time.perf_counter() - start_time
+            self.load_error = None
+            self._loaded.set()
+            logger.info(f"BERT模型 {self.model_name} 加载完成，耗时 {self.load_seconds:.2f} 秒")
+    
+    def _load_in_background(self):
+        """后台加载线程，失败时记录错误，第一次编码时会再次尝试加载"""
+        try:
+            self.load()
+        except Exception as e:
+            self.load_error = str(e)
+            logger.error(f"后台加载BERT模型失败: {str(e)}")
+    
+    def get_status(self):
+        """获取加载状态"""
+        return {
+            'model_name': self.model_name,
+            'loaded': self.is_loaded,
+            'load_seconds': self.load_seconds,
+            'error': self.load_error
+        }
     
     def get_word_embedding(self, word):
         """获取单个词的嵌入向量"""
+        import torch
+        self.load()
+        
         # 编码词语
         inputs = self.tokenizer(word, return_tensors='pt', padding=True, truncation=True)
         # 将输入移至相应设备
@@ -28,12 +104,29 @@ class BertEncoder:
         
         return cls_embedding
     
+    def cached_embedding(self, text):
+        """读取句子嵌入缓存，未命中或未启用缓存时返回None"""
+        if self.embedding_cache is None:
+            return None
+        return self.embedding_cache.get((self.model_name, text))
+    
+    def cache_embedding(self, text, embedding):
+        """写入句子嵌入缓存，返回只读的嵌入向量"""
+        if self.embedding_cache is None:
+            return embedding
+        return self.embedding_cache.put((self.model_name, text), embedding)
+    
     def get_sentence_embedding(self, sentence):
-        """获取句子的嵌入向量"""
-        return self.get_word_embedding(sentence)
+        """获取句子的嵌入向量，命中缓存时不再编码（返回的数组不可写）"""
+        embedding = self.cached_embedding(sentence)
+        if embedding is None:
+            embedding = self.cache_embedding(sentence, self.get_word_embedding(sentence))
+        return embedding
     
     def get_batch_embeddings(self, texts, batch_size=32):
         """批量获取文本的嵌入向量"""
+        import torch
+        self.load()
         embeddings = []
         
         for i in range(0, len(texts), batch_size):
@@ -0,0 +1,117 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+import heapq
+import math
+import re
+
+class BM25Index:
+    """
+    实体文档的BM25倒排索引
+    
+    每个实体是一篇文档，由名称和若干属性（行业、类别、总部等）组成，各字段的词频可以分别加权。
+    中文按单字和相邻二字切分，英文和数字按整词切分，不依赖分词词典，公司简称、全称之间的字面重叠都能召回。
+    查询词按文档频率从低到高处理，倒排表超过max_posting的高频词只给已召回的文档补分，
+    单次查询的工作量有上界，不随实体总数增长。
+    """
+    TOKEN_PATTERN = re.compile(r'[a-z0-9]+|[一-鿿]')
+    
+    def __init__(self, k1=1.5, b=0.75, max_posting=10000):
+        """
+        初始化索引
+        
+        Args:
+            k1: 词频饱和参数
+            b: 文档长度归一化参数
+            max_posting: 完整遍历的倒排表最大长度
+        """
+        self.k1 = k1
+        self.b = b
+        self.max_posting = max_posting
+        # postings[词] = (文档编号数组, 词频数组)
+        self.postings = {}
+        self.doc_lengths = array('f')
+        self.total_length = 0.0
+    
+    def __len__(self):
+        return len(self.doc_lengths)
+    
+    @classmethod
+    def analyze(cls, text):
+        """把文本切分为索引词：中文单字和相邻二字、英文和数字整词"""
+        tokens = cls.TOKEN_PATTERN.findall(str(text).lower())
+        terms = list(tokens)
+        for left, right in zip(tokens, tokens[1:]):
+            if len(left) == 1 and len(right) == 1 and left >= '一' and right >= '一':
+                terms.append(left + right)
+        return terms
+    
+    def add_document(self, fields):
+        """
+        添加一篇文档
+        
+        Args:
+            fields: [(文本, 权重), ...]
+        
+        Returns:
+            文档编号（按添加顺序从0开始）
+        """
+        doc_id = len(self.doc_lengths)
+        term_freqs = Counter()
+        for text, weight in fields:
+            if text is None:
+                continue
+            for term in self.analyze(text):
+                term_freqs[term] += weight
+        
+        for term, freq in term_freqs.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = (array('i'), array('f'))
+            posting[0].append(doc_id)
+            posting[1].append(freq)
+        
+        length = float(sum(term_freqs.values()))
+        self.total_length += length
+        self.doc_lengths.append(length)
+        return doc_id
+    
+    def search(self, query, top_n=200):
+        """
+        检索与查询最相关的文档
+        
+        Returns:
+            [(文档编号, BM25分数), ...]，按分数降序
+        """
+        doc_count = len(self.doc_lengths)
+        if doc_count == 0:
+            return []
+        avg_length = self.total_length / doc_count or 1.0
+        
+        terms = [
+            (term, query_freq, self.postings[term])
+            for term, query_freq in Counter(self.analyze(query)).items() if term in self.postings
+        ]
+        terms.sort(key=lambda item: len(item[2][0]))
+        
+        scores = {}
+        for term, query_freq, (doc_ids, freqs) in terms:
+            df = len(doc_ids)
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            if df > self.max_posting and scores:
+                # 高频词：只在倒排表中二分查找已召回的文档
+                matches = []
+                for doc_id in scores:
+                    position = bisect_left(doc_ids, doc_id)
+                    if position < df and doc_ids[position] == doc_id:
+                        matches.append((doc_id, freqs[position]))
+            else:
+                matches = zip(doc_ids, freqs)
+            
+            for doc_id, freq in matches:
+                if doc_id >= doc_count:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + query_freq * idf * freq * (self.k1 + 1) / (freq + norm)
+        
+        return heapq.nlargest(top_n, scores.items(), key=lambda item: item[1])
@@ -0,0 +1,132 @@
+from collections import OrderedDict
+from types import MappingProxyType
+import sys
+import threading
+import numpy as np
+
+def freeze(value):
+    """把预处理结果转换为只读结构：字典转为只读映射，列表转为元组，数组设为不可写"""
+    if isinstance(value, np.ndarray):
+        # 视图会让整个底层数组常驻缓存，复制出独立的数组
+        if value.base is not None:
+            value = value.copy()
+        value.setflags(write=False)
+        return value
+    if isinstance(value, (dict, MappingProxyType)):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+def estimate_size(value):
+    """估计只读结构占用的字节数"""
+    if isinstance(value, np.ndarray):
+        return sys.getsizeof(value) + value.nbytes
+    if isinstance(value, MappingProxyType):
+        return sys.getsizeof(value) + sys.getsizeof(dict(value)) + sum(
+            estimate_size(key) + estimate_size(item) for key, item in value.items()
+        )
+    if isinstance(value, tuple):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+class ResultCache:
+    """
+    按字节数限制容量的LRU缓存，缓存查询预处理结果和句子嵌入
+    
+    缓存值在写入时被转换为只读结构，多个请求共享同一份结果也不会相互影响。
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        """
+        初始化缓存
+        
+        Args:
+            max_bytes: 缓存占用的最大字节数（按估计值计算）
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key):
+        """读取缓存，未命中时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key, value):
+        """
+        写入缓存
+        
+        Returns:
+            只读化后的缓存值
+        """
+        frozen = freeze(value)
+        size = estimate_size(frozen)
+        if size > self.max_bytes:
+            return frozen
+        
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[key] = (frozen, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+        return frozen
+    
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get_stats(self):
+        """获取缓存统计信息"""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'evictions': self.evictions
+        }
+
+# 进程内共享的缓存，按名称区分
+_shared_caches = {}
+_shared_lock = threading.Lock()
+
+def shared_cache(name, max_bytes):
+    """
+    获取进程内共享的缓存：同名缓存在整个进程中只有一个，所有使用方共用同一个字节上限
+    
+    Args:
+        name: 缓存名称
+        max_bytes: 第一次创建时的字节上限，之后的调用沿用已有缓存
+    
+    Returns:
+        ResultCache实例
+    """
+    with _shared_lock:
+        cache = _shared_caches.get(name)
+        if cache is None:
+            cache = _shared_caches[name] = ResultCache(max_bytes=max_bytes)
+        return cache
@@ -0,0 +1,125 @@
+from collections import OrderedDict
+import threading
+
+class SpanLinker:
+    """
+    片段级实体链接
+    
+    整句的嵌入会被句中其他词稀释，这里改为对候选片段逐个链接：AC自动机命中的实体名直接链接，
+    其余名词短语与查询句放在同一个批次里编码（每次查询最多调用一次编码器），再分别与实体嵌入比较。
+    片段的链接结果按 (片段, 知识库版本) 缓存，热门实体名再次出现时无需编码；
+    查询句的嵌入取自编码器的句子嵌入缓存，与知识库版本无关。
+    """
+    def __init__(self, preprocessor, cache_size=4096, top_k=3):
+        """
+        初始化片段链接器
+        
+        Args:
+            preprocessor: QueryPreprocessor实例，提供编码器、实体列表和嵌入矩阵
+            cache_size: 片段链接结果的缓存条目数
+            top_k: 每个片段返回的候选实体数
+        """
+        self.preprocessor = preprocessor
+        self.cache_size = cache_size
+        self.top_k = top_k
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def _kb_version(self):
+        """知识库版本：预处理器的版本号，在嵌入矩阵和BM25索引都更新完成后才递增"""
+        return self.preprocessor.kb_generation
+    
+    def _cache_get(self, key):
+        with self._lock:
+            links = self._cache.get(key)
+            if links is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return links
+    
+    def _cache_put(self, key, links):
+        with self._lock:
+            self._cache[key] = links
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
+    def candidate_spans(self, query, ac_matches):
+        """
+        收集候选片段：AC命中的实体，以及与AC命中不重叠的名词短语
+        
+        Returns:
+            [{'text', 'start', 'end', 'source'}, ...]，source为'ac'或'noun'
+        """
+        spans = [dict(match, source='ac') for match in ac_matches.get('entities', [])]
+        covered = [(match['start'], match['end']) for match in ac_matches.get('all_matches', [])]
+        for span in self.preprocessor.text_processor.noun_spans(query):
+            if any(span['start'] <= end and start <= span['end'] for start, end in covered):
+                continue
+            spans.append(dict(span, source='noun'))
+        spans.sort(key=lambda span: span['start'])
+        return spans
+    
+    def link(self, query, spans):
+        """
+        编码查询句并链接全部片段
+        
+        Args:
+            query: 清理后的查询文本
+            spans: candidate_spans返回的片段列表
+        
+        Returns:
+            (查询句嵌入, 片段链接列表)，每个片段附带candidates: [{'entity', 'similarity'}, ...]
+        """
+        preprocessor = self.preprocessor
+        version = self._kb_version()
+        hybrid = preprocessor.retrieval_mode == 'hybrid'
+        
+        linked = []
+        pending = {}
+        for span in spans:
+            span = dict(span)
+            if span['source'] == 'ac':
+                # AC命中的是知识库中的实体名，直接链接
+                span['candidates'] = [{'entity': span['text'], 'similarity': 1.0}]
+            else:
+                cached = self._cache_get((span['text'], version))
+                if cached is not None:
+                    span['candidates'] = list(cached)
+                else:
+                    pending.setdefault(span['text'], []).append(span)
+            linked.append(span)
+        
+        # 查询句（未命中嵌入缓存时）和未命中缓存的片段一起编码，每次查询最多调用一次编码器
+        encoder = preprocessor.bert_encoder
+        query_embedding = encoder.cached_embedding(query)
+        texts = list(pending) if query_embedding is not None else [query] + list(pending)
+        embeddings = encoder.get_batch_embeddings(texts) if texts else []
+        if query_embedding is None:
+            query_embedding = encoder.cache_embedding(query, embeddings[0])
+            embeddings = embeddings[1:]
+        
+        for text, embedding in zip(pending, embeddings):
+            candidates = preprocessor._link_entities(
+                embedding, top_k=self.top_k, query_text=text if hybrid else None
+            )
+            self._cache_put((text, version), tuple(candidates))
+            for span in pending[text]:
+                span['candidates'] = candidates
+        
+        return query_embedding, linked
+    
+    def get_stats(self):
+        """获取片段缓存统计信息"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._cache),
+            'max_entries': self.cache_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
@@ -1,4 +1,5 @@
 import jieba
+import jieba.posseg as pseg
 import re
 
 class TextProcessor:
@@ -32,6 +33,33 @@ class TextProcessor:
         tokens = [token for token in tokens if token not in self.stopwords and token.strip()]
         return tokens
     
+    # 视为名词的词性：普通名词、人名、地名、机构名、其他专名和英文
+    NOUN_FLAGS = ('n', 'nr', 'ns', 'nt', 'nz', 'eng')
+    
+    def noun_spans(self, text):
+        """
+        提取清理后文本中的名词短语，相邻的名词合并为一个短语（如"苹果"+"公司"）
+        
+        Returns:
+            [{'text', 'start', 'end'}, ...]，end与AC自动机匹配结果一样为闭区间
+        """
+        text = self.clean_text(text)
+        spans = []
+        current = None
+        offset = 0
+        for word, flag in pseg.cut(text):
+            start, offset = offset, offset + len(word)
+            if flag in self.NOUN_FLAGS and word not in self.stopwords and word.strip():
+                if current is not None and current['end'] == start - 1:
+                    current['text'] += word
+                    current['end'] = offset - 1
+                else:
+                    current = {'text': word, 'start': start, 'end': offset - 1}
+                    spans.append(current)
+            else:
+                current = None
+        return spans
+    
     def add_user_dict(self, words):
         """添加用户自定义词典"""
         for word in words:
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+异步Neo4j连接管理器单元测试
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge_graph.async_neo4j_manager import AsyncNeo4jManager
+
+
+class FakeRecord:
+    def __init__(self, row):
+        self.row = row
+    
+    def data(self):
+        return dict(self.row)
+    
+    def values(self):
+        return list(self.row.values())
+    
+    def __getitem__(self, index):
+        return self.values()[index]
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+    
+    async def data(self):
+        return [dict(row) for row in self.rows]
+    
+    async def single(self):
+        return FakeRecord(self.rows[0])
+    
+    async def __aiter__(self):
+        for row in self.rows:
+            yield FakeRecord(row)
+
+
+class FakeAsyncSession:
+    """查询时让出事件循环的异步会话，记录同时进行中的查询数"""
+    
+    def __init__(self, driver, config):
+        self.driver = driver
+        self.config = config
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+    
+    async def run(self, query, parameters=None):
+        if query.startswith('RETURN 1'):
+            return FakeResult([{'count': 1}])
+        self.driver.in_flight += 1
+        self.driver.max_in_flight = max(self.driver.max_in_flight, self.driver.in_flight)
+        await asyncio.sleep(0.01)
+        self.driver.in_flight -= 1
+        return FakeResult([{'query': query, **(parameters or {})}])
+    
+    async def execute_read(self, work, *args):
+        self.driver.transactions.append('read')
+        return await work(self, *args)
+    
+    async def execute_write(self, work, *args):
+        self.driver.transactions.append('write')
+        return await work(self, *args)
+
+
+class FakeAsyncDriver:
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.transactions = []
+        self.closed = False
+    
+    def session(self, **config):
+        return FakeAsyncSession(self, config)
+    
+    async def close(self):
+        self.closed = True
+
+
+class AsyncNeo4jManagerTest(unittest.TestCase):
+    """AsyncNeo4jManager测试类"""
+    
+    def setUp(self):
+        self.driver = FakeAsyncDriver()
+    
+    def _run(self, coroutine_function):
+        async def main():
+            with mock.patch('knowledge_graph.async_neo4j_manager.AsyncGraphDatabase.driver',
+                            return_value=self.driver) as factory:
+                manager = await AsyncNeo4jManager.create(max_connection_pool_size=8)
+            self.assertEqual(factory.call_args.kwargs['max_connection_pool_size'], 8)
+            try:
+                return await coroutine_function(manager)
+            finally:
+                await manager.close()
+        return asyncio.run(main())
+    
+    def test_concurrent_queries(self):
+        """execute_queries并发等待多个查询，结果与输入顺序一致"""
+        async def work(manager):
+            return await manager.execute_queries([("RETURN $i AS i", {'i': i}) for i in range(4)])
+        
+        results = self._run(work)
+        self.assertEqual([rows[0]['i'] for rows in results], [0, 1, 2, 3])
+        self.assertEqual(self.driver.max_in_flight, 4)
+        self.assertEqual(self.driver.transactions, ['read'] * 4)
+        self.assertTrue(self.driver.closed)
+    
+    def test_write_and_stream(self):
+        """写操作走写事务并递增版本号，流式查询产出元组"""
+        async def work(manager):
+            await manager.create_node('Company', {'name': '苹果公司'})
+            rows = [row async for row in manager.stream_query("MATCH (n) RETURN n", {'x': 1}, as_tuples=True)]
+            return manager.generation, rows
+        
+        generation, rows = self._run(work)
+        self.assertEqual(generation, 1)
+        self.assertEqual(self.driver.transactions, ['write'])
+        self.assertEqual(rows, [("MATCH (n) RETURN n", 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BERT编码器延迟加载与后台加载单元测试
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import types
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocessing import QueryPreprocessor
+from preprocessing.bert_encoder import BertEncoder
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fake_transformers(tokenizer_factory):
+    """用不含权重的torch和transformers模块替换sys.modules中的对应模块"""
+    torch = types.ModuleType('torch')
+    torch.cuda = SimpleNamespace(is_available=lambda: False)
+    torch.device = lambda name: name
+    transformers = types.ModuleType('transformers')
+    transformers.BertTokenizer = SimpleNamespace(from_pretrained=tokenizer_factory)
+    transformers.BertModel = SimpleNamespace(from_pretrained=lambda name: mock.MagicMock())
+    return mock.patch.dict(sys.modules, {'torch': torch, 'transformers': transformers})
+
+
+class BertEncoderLoadingTest(unittest.TestCase):
+    """BertEncoder加载方式测试类"""
+    
+    def test_lazy_loads_once_on_first_use(self):
+        """lazy=True时构造不加载权重，并发的首次使用只加载一次"""
+        tokenizer_factory = mock.Mock(return_value=mock.MagicMock())
+        with fake_transformers(tokenizer_factory):
+            encoder = BertEncoder(lazy=True)
+            self.assertFalse(encoder.is_loaded)
+            tokenizer_factory.assert_not_called()
+            
+            threads = [threading.Thread(target=encoder.load) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        
+        self.assertEqual(tokenizer_factory.call_count, 1)
+        status = encoder.get_status()
+        self.assertTrue(status['loaded'])
+        self.assertIsNotNone(status['load_seconds'])
+        self.assertIsNone(status['error'])
+    
+    def test_background_load(self):
+        """background=True时构造立即返回，权重在后台线程中加载"""
+        release = threading.Event()
+        
+        def tokenizer_factory(name):
+            release.wait(2)
+            return mock.MagicMock()
+        
+        with fake_transformers(tokenizer_factory):
+            encoder = BertEncoder(background=True)
+            self.assertFalse(encoder.is_loaded)
+            release.set()
+            self.assertTrue(encoder._loaded.wait(2))
+        self.assertTrue(encoder.get_status()['loaded'])
+    
+    def test_background_failure_retried_on_use(self):
+        """后台加载失败时记录错误，之后的使用会再次尝试加载"""
+        tokenizer_factory = mock.Mock(side_effect=[OSError('模型文件不存在'), mock.MagicMock()])
+        with fake_transformers(tokenizer_factory):
+            with self.assertLogs('preprocessing.bert_encoder', level='ERROR'):
+                encoder = BertEncoder(background=True)
+                for _ in range(200):
+                    if encoder.load_error:
+                        break
+                    threading.Event().wait(0.01)
+            self.assertEqual(encoder.get_status()['error'], '模型文件不存在')
+            self.assertFalse(encoder.is_loaded)
+            
+            encoder.load()
+        self.assertTrue(encoder.is_loaded)
+        self.assertIsNone(encoder.load_error)
+    
+    def test_sentence_embedding_cache_shared(self):
+        """句子嵌入在进程内按 (模型名称, 文本) 缓存，同一模型的编码器共用，返回的数组不可写"""
+        first, second = BertEncoder(lazy=True), BertEncoder(lazy=True)
+        self.assertIs(first.embedding_cache, second.embedding_cache)
+        first.embedding_cache.clear()
+        with mock.patch.object(BertEncoder, 'get_word_embedding', return_value=np.ones(4)) as encode:
+            embedding = first.get_sentence_embedding('苹果公司')
+            self.assertIs(second.get_sentence_embedding('苹果公司'), embedding)
+            self.assertEqual(encode.call_count, 1)
+            BertEncoder(model_name='其他模型', lazy=True).get_sentence_embedding('苹果公司')
+            self.assertEqual(encode.call_count, 2)
+        self.assertFalse(embedding.flags.writeable)
+        self.assertIsNone(BertEncoder(lazy=True, cache_bytes=0).cached_embedding('苹果公司'))
+    
+    def test_preprocessor_encoder_loading(self):
+        """预处理器按encoder_loading创建编码器，没有实体时lazy模式不加载权重"""
+        preprocessor = QueryPreprocessor(encoder_loading='lazy', cache_bytes=0)
+        self.assertFalse(preprocessor.bert_encoder.is_loaded)
+        with self.assertRaises(ValueError):
+            QueryPreprocessor(encoder_loading='later')
+    
+    def test_packages_import_without_heavy_dependencies(self):
+        """导入preprocessing和models时不导入torch、transformers、sklearn和pandas"""
+        code = ("import sys, preprocessing, models; "
+                "print('heavy:', [m for m in ('torch', 'transformers', 'sklearn', 'pandas') if m in sys.modules])")
+        completed = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT, capture_output=True, text=True)
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertIn('heavy: []', completed.stdout.splitlines())
+    
+    def test_preprocessor_does_not_import_knowledge_graph(self):
+        """创建预处理器时不导入knowledge_graph包和neo4j驱动"""
+        code = ("import sys; from preprocessing import QueryPreprocessor; "
+                "QueryPreprocessor(encoder_loading='lazy', cache_bytes=0); "
+                "print('graph:', [m for m in ('knowledge_graph', 'neo4j') if m in sys.modules])")
+        completed = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT, capture_output=True, text=True)
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertIn('graph: []', completed.stdout.splitlines())
+
+
+if __name__ == '__main__':
+    unittest.main()
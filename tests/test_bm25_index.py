@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+实体文档BM25索引单元测试
+"""
+
+import os
+import sys
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocessing.bm25_index import BM25Index
+
+
+class BM25IndexTest(unittest.TestCase):
+    """BM25Index测试类"""
+    
+    def setUp(self):
+        self.index = BM25Index()
+        for name, industry in [('苹果公司', '消费电子'), ('微软公司', '软件'), ('特斯拉', '新能源汽车')]:
+            self.index.add_document([(name, 2.0), (industry, 1.0), (None, 0.5)])
+    
+    def test_analyze(self):
+        """中文切分为单字和相邻二字，英文和数字按整词小写切分"""
+        self.assertEqual(BM25Index.analyze('苹果公司 iPhone 15'),
+                         ['苹', '果', '公', '司', 'iphone', '15', '苹果', '果公', '公司'])
+    
+    def test_search_names_and_properties(self):
+        """名称和属性字段都能召回，结果按分数降序"""
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.search('苹果')[0][0], 0)
+        self.assertEqual([doc_id for doc_id, _ in self.index.search('汽车')], [2])
+        results = self.index.search('微软的软件')
+        self.assertEqual(results[0][0], 1)
+        self.assertTrue(all(a[1] >= b[1] for a, b in zip(results, results[1:])))
+        self.assertEqual(self.index.search('华为'), [])
+        self.assertEqual(len(self.index.search('公司', top_n=1)), 1)
+        self.assertEqual(BM25Index().search('苹果'), [])
+    
+    def test_high_frequency_terms_only_rescore(self):
+        """倒排表超过max_posting的高频词只给已召回的文档补分"""
+        index = BM25Index(max_posting=2)
+        for name in ('苹果公司', '微软公司', '华为公司'):
+            index.add_document([(name, 1.0)])
+        self.assertEqual([doc_id for doc_id, _ in index.search('苹果公司')], [0])
+        # 只有高频词时仍完整遍历
+        self.assertEqual(sorted(doc_id for doc_id, _ in index.search('公司')), [0, 1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+候选实体批量打分单元测试
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.candidate_scorer import CandidateScorer, EdgeSet
+
+
+class CandidateScorerTest(unittest.TestCase):
+    """CandidateScorer和EdgeSet测试类"""
+    
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.embeddings = {f'实体{i}': rng.normal(0, 0.1, 16) for i in range(50)}
+        self.scorer = CandidateScorer(self.embeddings)
+    
+    def test_similarities_match_pairwise_cosine(self):
+        """批量相似度与逐对计算的余弦相似度一致"""
+        query = self.embeddings['实体3'] + self.embeddings['实体7']
+        scores = self.scorer.similarities(query)
+        for name, embedding in self.embeddings.items():
+            expected = np.dot(query, embedding) / np.linalg.norm(query) / np.linalg.norm(embedding)
+            self.assertAlmostEqual(float(scores[self.scorer.index[name]]), expected, places=5)
+    
+    def test_top_k_skips_excluded(self):
+        """top_k按分数降序返回，跳过被排除的位置"""
+        scores = self.scorer.similarities(self.embeddings['实体0'])
+        scores[self.scorer.mask(['实体0', '不存在'])] = -np.inf
+        top = self.scorer.top_k(scores, 5)
+        self.assertEqual(len(top), 5)
+        self.assertNotIn(self.scorer.index['实体0'], top)
+        self.assertTrue(np.all(np.diff(scores[top]) <= 0))
+        self.assertEqual(len(self.scorer.top_k(np.full(3, -np.inf), 2)), 0)
+    
+    def test_edge_set_is_undirected(self):
+        """已有关系按无向处理"""
+        edges = EdgeSet()
+        edges.add_many([('苹果公司', '收购', 'Beats'), ('苹果公司', '合作', 'IBM'), (None, '合作', 'IBM')])
+        self.assertEqual(len(edges), 2)
+        self.assertTrue(edges.contains('Beats', '收购', '苹果公司'))
+        self.assertFalse(edges.contains('苹果公司', '收购', 'IBM'))
+        edges.add('苹果公司', '收购', 'Shazam')
+        self.assertEqual(set(edges.neighbors('苹果公司', '收购')), {'Beats', 'Shazam'})
+
+
+if __name__ == '__main__':
+    unittest.main()
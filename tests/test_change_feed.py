@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+图数据变更轮询器单元测试
+"""
+
+import os
+import re
+import sys
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge_graph.change_feed import ChangePoller
+
+
+class FakeNeo4jManager:
+    """
+    在内存中按ChangePoller的查询参数过滤记录的Neo4j连接管理器
+    
+    created_at用整数秒表示，$since - duration({seconds: $lag}) 对应 since - lag。
+    查询只返回其中按标签（关系类型）匹配的分支所覆盖的记录。
+    """
+    
+    def __init__(self):
+        self.nodes = []
+        self.relationships = []
+        self.queries = 0
+        self.fail = False
+        self.generation = 0
+        self.writes = []
+    
+    def add_node(self, name, created_at, label='Company'):
+        element_id = f'n:{len(self.nodes):04d}'
+        self.nodes.append({'label': label, 'name': name, 'properties': {'name': name},
+                           'created_at': created_at, 'element_id': element_id})
+    
+    def add_relationship(self, start, end, created_at):
+        element_id = f'r:{len(self.relationships):04d}'
+        self.relationships.append({'start_label': 'Company', 'start': start, 'type': '合作', 'end_label': 'Company',
+                                   'end': end, 'properties': {}, 'created_at': created_at, 'element_id': element_id})
+    
+    def bump_generation(self):
+        self.generation += 1
+    
+    def execute_write(self, query, parameters=None):
+        self.writes.append(query)
+        return []
+    
+    def execute_query(self, query, parameters=None):
+        self.queries += 1
+        if self.fail:
+            return None
+        if 'db.labels()' in query:
+            return [{'name': label} for label in dict.fromkeys(row['label'] for row in self.nodes)]
+        if 'db.relationshipTypes()' in query:
+            return [{'name': rel_type} for rel_type in dict.fromkeys(row['type'] for row in self.relationships)]
+        if '[r:' in query:
+            rows = [row for row in self.relationships if row['type'] in re.findall(r'\[r:`([^`]+)`\]', query)]
+        else:
+            rows = [row for row in self.nodes if row['label'] in re.findall(r'\(n:`([^`]+)`\)', query)]
+        rows = [row for row in rows if row['created_at'] is not None]
+        if 'max(' in query:
+            return [{'created_at': max((row['created_at'] for row in rows), default=None)}]
+        
+        parameters = parameters or {}
+        if 'since' in parameters:
+            rows = [row for row in rows if row['created_at'] >= parameters['since'] - parameters['lag']]
+        if 'cursor' in parameters:
+            cursor = (parameters['cursor'], parameters['cursor_id'])
+            rows = [row for row in rows if (row['created_at'], row['element_id']) > cursor]
+        rows.sort(key=lambda row: (row['created_at'], row['element_id']))
+        return [dict(row) for row in rows[:parameters['limit']]]
+
+
+class ChangePollerTest(unittest.TestCase):
+    """ChangePoller测试类"""
+    
+    def setUp(self):
+        self.neo4j_manager = FakeNeo4jManager()
+        self.received = []
+    
+    def make_poller(self, **config):
+        config.setdefault('start_from_latest', False)
+        poller = ChangePoller(self.neo4j_manager, lag=30, **config)
+        poller.subscribe(self.received.append)
+        return poller
+    
+    @staticmethod
+    def names(records):
+        return [record.get('name') or record.get('end') for record in records]
+    
+    def test_watermark_advance(self):
+        """每次轮询只推送上次轮询之后的新数据，水位线推进到最新的created_at"""
+        for i in range(3):
+            self.neo4j_manager.add_node(f'公司{i}', 100 + i)
+        self.neo4j_manager.add_relationship('公司0', '公司1', 101)
+        poller = self.make_poller()
+        
+        changes = poller.poll_once()
+        self.assertEqual(self.names(changes['nodes']), ['公司0', '公司1', '公司2'])
+        self.assertEqual(len(changes['relationships']), 1)
+        self.assertEqual(poller.node_watermark[0], 102)
+        
+        self.assertEqual(poller.poll_once(), {'nodes': [], 'relationships': []})
+        
+        self.neo4j_manager.add_node('公司3', 200)
+        self.neo4j_manager.add_relationship('公司2', '公司3', 200)
+        changes = poller.poll_once()
+        self.assertEqual(self.names(changes['nodes']), ['公司3'])
+        self.assertEqual(self.names(changes['relationships']), ['公司3'])
+        self.assertEqual((poller.node_watermark[0], poller.relationship_watermark[0]), (200, 200))
+        # 只有带来新数据的轮询通知订阅者并使缓存失效
+        self.assertEqual(len(self.received), 2)
+        self.assertEqual(self.neo4j_manager.generation, 2)
+    
+    def test_pagination_and_dedupe(self):
+        """同一时刻写入的数据分多页取回，回看窗口内重复读到的记录不再推送"""
+        for i in range(5):
+            self.neo4j_manager.add_node(f'公司{i}', 100)
+        poller = self.make_poller(batch_size=2)
+        
+        self.assertEqual(self.names(poller.poll_once()['nodes']), [f'公司{i}' for i in range(5)])
+        self.neo4j_manager.add_node('公司5', 101)
+        self.assertEqual(self.names(poller.poll_once()['nodes']), ['公司5'])
+        self.assertEqual(poller.poll_once()['nodes'], [])
+    
+    def test_late_commit(self):
+        """事务开始较早、在轮询之后才提交时，其created_at小于水位线，仍会在下次轮询时推送"""
+        self.neo4j_manager.add_node('公司0', 100)
+        self.neo4j_manager.add_node('公司1', 110)
+        poller = self.make_poller()
+        poller.poll_once()
+        self.assertEqual(poller.node_watermark[0], 110)
+        
+        # 在时刻95开始、轮询之后才提交的事务
+        self.neo4j_manager.add_node('晚提交公司', 95)
+        self.neo4j_manager.add_node('公司2', 120)
+        self.assertEqual(self.names(poller.poll_once()['nodes']), ['晚提交公司', '公司2'])
+        self.assertEqual(poller.poll_once()['nodes'], [])
+    
+    def test_start_from_latest(self):
+        """从最新时间戳开始时不推送已有数据，但仍能取回回看窗口内晚提交的事务"""
+        for i in range(3):
+            self.neo4j_manager.add_node(f'公司{i}', 100 + i)
+        poller = self.make_poller(start_from_latest=True)
+        self.assertEqual(poller.poll_once()['nodes'], [])
+        
+        self.neo4j_manager.add_node('晚提交公司', 90)
+        self.neo4j_manager.add_node('公司3', 103)
+        self.assertEqual(self.names(poller.poll_once()['nodes']), ['晚提交公司', '公司3'])
+    
+    def test_failed_query_retries(self):
+        """查询失败时水位线不变，下次轮询重新取回"""
+        self.neo4j_manager.add_node('公司0', 100)
+        poller = self.make_poller()
+        poller.poll_once()
+        
+        self.neo4j_manager.add_node('公司1', 101)
+        self.neo4j_manager.fail = True
+        self.assertEqual(poller.poll_once()['nodes'], [])
+        self.neo4j_manager.fail = False
+        self.assertEqual(self.names(poller.poll_once()['nodes']), ['公司1'])
+    
+    
+    def test_queries_use_created_at_indexes(self):
+        """每个标签和关系类型先在created_at上建立索引，轮询只按带索引的标签匹配"""
+        self.neo4j_manager.add_node('公司0', 100)
+        self.neo4j_manager.add_relationship('公司0', '公司0', 100)
+        poller = self.make_poller()
+        poller.poll_once()
+        self.assertEqual(self.neo4j_manager.writes, [
+            'CREATE RANGE INDEX IF NOT EXISTS FOR (n:`Company`) ON (n.created_at)',
+            'CREATE RANGE INDEX IF NOT EXISTS FOR ()-[r:`合作`]-() ON (r.created_at)'
+        ])
+        
+        # 新出现的标签在下次轮询时建立索引并被取回
+        self.neo4j_manager.add_node('张三', 101, label='Person')
+        self.assertEqual(self.names(poller.poll_once()['nodes']), ['张三'])
+        self.assertEqual(poller.indexed_labels, ['Company', 'Person'])
+        self.assertEqual(len(self.neo4j_manager.writes), 3)
+        poller.poll_once()
+        self.assertEqual(len(self.neo4j_manager.writes), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+批量查询与请求级数据加载器单元测试
+"""
+
+import os
+import sys
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge_graph.graph_manager import GraphManager
+
+
+class FakeNeo4jManager:
+    """在内存中回答UNWIND批量查询的Neo4j连接管理器，记录每次查询的参数"""
+    
+    def __init__(self, edges):
+        self.edges = edges
+        self.queries = []
+        self.generation = 0
+        self.fail = False
+    
+    def execute_query(self, query, parameters=None):
+        self.queries.append(parameters)
+        if self.fail:
+            return None
+        rows = []
+        if 'pairs' in parameters:
+            for key1, key2 in parameters['pairs']:
+                for head, rel_type, tail in self.edges:
+                    for entity1, entity2 in ((head, tail), (tail, head)):
+                        if key1 in entity1 and key2 in entity2:
+                            rows.append({'key1': key1, 'key2': key2, 'entity1': entity1,
+                                         'relationship': rel_type, 'entity2': entity2, 'rel_properties': {}})
+        else:
+            for key in parameters['keys']:
+                matches = [(head, rel_type, tail) for head, rel_type, tail in self.edges
+                           if key['entity'] in head and key['relationship'] in (None, rel_type)]
+                for head, rel_type, tail in matches[:parameters['limit']]:
+                    rows.append({'key_entity': key['entity'], 'key_relationship': key['relationship'],
+                                 'entity': head, 'relationship': rel_type, 'related_type': 'Company',
+                                 'related_entity': tail, 'rel_properties': {}})
+        return rows
+
+
+class GraphDataLoaderTest(unittest.TestCase):
+    """批量查询与GraphDataLoader测试类"""
+    
+    def setUp(self):
+        self.neo4j_manager = FakeNeo4jManager([
+            ('苹果公司', '合作', '微软公司'),
+            ('苹果公司', '竞争', '三星公司'),
+            ('苹果公司', '合作', '英特尔公司'),
+            ('微软公司', '投资', 'OpenAI'),
+        ])
+        self.graph_manager = GraphManager(self.neo4j_manager, cache_size=0)
+    
+    def test_pairs_batch(self):
+        """多对实体一次查询完成，重复的配对去重，没有关系的配对返回空列表"""
+        results = self.graph_manager.query_relationships_between_entities_batch(
+            [('苹果', '微软'), ('微软公司', '苹果公司'), ('苹果', '微软'), ('三星', 'OpenAI')])
+        self.assertEqual(len(self.neo4j_manager.queries), 1)
+        self.assertEqual(self.neo4j_manager.queries[0]['pairs'], [['苹果', '微软'], ['微软公司', '苹果公司'],
+                                                                 ['三星', 'OpenAI']])
+        self.assertEqual([row['relationship'] for row in results[('苹果', '微软')]], ['合作'])
+        self.assertEqual(results[('微软公司', '苹果公司')][0]['entity1'], '微软公司')
+        self.assertEqual(results[('三星', 'OpenAI')], [])
+    
+    def test_keys_batch(self):
+        """每个键最多返回top_k条记录，关系类型为None时不限类型"""
+        results = self.graph_manager.query_entities_relationships_batch(
+            [('苹果公司', None), ('苹果公司', '合作'), ('微软公司', '投资')], top_k=2)
+        self.assertEqual(len(self.neo4j_manager.queries), 1)
+        self.assertEqual(len(results[('苹果公司', None)]), 2)
+        self.assertEqual([row['related_entity'] for row in results[('苹果公司', '合作')]], ['微软公司', '英特尔公司'])
+        self.assertEqual(results[('微软公司', '投资')][0]['related_entity'], 'OpenAI')
+    
+    def test_batch_failure(self):
+        """查询失败时返回None"""
+        self.neo4j_manager.fail = True
+        self.assertIsNone(self.graph_manager.query_relationships_between_entities_batch([('苹果', '微软')]))
+        self.assertIsNone(self.graph_manager.query_entities_relationships_batch([('苹果', None)]))
+    
+    def test_loader_dispatches_pending_keys_once(self):
+        """登记的键在第一次未命中时合并为一次批量查询，之后直接命中"""
+        loader = self.graph_manager.dataloader()
+        loader.prefetch_relationship_between([('苹果', '微软'), ('苹果', '三星')])
+        loader.prefetch_entities_relationships([('苹果公司', '合作'), ('微软公司', None)])
+        
+        self.assertEqual(loader.query_relationship_between_entities('苹果', '三星')[0]['relationship'], '竞争')
+        self.assertEqual(loader.batches_dispatched, 2)
+        self.assertEqual(len(loader.query_entities_relationships('苹果公司', '合作')), 2)
+        self.assertEqual(loader.query_relationship_between_entities('苹果', '微软')[0]['relationship'], '合作')
+        self.assertEqual(len(self.neo4j_manager.queries), 2)
+        
+        # 未登记的键单独查询一次，不同top_k的键分开查询
+        loader.query_relationship_between_entities('微软', 'OpenAI')
+        loader.prefetch_entities_relationships([('苹果公司', None)], top_k=1)
+        loader.query_entities_relationships('微软公司', '投资', top_k=3)
+        self.assertEqual(len(self.neo4j_manager.queries), 5)
+        self.assertEqual(len(loader.query_entities_relationships('苹果公司', None, top_k=1)), 1)
+        self.assertEqual(len(self.neo4j_manager.queries), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+共享词表与嵌入存储单元测试
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.embedding_store import EmbeddingStore, EmbeddingTable
+
+
+class FakeNeo4jManager:
+    """按elementId游标分页返回节点的Neo4j连接管理器"""
+    
+    def __init__(self, names, relationship_types):
+        self.names = names
+        self.relationship_types = relationship_types
+        self.pages = 0
+    
+    def execute_query(self, query, parameters=None):
+        if 'relationshipTypes' in query:
+            return [{'relationshipType': rel_type} for rel_type in self.relationship_types]
+        self.pages += 1
+        start = 0 if parameters['cursor'] is None else parameters['cursor'] + 1
+        end = min(start + parameters['page_size'], len(self.names))
+        return [{'element_id': i, 'name': self.names[i]} for i in range(start, end)]
+
+
+class EmbeddingStoreTest(unittest.TestCase):
+    """EmbeddingStore测试类"""
+    
+    def setUp(self):
+        names = [f'公司{i}' for i in range(2500)] + [None]
+        self.neo4j_manager = FakeNeo4jManager(names, ['收购', '合作'])
+        graph_manager = SimpleNamespace(neo4j_manager=self.neo4j_manager)
+        self.store = EmbeddingStore(embedding_dim=8, seed=0).load_vocabulary(graph_manager, page_size=1000)
+    
+    def test_paged_vocabulary(self):
+        """分页读取全部实体，不受1000条上限限制"""
+        self.assertEqual(self.neo4j_manager.pages, 4)
+        self.assertEqual(len(self.store.entities), 2500)
+        self.assertEqual(list(self.store.relationships), ['收购', '合作'])
+        self.assertEqual(self.store.entities.matrix.dtype, np.float32)
+        self.assertEqual(self.store.entities['公司7'].shape, (8,))
+    
+    def test_update_shared_table(self):
+        """未训练的模型直接使用新的共享表"""
+        shared = self.store.entities
+        entities, relationships = self.store.update(shared, self.store.relationships, ['新公司'], ['投资'])
+        self.assertIs(entities, self.store.entities)
+        self.assertIn('新公司', entities)
+        self.assertIn('投资', relationships)
+        # 重复的名称不再追加
+        self.assertIs(self.store.update(entities, relationships, ['新公司'], [])[0], entities)
+    
+    def test_update_trained_table(self):
+        """训练后的表只补齐缺少的行，初始向量与共享表一致，已训练的参数不变"""
+        names = list(self.store.entities)
+        trained = EmbeddingTable(names, np.ones((len(names), 8), dtype=np.float32))
+        entities, _ = self.store.update(trained, self.store.relationships, ['新公司', '公司1'], [])
+        self.assertIsNot(entities, self.store.entities)
+        self.assertEqual(len(entities), 2501)
+        self.assertTrue(np.array_equal(entities['公司1'], np.ones(8)))
+        self.assertTrue(np.array_equal(entities['新公司'], self.store.entities['新公司']))
+
+    def test_save_and_mmap_load(self):
+        """保存为.npy和manifest后以内存映射方式读回"""
+        with tempfile.TemporaryDirectory() as directory:
+            manifest = EmbeddingTable.save_many(directory, {'entities': self.store.entities}, embedding_dim=8)
+            self.assertEqual(manifest['tables']['entities']['shape'], [2500, 8])
+            tables, loaded_manifest = EmbeddingTable.load_many(directory)
+            entities = tables['entities']
+            self.assertIsInstance(entities.matrix, np.memmap)
+            self.assertEqual(loaded_manifest['embedding_dim'], 8)
+            self.assertEqual(entities.names, self.store.entities.names)
+            self.assertTrue(np.array_equal(entities['公司42'], self.store.entities['公司42']))
+            # 内存映射的表追加名称时生成新的内存矩阵
+            extended = entities.extended(['新公司'], self.store._random_rows)
+            self.assertEqual(len(extended), 2501)
+            del tables, entities
+
+
+if __name__ == '__main__':
+    unittest.main()
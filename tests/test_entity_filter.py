@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+已知实体名过滤器单元测试
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge_graph.entity_filter import EntityFilter
+from knowledge_graph.graph_manager import GraphManager
+
+
+class FakeNeo4jManager:
+    """只回答实体流式查询的Neo4j连接管理器"""
+    
+    def __init__(self, entities):
+        # entities: [(name, id, aliases)]
+        self.entities = entities
+        self.generation = 0
+    
+    def stream_query(self, query, parameters=None, as_tuples=False):
+        for entity in list(self.entities):
+            yield entity
+
+
+class EntityFilterTest(unittest.TestCase):
+    """EntityFilter测试类"""
+    
+    def setUp(self):
+        self.names = ['苹果公司', '微软公司', '特斯拉公司', 'iPhone', '史蒂夫·乔布斯']
+        self.filter = EntityFilter(expected_items=1000, fp_rate=0.01, max_gram=3)
+        for i, name in enumerate(self.names):
+            self.filter.add_entity(name, entity_id=f"e{i}")
+    
+    def test_no_false_negatives_for_substrings(self):
+        """名称的任意子串和id都判定为可能存在"""
+        for name in self.names:
+            for i in range(len(name)):
+                for j in range(i + 1, len(name) + 1):
+                    self.assertTrue(self.filter.might_match(name[i:j]), name[i:j])
+        self.assertTrue(self.filter.might_match('e3'))
+    
+    def test_definite_miss(self):
+        """不存在的实体被排除"""
+        self.assertFalse(self.filter.might_match('华为技术有限公司'))
+        self.assertEqual(self.filter.get_stats()['definite_misses'], 1)
+    
+    def test_save_and_load(self):
+        """快照保存后加载结果一致"""
+        fingerprint = EntityFilter.content_fingerprint((name, f"e{i}", []) for i, name in enumerate(self.names))
+        self.filter.fingerprint = fingerprint
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'entity_filter.bin')
+            self.filter.save(path)
+            loaded = EntityFilter.load(path)
+        self.assertEqual(loaded.fingerprint, fingerprint)
+        self.assertTrue(loaded.might_match('特斯拉'))
+        self.assertFalse(loaded.might_match('华为技术有限公司'))
+    
+    def test_content_fingerprint(self):
+        """指纹与顺序无关，数量相同的改名也会改变指纹，增量写入与整体计算结果一致"""
+        entities = [('苹果公司', 'e0', ['Apple']), ('微软公司', 'e1', [])]
+        fingerprint = EntityFilter.content_fingerprint(entities)
+        self.assertEqual(fingerprint, EntityFilter.content_fingerprint(entities[::-1]))
+        self.assertNotEqual(fingerprint, EntityFilter.content_fingerprint([('苹果公司', 'e0', ['Apple']),
+                                                                          ('微软', 'e1', [])]))
+        
+        entity_filter = EntityFilter(expected_items=100)
+        entity_filter.fingerprint = EntityFilter.content_fingerprint(entities[:1])
+        entity_filter.add_entity(*entities[1])
+        self.assertEqual(entity_filter.fingerprint, fingerprint)
+    
+    def test_snapshot_rebuilt_when_content_changes(self):
+        """快照只在内容指纹一致时复用；改名、删除后新增等数量不变的变化都会触发重建"""
+        neo4j_manager = FakeNeo4jManager([(name, f"e{i}", []) for i, name in enumerate(self.names)])
+        graph_manager = GraphManager(neo4j_manager, cache_size=0)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'entity_filter.bin')
+            graph_manager.build_entity_filter(snapshot_path=path)
+            with mock.patch.object(EntityFilter, 'load', wraps=EntityFilter.load) as load:
+                with self.assertLogs('knowledge_graph.graph_manager', level='INFO') as logs:
+                    graph_manager.build_entity_filter(snapshot_path=path)
+            self.assertEqual(load.call_count, 1)
+            self.assertIn('从快照加载', logs.output[-1])
+            
+            # 节点数不变：一个实体改名，另一个被删除后新建
+            neo4j_manager.entities[0] = ('华为技术有限公司', 'e0', [])
+            neo4j_manager.entities[1] = ('小米集团', 'e9', [])
+            with self.assertLogs('knowledge_graph.graph_manager', level='INFO') as logs:
+                entity_filter = graph_manager.build_entity_filter(snapshot_path=path)
+            self.assertTrue(any('不一致' in line for line in logs.output))
+            self.assertTrue(entity_filter.might_match('华为技术'))
+            self.assertTrue(entity_filter.might_match('小米集团'))
+            
+            # 本进程新建的实体计入指纹，保存后的快照与数据库一致时可以复用
+            neo4j_manager.entities.append(('OpenAI', 'e10', []))
+            graph_manager._on_node_created('Company', {'name': 'OpenAI', 'id': 'e10'})
+            graph_manager.save_entity_filter(path)
+            with self.assertLogs('knowledge_graph.graph_manager', level='INFO') as logs:
+                graph_manager.build_entity_filter(snapshot_path=path)
+            self.assertIn('从快照加载', logs.output[-1])
+    
+    
+    def test_poller_replay_not_counted_twice(self):
+        """轮询器重放本进程写入的节点时不再计入指纹，其他进程写入的节点照常计入"""
+        neo4j_manager = FakeNeo4jManager([(name, f"e{i}", []) for i, name in enumerate(self.names)])
+        graph_manager = GraphManager(neo4j_manager, cache_size=0)
+        graph_manager.build_entity_filter()
+        
+        local = {'name': 'OpenAI', 'id': 'e10', 'aliases': ['开放人工智能']}
+        neo4j_manager.entities.append(('OpenAI', 'e10', ['开放人工智能']))
+        graph_manager._on_node_created('Company', local)
+        
+        neo4j_manager.entities.append(('小米集团', 'e11', []))
+        graph_manager.apply_graph_changes({'nodes': [
+            {'label': 'Company', 'name': 'OpenAI', 'properties': {**local, 'created_at': 100}},
+            {'label': 'Company', 'name': '小米集团', 'properties': {'name': '小米集团', 'id': 'e11', 'created_at': 101}}
+        ], 'relationships': []})
+        self.assertEqual(graph_manager.entity_filter.fingerprint,
+                         EntityFilter.content_fingerprint(neo4j_manager.entities))
+        self.assertTrue(graph_manager.entity_filter.might_match('小米'))
+        self.assertEqual(len(graph_manager._local_nodes), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+按年外推预测单元测试
+"""
+
+import logging
+import os
+import sys
+import unittest
+from datetime import datetime, timezone
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.candidate_scorer import CandidateScorer, EdgeSet
+from models.extrapolation_model import ExtrapolationModel
+from models.forecast_engine import ForecastEngine
+from models.temporal_store import TemporalStore
+
+
+class FakeModel:
+    """提供ForecastEngine所需属性的最小模型，打分方法沿用ExtrapolationModel"""
+    
+    _excluded_targets = ExtrapolationModel._excluded_targets
+    _predict_relationship_target = ExtrapolationModel._predict_relationship_target
+    _predict_by_similarity = ExtrapolationModel._predict_by_similarity
+    predict_future_relationships = ExtrapolationModel.predict_future_relationships
+    
+    def __init__(self):
+        rng = np.random.default_rng(2)
+        self.logger = logging.getLogger(__name__)
+        self.entity_embeddings = {f'公司{i}': rng.normal(0, 0.1, 8) for i in range(30)}
+        self.relationship_embeddings = {rel: rng.normal(0, 0.1, 8) for rel in ('收购', '合作', '投资')}
+        self.temporal_store = TemporalStore()
+        self.temporal_store.extend([('公司0', '收购', '公司1', 2015), ('公司0', '收购', '公司2', 2019),
+                                    ('公司0', '合作', '公司3', 2018)])
+        self.existing_edges = EdgeSet()
+        self.existing_edges.add_many([('公司0', '收购', '公司4')])
+        self._scorer = CandidateScorer(self.entity_embeddings)
+    
+    def _get_scorer(self):
+        return self._scorer
+
+
+class ForecastEngineTest(unittest.TestCase):
+    """ForecastEngine测试类"""
+    
+    def setUp(self):
+        self.model = FakeModel()
+        self.engine = ForecastEngine(self.model, decay=0.5)
+    
+    def test_structure_and_decay(self):
+        """每年top_k个预测，置信度随年份衰减，统计与预测一致"""
+        predictions_by_year, stats, insights = self.engine.forecast('公司0', future_years=3, top_k=2)
+        self.assertEqual(len(predictions_by_year), 3)
+        years = sorted(predictions_by_year)
+        self.assertTrue(all(len(predictions_by_year[year]) == 2 for year in years))
+        self.assertGreater(min(p['confidence'] for p in predictions_by_year[years[0]]),
+                           max(p['confidence'] for p in predictions_by_year[years[1]]))
+        self.assertEqual(sum(stats['data']), 6)
+        self.assertTrue(set(stats['labels']) <= {'收购', '合作'})
+        self.assertIn('公司0', insights)
+        
+        targets = {(p['relationship_type'], p['target_entity'])
+                   for predictions in predictions_by_year.values() for p in predictions}
+        self.assertEqual(len(targets), 6)
+        for excluded in [('收购', '公司1'), ('收购', '公司2'), ('收购', '公司4'), ('合作', '公司3')]:
+            self.assertNotIn(excluded, targets)
+    
+    def test_first_year_matches_single_prediction(self):
+        """第一年的预测与predict_future_relationships的前top_k个一致"""
+        predictions_by_year, _, _ = self.engine.forecast('公司0', future_years=2, top_k=3)
+        first_year = predictions_by_year[min(predictions_by_year)]
+        expected = self.model.predict_future_relationships('公司0', top_k=3)
+        self.assertEqual([(p['relationship_type'], p['target_entity']) for p in first_year],
+                         [(p['relationship'], p['target']) for p in expected])
+    
+    def test_unknown_entity(self):
+        """未知实体返回空结构而不是抛出异常"""
+        predictions_by_year, stats, insights = self.engine.forecast('不存在的公司')
+        self.assertEqual(predictions_by_year, {})
+        self.assertEqual(stats['labels'], [])
+        self.assertTrue(insights)
+    
+    
+    def test_created_at_timestamp_not_a_year(self):
+        """外推模型不把写入时间戳created_at（DateTime）当作关系年份"""
+        written = datetime(2026, 5, 1, tzinfo=timezone.utc)
+        self.assertIsNone(ExtrapolationModel._extract_year({'created_at': written}))
+        self.assertEqual(ExtrapolationModel._extract_year({'since': 2010, 'created_at': written}), 2010)
+
+if __name__ == '__main__':
+    unittest.main()
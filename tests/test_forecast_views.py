@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+预测物化视图单元测试
+"""
+
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.forecast_views import ForecastViews
+
+
+class FakeModel:
+    """记录调用次数的最小外推模型"""
+    
+    def __init__(self):
+        industries = {'科技': ['苹果公司', '微软'], '汽车': ['特斯拉']}
+        neo4j_manager = SimpleNamespace(execute_query=lambda query, params=None: [
+            {'industry': industry, 'companies': companies} for industry, companies in industries.items()
+        ])
+        self.graph_manager = SimpleNamespace(neo4j_manager=neo4j_manager)
+        self.trend_engine = SimpleNamespace(predict=self._predict_trend)
+        self.forecast_engine = SimpleNamespace(forecast=self._forecast)
+        self.relationship_embeddings = {'收购': None, '合作': None}
+        self.calls = []
+    
+    def _predict_trend(self, industry, companies, future_years=5, top_k=5):
+        self.calls.append(('industry', industry))
+        return [{'industry': industry, 'participants': companies[:2]}]
+    
+    def _forecast(self, entity, future_years=5, top_k=5):
+        self.calls.append(('entity', entity))
+        return {2030 + future_years: [{'source_entity': entity}]}, {'labels': [], 'data': []}, ''
+
+
+class ForecastViewsTest(unittest.TestCase):
+    """ForecastViews测试类"""
+    
+    def setUp(self):
+        self.model = FakeModel()
+        self.views = ForecastViews(self.model, top_entities=1)
+    
+    def test_industries_precomputed(self):
+        """刷新后全部行业的默认参数直接命中"""
+        self.assertIsNone(self.views.get('industry', '科技', 5, 5))
+        self.views.refresh()
+        self.assertEqual(self.views.get('industry', '科技', 5, 5)[0]['participants'], ['苹果公司', '微软'])
+        self.assertEqual(self.views.version, 1)
+    
+    def test_popular_entities_and_incremental_refresh(self):
+        """只预先计算最热门的实体，变更只触发相关条目重算"""
+        for _ in range(3):
+            self.views.get('entity', '苹果公司', 5, 5)
+        self.views.get('entity', '特斯拉', 5, 5)
+        self.assertEqual(self.views.refresh(), 3)
+        self.assertIsNotNone(self.views.get('entity', '苹果公司', 5, 5))
+        self.assertIsNone(self.views.get('entity', '特斯拉', 5, 5))
+        
+        self.model.calls.clear()
+        self.views.mark_changed({'nodes': [], 'relationships': [
+            {'start': '苹果公司', 'type': '收购', 'end': 'Beats', 'properties': {}}
+        ]})
+        self.assertEqual(self.views.refresh(), 2)
+        self.assertEqual(sorted(self.model.calls), [('entity', '苹果公司'), ('industry', '科技')])
+        
+        self.views.invalidate_all()
+        self.assertEqual(self.views.refresh(), 3)
+    
+    def test_new_candidates_refresh_all(self):
+        """新实体和新关系类型进入所有预测的候选集合，下次刷新全部重算"""
+        views = ForecastViews(self.model, top_entities=2)
+        for name in ('苹果公司', '特斯拉'):
+            views.get('entity', name, 5, 5)
+        self.assertEqual(views.refresh(), 4)
+        
+        # 已知实体之间、已知类型的关系只重算两端实体及其行业
+        views.mark_changed({'nodes': [], 'relationships': [
+            {'start': '苹果公司', 'type': '合作', 'end': '微软', 'properties': {}}
+        ]})
+        self.assertEqual(views.refresh(), 2)
+        
+        # 新实体：全部重算
+        views.mark_changed({'nodes': [{'label': 'Company', 'name': '比亚迪', 'properties': {}}], 'relationships': []})
+        self.assertEqual(views.refresh(), 4)
+        
+        # 新关系类型：即使模型在变更通知前就已更新，下次刷新也全部重算
+        self.model.relationship_embeddings['投资'] = None
+        self.assertEqual(views.refresh(), 4)
+        self.assertEqual(views.refresh(), 0)
+    
+    def test_query_counts_bounded(self):
+        """查询计数跟踪的键数有上限，持续被查询的实体仍被预先计算"""
+        views = ForecastViews(self.model, top_entities=1, max_tracked=10)
+        for i in range(100):
+            views.get('entity', f'不存在的实体{i}', 5, 5)
+            views.get('entity', '苹果公司', 5, 5)
+            self.assertLessEqual(len(views._query_counts), 10)
+        self.assertIn(('entity', '苹果公司', 5, 5), views._query_counts)
+        
+        views.refresh()
+        self.assertIsNotNone(views.get('entity', '苹果公司', 5, 5))
+        self.assertLessEqual(views.get_stats()['tracked_keys'], 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
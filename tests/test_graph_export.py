@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+图谱流式导出与断点续传单元测试
+"""
+
+import gzip
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge_graph.graph_manager import GraphManager
+from knowledge_graph.neo4j_manager import Neo4jManager
+
+
+class FakeRecord:
+    """只实现data()和values()的Neo4j记录"""
+    
+    def __init__(self, row):
+        self.row = row
+    
+    def data(self):
+        return dict(self.row)
+    
+    def values(self):
+        return list(self.row.values())
+    
+    def __getitem__(self, index):
+        return self.values()[index]
+
+
+class FakeResult(list):
+    def single(self):
+        return self[0] if self else None
+
+
+class FakeSession:
+    """按查询内容返回节点或关系记录的会话，可在产出指定条数后模拟连接中断"""
+    
+    def __init__(self, driver):
+        self.driver = driver
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def run(self, query, parameters=None):
+        parameters = parameters or {}
+        if query.startswith('RETURN 1'):
+            return FakeResult([FakeRecord({'count': 1})])
+        self.driver.queries.append(query)
+        rows = self.driver.relationships if '[r]' in query else self.driver.nodes
+        cursor = parameters.get('cursor')
+        rows = sorted((row for row in rows if cursor is None or row['element_id'] > cursor),
+                      key=lambda row: row['element_id'])
+        return self._iterate(rows)
+    
+    def _iterate(self, rows):
+        for row in rows:
+            if self.driver.fail_after is not None:
+                if self.driver.fail_after == 0:
+                    raise ConnectionError("连接中断")
+                self.driver.fail_after -= 1
+            yield FakeRecord(dict(row, properties=dict(row['properties'])) if 'properties' in row else row)
+
+
+class FakeDriver:
+    def __init__(self, nodes, relationships):
+        self.nodes = nodes
+        self.relationships = relationships
+        self.queries = []
+        self.fail_after = None
+    
+    def session(self, **config):
+        return FakeSession(self)
+    
+    def close(self):
+        pass
+
+
+def make_graph_manager(driver):
+    with mock.patch('knowledge_graph.neo4j_manager.GraphDatabase.driver', return_value=driver):
+        return GraphManager(Neo4jManager())
+
+
+class GraphExportTest(unittest.TestCase):
+    """GraphManager导出测试类"""
+    
+    def setUp(self):
+        nodes = [{'element_id': f'n{i:03d}', 'label': 'Company', 'properties': {'name': f'公司{i}'}}
+                 for i in range(25)]
+        relationships = [{'element_id': f'r{i:03d}', 'start_label': 'Company', 'start_property': 'name',
+                          'start_value': f'公司{i}', 'type': '合作', 'rel_props': {'since': 2000 + i},
+                          'end_label': 'Company', 'end_property': 'name', 'end_value': f'公司{i + 1}'}
+                         for i in range(24)]
+        self.driver = FakeDriver(nodes, relationships)
+        self.graph_manager = make_graph_manager(self.driver)
+        self.tmpdir = tempfile.TemporaryDirectory()
+    
+    def tearDown(self):
+        self.tmpdir.cleanup()
+    
+    def _read_jsonl(self, path, compress=False):
+        opener = gzip.open if compress else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+    
+    def test_one_query_per_phase(self):
+        """每个阶段只执行一次查询，按page_size分页产出"""
+        pages = list(self.graph_manager._iter_export_pages('nodes', page_size=10))
+        self.assertEqual([len(records) for records, _ in pages], [10, 10, 5])
+        self.assertEqual([cursor for _, cursor in pages], ['n009', 'n019', 'n024'])
+        self.assertEqual(len(self.driver.queries), 1)
+        self.assertNotIn('LIMIT', self.driver.queries[0])
+    
+    def test_export_json(self):
+        """JSON导出与build_graph_from_json的格式兼容"""
+        path = os.path.join(self.tmpdir.name, 'graph.json.gz')
+        self.assertTrue(self.graph_manager.export_graph_to_json(path, page_size=7))
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(len(data['nodes']), 25)
+        self.assertEqual(data['nodes'][3], {'name': '公司3', 'label': 'Company'})
+        self.assertEqual(len(data['relationships']), 24)
+        self.assertEqual(data['relationships'][0]['properties'], {'since': 2000})
+    
+    def test_jsonl_resume_after_interruption(self):
+        """中断后从检查点继续，结果与一次完成的导出相同且没有重复记录"""
+        for compress in (False, True):
+            path = os.path.join(self.tmpdir.name, f'graph{compress}.jsonl')
+            self.driver.fail_after = 43
+            self.assertFalse(self.graph_manager.export_graph_to_jsonl(path, page_size=10, compress=compress))
+            with open(path + '.checkpoint', encoding='utf-8') as f:
+                state = json.load(f)
+            self.assertEqual((state['phase'], state['nodes'], state['relationships']), ('relationships', 25, 10))
+            
+            self.driver.fail_after = None
+            self.assertTrue(self.graph_manager.export_graph_to_jsonl(path, page_size=10, compress=compress,
+                                                                     resume=True))
+            self.assertFalse(os.path.exists(path + '.checkpoint'))
+            
+            lines = self._read_jsonl(path, compress)
+            self.assertEqual(len(lines), 49)
+            self.assertEqual([line['node']['name'] for line in lines[:25]], [f'公司{i}' for i in range(25)])
+            self.assertEqual([line['relationship']['start_value'] for line in lines[25:]],
+                             [f'公司{i}' for i in range(24)])
+    
+    def test_failed_stream_is_not_reported_as_complete(self):
+        """流式查询失败时导出返回False，而不是把已读部分当作完整结果"""
+        path = os.path.join(self.tmpdir.name, 'graph.json')
+        self.driver.fail_after = 5
+        self.assertFalse(self.graph_manager.export_graph_to_json(path, page_size=10))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Neo4j连接管理器单元测试
+"""
+
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge_graph.neo4j_manager import Neo4jManager
+
+
+class FakeRecord:
+    """只实现data()和values()的Neo4j记录"""
+    
+    def __init__(self, row):
+        self.row = row
+    
+    def data(self):
+        return dict(self.row)
+    
+    def values(self):
+        return list(self.row.values())
+    
+    def __getitem__(self, index):
+        return self.values()[index]
+
+
+class FakeResult:
+    """逐条产出记录的查询结果，记录已被拉取的条数"""
+    
+    def __init__(self, session, rows):
+        self.session = session
+        self.rows = rows
+    
+    def __iter__(self):
+        for row in self.rows:
+            self.session.pulled += 1
+            yield FakeRecord(row)
+    
+    def single(self):
+        return FakeRecord(self.rows[0])
+    
+    def data(self):
+        return [dict(row) for row in self.rows]
+    
+    def consume(self):
+        return mock.Mock(profile=None)
+
+
+class FakeTransaction:
+    def __init__(self, session):
+        self.session = session
+    
+    def run(self, query, parameters=None):
+        return self.session.run(query, parameters)
+
+
+class FakeSession:
+    def __init__(self, driver, config):
+        self.driver = driver
+        self.config = config
+        self.pulled = 0
+        self.closed = False
+    
+    def __enter__(self):
+        self.driver.sessions.append(self)
+        return self
+    
+    def __exit__(self, *exc):
+        self.closed = True
+        return False
+    
+    def run(self, query, parameters=None):
+        if query.startswith('RETURN 1'):
+            return FakeResult(self, [{'count': 1}])
+        self.driver.queries.append((query, parameters))
+        if self.driver.error:
+            raise self.driver.error
+        return FakeResult(self, self.driver.rows)
+    
+    def execute_read(self, work, *args):
+        self.driver.transactions.append('read')
+        return work(FakeTransaction(self), *args)
+    
+    def execute_write(self, work, *args):
+        self.driver.transactions.append('write')
+        return work(FakeTransaction(self), *args)
+
+
+class FakeDriver:
+    def __init__(self, rows=None):
+        self.rows = rows or []
+        self.sessions = []
+        self.queries = []
+        self.transactions = []
+        self.error = None
+    
+    def session(self, **config):
+        return FakeSession(self, config)
+    
+    def close(self):
+        pass
+
+
+def make_manager(driver, **config):
+    with mock.patch('knowledge_graph.neo4j_manager.GraphDatabase.driver', return_value=driver) as factory:
+        manager = Neo4jManager(**config)
+    manager.driver_kwargs = factory.call_args.kwargs
+    # 忽略连接测试打开的会话
+    driver.sessions.clear()
+    return manager
+
+
+class StreamQueryTest(unittest.TestCase):
+    """stream_query测试类"""
+    
+    def setUp(self):
+        self.driver = FakeDriver([{'name': f'公司{i}', 'founded': 1990 + i} for i in range(5)])
+        self.manager = make_manager(self.driver, fetch_size=500)
+    
+    def test_lazy_iteration(self):
+        """按需拉取记录，会话在迭代结束后才关闭"""
+        rows = self.manager.stream_query("MATCH (n) RETURN n.name AS name, n.founded AS founded", fetch_size=2)
+        self.assertEqual(self.driver.sessions, [])
+        self.assertEqual(next(rows), {'name': '公司0', 'founded': 1990})
+        session = self.driver.sessions[0]
+        self.assertEqual(session.pulled, 1)
+        self.assertFalse(session.closed)
+        self.assertEqual(len(list(rows)), 4)
+        self.assertTrue(session.closed)
+    
+    def test_session_config(self):
+        """会话使用读访问模式和指定的fetch_size，未指定时使用默认值"""
+        list(self.manager.stream_query("MATCH (n) RETURN n", fetch_size=2))
+        list(self.manager.stream_query("MATCH (n) RETURN n"))
+        self.assertEqual([session.config['fetch_size'] for session in self.driver.sessions], [2, 500])
+        self.assertTrue(all(session.config['default_access_mode'] == 'READ' for session in self.driver.sessions))
+    
+    def test_as_tuples(self):
+        """as_tuples=True时按RETURN顺序产出元组"""
+        rows = list(self.manager.stream_query("MATCH (n) RETURN n.name, n.founded", as_tuples=True))
+        self.assertEqual(rows[2], ('公司2', 1992))
+    
+    def test_close_early_releases_session(self):
+        """提前关闭生成器时释放会话，并按已产出的行数记录统计"""
+        rows = self.manager.stream_query("MATCH (n) RETURN n.name AS name")
+        next(rows)
+        next(rows)
+        rows.close()
+        self.assertTrue(self.driver.sessions[0].closed)
+        stats = self.manager.get_query_stats()[0]
+        self.assertEqual((stats['count'], stats['rows_total']), (1, 2))
+    
+    def test_errors(self):
+        """默认记录日志并结束迭代，raise_on_error=True时抛出异常"""
+        self.driver.error = ConnectionError("连接中断")
+        self.assertEqual(list(self.manager.stream_query("MATCH (n) RETURN n")), [])
+        with self.assertRaises(ConnectionError):
+            list(self.manager.stream_query("MATCH (n) RETURN n", raise_on_error=True))
+        self.assertEqual(self.manager.get_query_stats()[0]['errors'], 2)
+
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    """连接池配置与事务路由测试类"""
+    
+    def setUp(self):
+        self.driver = FakeDriver([{'name': '苹果公司'}])
+        self.manager = make_manager(self.driver, database='kg', max_connection_pool_size=16,
+                                    connection_acquisition_timeout=5.0, max_transaction_retry_time=3.0)
+    
+    def test_pool_config(self):
+        """连接池和超时配置传给驱动，会话使用指定的数据库"""
+        kwargs = self.manager.driver_kwargs
+        self.assertEqual(kwargs['max_connection_pool_size'], 16)
+        self.assertEqual(kwargs['connection_acquisition_timeout'], 5.0)
+        self.assertEqual(kwargs['max_transaction_retry_time'], 3.0)
+        self.manager.execute_query("MATCH (n) RETURN n.name AS name")
+        self.assertEqual(self.driver.sessions[0].config['database'], 'kg')
+    
+    def test_transaction_routing(self):
+        """读查询使用托管读事务，写操作使用托管写事务"""
+        self.assertEqual(self.manager.execute_query("MATCH (n) RETURN n.name AS name"), [{'name': '苹果公司'}])
+        self.manager.execute_write("CREATE (n:Company {name: $name})", {'name': '微软公司'})
+        self.assertEqual(self.manager.execute_write_batch([("CREATE (n)", {}), ("CREATE (m)", {})]), 2)
+        self.assertEqual(self.driver.transactions, ['read', 'write', 'write'])
+        # 每个调用一个会话，会话用完即关闭
+        self.assertTrue(all(session.closed for session in self.driver.sessions))
+    
+    def test_failed_query(self):
+        """读查询失败时返回None，不向调用方抛出异常"""
+        self.driver.error = ConnectionError("连接中断")
+        self.assertIsNone(self.manager.execute_query("MATCH (n) RETURN n"))
+        self.assertIsNone(self.manager.execute_write("CREATE (n)"))
+        self.assertEqual(self.manager.generation, 0)
+    
+    def test_concurrent_generation_bumps(self):
+        """版本号的读-改-写在锁内完成，多个线程同时递增时不丢失递增"""
+        with self.manager._generation_lock:
+            blocked = threading.Thread(target=self.manager.bump_generation)
+            blocked.start()
+            blocked.join(0.05)
+            self.assertTrue(blocked.is_alive())
+            self.assertEqual(self.manager.generation, 0)
+        blocked.join()
+        self.assertEqual(self.manager.generation, 1)
+        
+        threads = [threading.Thread(target=lambda: [self.manager.bump_generation() for _ in range(1000)])
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.manager.generation, 8001)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+实体名n-gram倒排索引单元测试
+"""
+
+import os
+import sys
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_index import NGramIndex
+
+
+class NGramIndexTest(unittest.TestCase):
+    """NGramIndex测试类"""
+    
+    def setUp(self):
+        self.names = ['苹果公司', '苹果', '微软公司', '特斯拉公司', '史蒂夫·乔布斯', 'iPhone 15']
+        self.index = NGramIndex()
+        self.index.add_many(self.names)
+    
+    def test_substring_matches_scan(self):
+        """子串查询结果与逐个扫描一致"""
+        for query in ['苹', '苹果', '公司', '拉公司', '乔布斯', 'Phone 1', '华为']:
+            expected = [i for i, name in enumerate(self.names) if query in name]
+            self.assertEqual(sorted(self.index.substring_ids(query)), expected, query)
+    
+    def test_search_ranks_shorter_names_first(self):
+        """完全匹配和较短的名称排在前面"""
+        self.assertEqual(self.index.search('苹果'), [('苹果', 1.0), ('苹果公司', 0.5)])
+    
+    def test_fuzzy_lookup(self):
+        """子串不匹配时由模糊匹配补足"""
+        results = self.index.lookup('特斯拉汽车')
+        self.assertEqual(results[0][0], '特斯拉公司')
+        self.assertFalse(self.index.has_substring('特斯拉汽车'))
+    
+    def test_duplicate_add(self):
+        """重复写入返回相同编号"""
+        self.assertEqual(self.index.add('苹果'), 1)
+        self.assertEqual(len(self.index), len(self.names))
+
+
+if __name__ == '__main__':
+    unittest.main()
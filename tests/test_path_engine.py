@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+内存路径引擎单元测试
+"""
+
+from collections import deque
+import os
+import re
+import sys
+import threading
+import time
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge_graph.graph_manager import GraphManager
+
+
+class FakeNeo4jManager:
+    """
+    在内存中回答路径查询的Neo4j连接管理器
+    
+    stream_query返回路径引擎加载的关系；execute_query按Cypher shortestPath的语义
+    （无向、CONTAINS匹配）求最短路径，并按Neo4j驱动Record.data()的格式返回Path。
+    """
+    
+    def __init__(self, nodes, edges, row_delay=0.0):
+        # nodes: {节点键: 属性字典}，edges: [(起点键, 关系类型, 终点键)]
+        self.nodes = nodes
+        self.edges = edges
+        self.row_delay = row_delay
+        self.generation = 0
+        self.builds = 0
+    
+    def stream_query(self, query, parameters=None, as_tuples=False):
+        self.builds += 1
+        for start, rel_type, end in list(self.edges):
+            if self.row_delay:
+                time.sleep(self.row_delay)
+            a, b = self.nodes[start], self.nodes[end]
+            yield (a.get('name', a.get('id')), 'name' not in a, rel_type,
+                   b.get('name', b.get('id')), 'name' not in b)
+    
+    def _matches(self, key, entity):
+        props = self.nodes[key]
+        return entity in props.get('name', '') or props.get('id') == entity
+    
+    def execute_query(self, query, parameters=None):
+        max_depth = int(re.search(r'\*1\.\.(\d+)', query).group(1))
+        adjacency = {key: [] for key in self.nodes}
+        for start, rel_type, end in self.edges:
+            adjacency[start].append((rel_type, end))
+            adjacency[end].append((rel_type, start))
+        
+        records = []
+        for source in (key for key in self.nodes if self._matches(key, parameters['entity1'])):
+            parents = {source: None}
+            queue = deque([source])
+            while queue:
+                node = queue.popleft()
+                for rel_type, neighbor in adjacency[node]:
+                    if neighbor not in parents:
+                        parents[neighbor] = (node, rel_type)
+                        queue.append(neighbor)
+            for target in (key for key in self.nodes if self._matches(key, parameters['entity2'])):
+                if target == source or target not in parents:
+                    continue
+                path = [dict(self.nodes[target])]
+                node = target
+                while parents[node] is not None:
+                    node, rel_type = parents[node]
+                    path = [dict(self.nodes[node]), rel_type] + path
+                if len(path) // 2 <= max_depth:
+                    records.append({'path': path})
+        return records
+
+
+class PathEngineTest(unittest.TestCase):
+    """PathEngine测试类"""
+    
+    def setUp(self):
+        nodes = {name: {'name': name} for name in ['苹果公司', '微软公司', '英特尔公司', '台积电', '三星电子']}
+        nodes['C-1001'] = {'id': 'C-1001'}
+        # 苹果-台积电只有一条最短路径（经英特尔），另有一条经三星电子的3跳路径
+        edges = [
+            ('苹果公司', '合作', '英特尔公司'),
+            ('台积电', '代工', '英特尔公司'),
+            ('苹果公司', '竞争', '三星电子'),
+            ('三星电子', '合作', 'C-1001'),
+            ('C-1001', '投资', '台积电'),
+            ('微软公司', '合作', '苹果公司'),
+        ]
+        self.neo4j_manager = FakeNeo4jManager(nodes, edges)
+        self.graph_manager = GraphManager(self.neo4j_manager, cache_size=0)
+    
+    def test_matches_cypher_path(self):
+        """引擎返回的路径与Cypher shortestPath的结果结构和内容一致"""
+        queries = [('苹果', '台积电'), ('微软', '台积电'), ('三星', 'C-1001'), ('C-1001', '英特尔')]
+        expected = [self.graph_manager.query_path_between_entities(*query) for query in queries]
+        self.assertEqual(expected[0], [{'path': [{'name': '苹果公司'}, '合作', {'name': '英特尔公司'},
+                                                 '代工', {'name': '台积电'}]}])
+        
+        self.graph_manager.build_path_engine(min_rebuild_interval=0)
+        for query, cypher_result in zip(queries, expected):
+            self.assertEqual(self.graph_manager.query_path_between_entities(*query), cypher_result)
+        
+        # 超出max_depth或实体不存在时两种方式都返回空列表
+        self.assertEqual(self.graph_manager.query_path_between_entities('微软', 'C-1001', max_depth=2), [])
+        self.assertEqual(self.graph_manager.query_path_between_entities('不存在', '台积电'), [])
+    
+    def test_k_shortest_and_relationship_filter(self):
+        """k条路径按长度升序，关系类型过滤只经过允许的关系"""
+        self.graph_manager.build_path_engine()
+        paths = self.graph_manager.query_path_between_entities('苹果', '台积电', k=2)
+        self.assertEqual([len(record['path']) // 2 for record in paths], [2, 3])
+        self.assertEqual(paths[1]['path'][4], {'id': 'C-1001'})
+        
+        paths = self.graph_manager.query_path_between_entities('苹果', '台积电',
+                                                               relationship_types=['竞争', '合作', '投资'])
+        self.assertEqual([step for step in paths[0]['path'] if isinstance(step, str)], ['竞争', '合作', '投资'])
+    
+    def test_refresh_while_reading(self):
+        """重建期间读取方始终看到完整的旧快照或新快照，并发的刷新只重建一次"""
+        engine = self.graph_manager.build_path_engine(min_rebuild_interval=0)
+        self.neo4j_manager.row_delay = 0.002
+        old_path = self.graph_manager.query_path_between_entities('微软', '台积电')
+        self.assertEqual(len(old_path[0]['path']) // 2, 3)
+        
+        # 新增一条捷径，最短路径变为2跳
+        self.neo4j_manager.edges.append(('微软公司', '投资', '台积电'))
+        self.neo4j_manager.generation += 1
+        
+        results, errors = [], []
+        stop = threading.Event()
+        
+        def read():
+            try:
+                while not stop.is_set():
+                    results.append(self.graph_manager.query_path_between_entities('微软', '台积电'))
+            except Exception as e:
+                errors.append(e)
+        
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        while self.neo4j_manager.builds < 2 or engine.is_stale():
+            time.sleep(0.005)
+        time.sleep(0.02)
+        stop.set()
+        for reader in readers:
+            reader.join()
+        
+        self.assertEqual(errors, [])
+        new_path = [{'path': [{'name': '微软公司'}, '投资', {'name': '台积电'}]}]
+        self.assertTrue(all(result in (old_path, new_path) for result in results))
+        self.assertEqual(results[-1], new_path)
+        self.assertEqual(self.neo4j_manager.builds, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+查询结果缓存单元测试
+"""
+
+import os
+import sys
+import time
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge_graph.graph_manager import GraphManager
+from knowledge_graph.query_cache import QueryCache
+
+
+class FakeNeo4jManager:
+    """按CONTAINS语义回答实体查询并记录查询次数的Neo4j连接管理器"""
+    
+    def __init__(self, names):
+        self.names = names
+        self.generation = 0
+        self.queries = 0
+    
+    def execute_query(self, query, parameters=None):
+        self.queries += 1
+        entity = parameters['entity_name']
+        return [{'type': 'Company', 'properties': {'name': name}} for name in self.names if entity in name][:1]
+
+
+class QueryCacheTest(unittest.TestCase):
+    """QueryCache测试类"""
+    
+    def setUp(self):
+        self.generation = 0
+        self.cache = QueryCache(max_entries=2, ttl=60, generation_source=lambda: self.generation)
+    
+    def test_hit_and_miss(self):
+        """命中与未命中计数"""
+        key = QueryCache.make_key('get_entity_info', ('苹果公司',))
+        self.assertEqual(self.cache.get(key), (False, None))
+        self.cache.put(key, [{'type': 'Company'}])
+        self.assertEqual(self.cache.get(QueryCache.make_key('get_entity_info', ['苹果公司'])),
+                         (True, [{'type': 'Company'}]))
+        # 字符串参数按原样作为键，与发送给数据库的参数一致
+        self.assertEqual(self.cache.get(QueryCache.make_key('get_entity_info', (' 苹果公司 ',))), (False, None))
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+    
+    def test_lru_eviction(self):
+        """超出容量时淘汰最久未使用的条目"""
+        self.cache.put('a', 1)
+        self.cache.put('b', 2)
+        self.cache.get('a')
+        self.cache.put('c', 3)
+        self.assertEqual(self.cache.get('b'), (False, None))
+        self.assertEqual(self.cache.get('a'), (True, 1))
+        self.assertEqual(self.cache.get_stats()['evictions'], 1)
+    
+    def test_generation_invalidation(self):
+        """图版本号变化后旧条目失效"""
+        self.cache.put('a', 1)
+        self.generation += 1
+        self.assertEqual(self.cache.get('a'), (False, None))
+        self.assertEqual(self.cache.get_stats()['invalidations'], 1)
+    
+    def test_stale_load_is_not_served(self):
+        """加载期间发生写入时，按加载前的版本号写入的条目不会被命中"""
+        generation = self.cache.current_generation()
+        self.generation += 1
+        self.cache.put('a', 1, generation)
+        self.assertEqual(self.cache.get('a'), (False, None))
+    
+    def test_ttl_expiration(self):
+        """超过存活时间的条目失效"""
+        cache = QueryCache(max_entries=2, ttl=0.01)
+        cache.put('a', 1)
+        time.sleep(0.02)
+        self.assertEqual(cache.get('a'), (False, None))
+        self.assertEqual(cache.get_stats()['expirations'], 1)
+    
+    
+    def test_graph_manager_read_through(self):
+        """GraphManager按发送给数据库的参数缓存，返回的记录是副本"""
+        neo4j_manager = FakeNeo4jManager(['苹果公司'])
+        graph_manager = GraphManager(neo4j_manager)
+        self.assertEqual(graph_manager.get_entity_info(' 苹果'), [])
+        self.assertEqual(graph_manager.get_entity_info('苹果')[0]['properties'], {'name': '苹果公司'})
+        self.assertEqual(neo4j_manager.queries, 2)
+        
+        graph_manager.get_entity_info('苹果')[0]['properties']['name'] = '已修改'
+        self.assertEqual(graph_manager.get_entity_info('苹果')[0]['properties'], {'name': '苹果公司'})
+        self.assertEqual(neo4j_manager.queries, 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+查询预处理器单元测试
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocessing import QueryPreprocessor
+from preprocessing.bert_encoder import BertEncoder
+
+
+class FakeBertEncoder(BertEncoder):
+    """不加载权重的编码器：按字符计数生成嵌入向量，记录每次批量编码的文本"""
+    DIM = 512
+    
+    def __init__(self, lazy=False, background=False):
+        super().__init__(lazy=True)
+        self.batches = []
+    
+    def get_batch_embeddings(self, texts, batch_size=32):
+        self.batches.append(list(texts))
+        embeddings = np.zeros((len(texts), self.DIM))
+        for row, text in enumerate(texts):
+            for char in str(text):
+                embeddings[row, ord(char) % self.DIM] += 1
+        return embeddings
+
+
+def make_preprocessor(**config):
+    config.setdefault('entities', ['苹果公司', '微软公司', '特斯拉', '华为技术'])
+    config.setdefault('relationships', ['合作', '竞争'])
+    with mock.patch('preprocessing.BertEncoder', FakeBertEncoder):
+        return QueryPreprocessor(**config)
+
+
+class HybridRetrievalTest(unittest.TestCase):
+    """BM25召回加BERT重排的实体链接测试类"""
+    
+    def setUp(self):
+        self.preprocessor = make_preprocessor(
+            retrieval_mode='hybrid', candidate_pool=2, cache_bytes=0,
+            entity_properties={'特斯拉': {'industry': '新能源汽车'}, '华为技术': {'headquarters': '深圳'}}
+        )
+        self.encoder = self.preprocessor.bert_encoder
+    
+    def link(self, text):
+        embedding = self.encoder.get_batch_embeddings([text])[0]
+        return self.preprocessor._link_entities(embedding, query_text=text)
+    
+    def test_rerank_only_candidates(self):
+        """只对BM25召回的候选计算相似度，候选数不超过candidate_pool"""
+        with mock.patch.object(self.encoder, 'find_most_similar',
+                               wraps=self.encoder.find_most_similar) as find_most_similar:
+            links = self.link('苹果公司的软件')
+        candidate_embeddings = find_most_similar.call_args.args[1]
+        self.assertEqual(len(candidate_embeddings), 2)
+        self.assertEqual({link['entity'] for link in links}, {'苹果公司', '微软公司'})
+        self.assertEqual(links[0]['entity'], '苹果公司')
+        self.assertTrue(all(link['lexical_score'] > 0 for link in links))
+    
+    def test_properties_recall(self):
+        """名称没有字面重叠时可以由属性召回，完全没有重叠时不链接"""
+        self.assertEqual([link['entity'] for link in self.link('新能源汽车')], ['特斯拉'])
+        self.assertEqual([link['entity'] for link in self.link('深圳')], ['华为技术'])
+        self.assertEqual(self.link('亚马逊'), [])
+    
+    def test_dense_mode_compares_all_entities(self):
+        """dense模式与全部实体嵌入比较"""
+        preprocessor = make_preprocessor(cache_bytes=0)
+        embedding = preprocessor.bert_encoder.get_batch_embeddings(['亚马逊'])[0]
+        self.assertEqual(len(preprocessor._link_entities(embedding, query_text='亚马逊')), 3)
+        with self.assertRaises(ValueError):
+            make_preprocessor(retrieval_mode='sparse')
+    
+    def test_update_knowledge_base_indexes_documents(self):
+        """增量新增的实体写入BM25索引，文档编号与嵌入矩阵下标一致"""
+        added, _ = self.preprocessor.update_knowledge_base(
+            ['比亚迪', '特斯拉'], entity_properties={'比亚迪': {'industry': '汽车'}})
+        self.assertEqual(added, ['比亚迪'])
+        # 只为新增实体计算嵌入
+        self.assertEqual(self.encoder.batches[-1], ['比亚迪'])
+        self.assertEqual(len(self.preprocessor.entity_documents), len(self.preprocessor.entity_embeddings))
+        self.assertEqual({link['entity'] for link in self.link('汽车')}, {'特斯拉', '比亚迪'})
+
+
+
+class ResultCacheTest(unittest.TestCase):
+    """预处理结果缓存和句子嵌入缓存测试类"""
+    
+    def setUp(self):
+        self.preprocessor = make_preprocessor()
+        self.encoder = self.preprocessor.bert_encoder
+        # 两个缓存都在进程内共享，每个测试从空缓存开始，统计按增量比较
+        self.preprocessor.result_cache.clear()
+        self.encoder.embedding_cache.clear()
+        self.encoder.batches.clear()
+        self.stats = self.preprocessor.get_cache_stats()
+    
+    def stats_delta(self, name):
+        stats = self.preprocessor.get_cache_stats()[name]
+        return stats['hits'] - self.stats[name]['hits'], stats['misses'] - self.stats[name]['misses']
+    
+    def test_hit_returns_read_only_result(self):
+        """相同查询命中缓存，不再编码；结果为只读结构"""
+        first = self.preprocessor.preprocess_query('苹果公司和华为合作了吗')
+        second = self.preprocessor.preprocess_query('苹果公司和华为合作了吗')
+        self.assertIs(first['query_embedding'], second['query_embedding'])
+        self.assertEqual(len(self.encoder.batches), 1)
+        self.assertIsInstance(second['tokens'], tuple)
+        self.assertFalse(second['query_embedding'].flags.writeable)
+        with self.assertRaises(TypeError):
+            second['tokens'] = []
+        self.assertEqual(self.stats_delta('result_cache'), (1, 1))
+    
+    def test_normalized_queries_share_entry(self):
+        """只差空白和标点的查询按清理后的文本共享缓存，original_query按当次请求填写"""
+        queries = ['苹果公司和华为合作了吗？', '  苹果公司和华为合作了吗  ', '苹果公司和华为合作了吗!!']
+        for query in queries:
+            result = self.preprocessor.preprocess_query(query)
+            self.assertEqual(result['original_query'], query)
+            cleaned = result['cleaned_text']
+            for span in [*result['ac_matches']['all_matches'], *result['span_links']]:
+                self.assertEqual(cleaned[span['start']:span['end'] + 1], span['text'])
+        self.assertEqual(self.encoder.batches, [['苹果公司和华为合作了吗', '华为']])
+        self.assertEqual(self.stats_delta('result_cache'), (2, 1))
+    
+    def test_shared_across_preprocessors(self):
+        """缓存在进程内共享，不同知识库的结果互不借用，查询句的嵌入只编码一次"""
+        self.preprocessor.preprocess_query('比亚迪和特斯拉竞争')
+        other = make_preprocessor(entities=['比亚迪', '特斯拉'])
+        self.assertIs(other.result_cache, self.preprocessor.result_cache)
+        other.bert_encoder.batches.clear()
+        
+        result = other.preprocess_query('比亚迪和特斯拉竞争')
+        self.assertEqual([match['text'] for match in result['ac_matches']['entities']], ['比亚迪', '特斯拉'])
+        self.assertNotIn('比亚迪和特斯拉竞争', [text for batch in other.bert_encoder.batches for text in batch])
+        self.assertEqual(self.stats_delta('embedding_cache')[0], 1)
+    
+    def test_knowledge_base_update_invalidates(self):
+        """知识库更新后旧的缓存结果不再命中，查询句的嵌入仍取自缓存"""
+        self.preprocessor.preprocess_query('比亚迪和特斯拉竞争')
+        self.preprocessor.update_knowledge_base(['比亚迪'])
+        self.encoder.batches.clear()
+        result = self.preprocessor.preprocess_query('比亚迪和特斯拉竞争')
+        self.assertIn('比亚迪', [match['text'] for match in result['ac_matches']['entities']])
+        self.assertEqual(self.encoder.batches, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
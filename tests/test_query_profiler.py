@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+查询性能分析器单元测试
+"""
+
+import json
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge_graph.neo4j_manager import Neo4jManager
+from knowledge_graph.query_profiler import QueryProfiler
+
+
+PLAN = {
+    'operatorType': 'ProduceResults', 'dbHits': 0, 'rows': 1,
+    'children': [{'operatorType': 'Filter', 'dbHits': 12, 'rows': 1,
+                  'children': [{'operatorType': 'NodeByLabelScan', 'dbHits': 30, 'rows': 10}]}]
+}
+
+
+class FakeTransaction:
+    """记录执行的查询文本，PROFILE查询返回固定的执行计划"""
+    
+    def __init__(self, queries):
+        self.queries = queries
+    
+    def run(self, query, parameters=None):
+        self.queries.append(query)
+        profile = PLAN if query.startswith('PROFILE ') else None
+        return SimpleNamespace(data=lambda: [{'name': '苹果公司'}],
+                               consume=lambda: SimpleNamespace(profile=profile),
+                               single=lambda: [1])
+
+
+class FakeSession:
+    def __init__(self, queries):
+        self.queries = queries
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def run(self, query, parameters=None):
+        return FakeTransaction([]).run(query, parameters)
+    
+    def execute_read(self, work, *args):
+        return work(FakeTransaction(self.queries), *args)
+
+
+class FakeDriver:
+    def __init__(self):
+        self.queries = []
+    
+    def session(self, **config):
+        return FakeSession(self.queries)
+
+
+class QueryProfilerTest(unittest.TestCase):
+    """QueryProfiler测试类"""
+    
+    def setUp(self):
+        self.profiler = QueryProfiler(slow_threshold_ms=100)
+    
+    def test_templates_and_histogram(self):
+        """空白不同、参数不同的同一查询归为一个模板，按直方图估计百分位"""
+        for duration in (0.5, 3, 3, 40, 700):
+            self.profiler.record("MATCH (n)\n  WHERE n.name = $name RETURN n", {'name': '苹果公司'}, duration, 2)
+        self.profiler.record("MATCH (n) WHERE n.name = $name RETURN n", {'name': '微软公司'}, 4, 0, error='超时')
+        
+        stats = self.profiler.get_stats()
+        self.assertEqual(len(stats), 1)
+        stats = stats[0]
+        self.assertEqual(stats['query'], "MATCH (n) WHERE n.name = $name RETURN n")
+        self.assertEqual((stats['count'], stats['errors'], stats['rows_total'], stats['rows_max']), (6, 1, 10, 2))
+        self.assertEqual(stats['histogram']['<=5ms'], 3)
+        self.assertEqual(stats['histogram']['<=1000ms'], 1)
+        self.assertEqual(stats['p50_ms'], 5)
+        self.assertEqual(stats['p95_ms'], 1000)
+        self.assertEqual(stats['max_ms'], 700)
+    
+    def test_slow_log_has_no_parameter_values(self):
+        """慢查询日志为JSON，只记录参数的类型和规模"""
+        with self.assertLogs('knowledge_graph.query_profiler.slow_query', level='WARNING') as logs:
+            self.profiler.record("MATCH (n) WHERE n.name IN $names RETURN n",
+                                 {'names': ['苹果公司', '微软公司'], 'secret': '密码123', 'limit': 5}, 250, 2)
+            self.profiler.record("RETURN 1", None, 10, 1)
+        self.assertEqual(len(logs.records), 1)
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['param_shapes'], {'names': 'list[2]', 'secret': 'str[5]', 'limit': 'int'})
+        self.assertNotIn('密码123', logs.output[0])
+        self.assertEqual(self.profiler.get_stats()[0]['slow_count'], 1)
+    
+    def test_summarize_plan(self):
+        """db hits按整棵计划树汇总"""
+        db_hits, plan = QueryProfiler.summarize_plan(PLAN)
+        self.assertEqual(db_hits, 42)
+        self.assertEqual(plan['children'][0]['children'][0]['operator'], 'NodeByLabelScan')
+        self.assertEqual(QueryProfiler.summarize_plan(None), (0, None))
+    
+    def test_max_templates(self):
+        """超出模板数量上限的新模板不再跟踪"""
+        profiler = QueryProfiler(max_templates=2)
+        for i in range(3):
+            profiler.record(f"RETURN {i}", None, 1, 1)
+        self.assertEqual(len(profiler.get_stats()), 2)
+    
+    def test_sampled_profile(self):
+        """按采样率以PROFILE方式执行，记录db hits和执行计划，返回的记录不变"""
+        driver = FakeDriver()
+        profiler = QueryProfiler(profile_sample_rate=1.0)
+        with mock.patch('knowledge_graph.neo4j_manager.GraphDatabase.driver', return_value=driver):
+            manager = Neo4jManager(profiler=profiler)
+        
+        self.assertEqual(manager.execute_query("MATCH (n:Company) RETURN n.name AS name"), [{'name': '苹果公司'}])
+        self.assertEqual(driver.queries, ["PROFILE MATCH (n:Company) RETURN n.name AS name"])
+        stats = manager.get_query_stats()[0]
+        self.assertEqual(stats['query'], "MATCH (n:Company) RETURN n.name AS name")
+        self.assertEqual((stats['profiled'], stats['db_hits_total'], stats['avg_db_hits']), (1, 42, 42))
+        self.assertEqual(stats['last_plan']['operator'], 'ProduceResults')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+片段级实体链接单元测试
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocessing import QueryPreprocessor
+from preprocessing.bert_encoder import BertEncoder
+
+
+class FakeBertEncoder(BertEncoder):
+    """不加载权重的编码器：按字符计数生成嵌入向量，记录每次批量编码的文本"""
+    DIM = 512
+    
+    def __init__(self, lazy=False, background=False):
+        super().__init__(lazy=True)
+        self.batches = []
+    
+    def get_batch_embeddings(self, texts, batch_size=32):
+        self.batches.append(list(texts))
+        embeddings = np.zeros((len(texts), self.DIM))
+        for row, text in enumerate(texts):
+            for char in str(text):
+                embeddings[row, ord(char) % self.DIM] += 1
+        return embeddings
+
+
+class SpanLinkerTest(unittest.TestCase):
+    """SpanLinker测试类"""
+    
+    def setUp(self):
+        with mock.patch('preprocessing.BertEncoder', FakeBertEncoder):
+            self.preprocessor = QueryPreprocessor(['苹果公司', '微软公司', '华为技术', '特斯拉'], ['合作', '竞争'],
+                                                  cache_bytes=0)
+        self.encoder = self.preprocessor.bert_encoder
+        self.linker = self.preprocessor.span_linker
+        # 句子嵌入缓存进程内共享，每个测试从空缓存开始
+        self.encoder.embedding_cache.clear()
+        self.encoder.batches.clear()
+    
+    def spans(self, query):
+        matches = self.preprocessor.ac_matcher.extract_entities_and_relationships(
+            self.preprocessor.text_processor.clean_text(query))
+        return self.linker.candidate_spans(query, matches)
+    
+    def test_candidate_spans(self):
+        """AC命中的实体和不与AC命中重叠的名词短语按位置排列"""
+        spans = self.spans('苹果公司和华为合作了吗')
+        self.assertEqual([(span['text'], span['source']) for span in spans], [('苹果公司', 'ac'), ('华为', 'noun')])
+        self.assertEqual((spans[1]['start'], spans[1]['end']), (5, 6))
+    
+    def test_one_encoder_call_per_query(self):
+        """查询句与全部未缓存片段在一次批量编码中完成，AC命中的片段不编码"""
+        query = '华为和苹果公司合作，华为与特斯拉竞争'
+        query_embedding, links = self.linker.link(query, self.spans(query))
+        self.assertEqual(self.encoder.batches, [[query, '华为']])
+        self.assertEqual(query_embedding.shape, (FakeBertEncoder.DIM,))
+        
+        by_text = {}
+        for link in links:
+            by_text.setdefault(link['text'], []).append(link)
+        self.assertEqual(len(by_text['华为']), 2)
+        self.assertEqual(by_text['华为'][0]['candidates'][0]['entity'], '华为技术')
+        self.assertEqual(by_text['苹果公司'][0]['candidates'], [{'entity': '苹果公司', 'similarity': 1.0}])
+        self.assertEqual(by_text['特斯拉'][0]['source'], 'ac')
+    
+    def test_span_cache(self):
+        """片段的链接结果被缓存，之后的查询只编码查询句"""
+        self.linker.link('华为怎么样', self.spans('华为怎么样'))
+        _, links = self.linker.link('华为的股价', [{'text': '华为', 'start': 0, 'end': 1, 'source': 'noun'}])
+        self.assertEqual(self.encoder.batches[-1], ['华为的股价'])
+        self.assertEqual(links[0]['candidates'][0]['entity'], '华为技术')
+        stats = self.linker.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (1, 1, 1))
+    
+    def test_preprocess_query_span_links(self):
+        """预处理一次查询只调用一次编码器，片段的最佳候选参与组合排序"""
+        result = self.preprocessor.preprocess_query('华为和苹果公司合作了吗')
+        self.assertEqual(len(self.encoder.batches), 1)
+        self.assertEqual([link['text'] for link in result['span_links']], ['华为', '苹果公司'])
+        entities = {match['entity'] for match in self.preprocessor.get_best_matches('华为和苹果公司合作了吗', top_k=10)}
+        self.assertIn('华为技术', entities)
+    
+    
+    def test_knowledge_base_update_invalidates_span_cache(self):
+        """知识库更新后缓存的片段链接不再命中，重新链接到新增实体"""
+        span = [{'text': '小米', 'start': 0, 'end': 1, 'source': 'noun'}]
+        _, links = self.linker.link('小米怎么样', span)
+        self.assertNotIn('小米集团', [candidate['entity'] for candidate in links[0]['candidates']])
+        
+        self.preprocessor.update_knowledge_base(['小米集团'])
+        self.encoder.batches.clear()
+        _, links = self.linker.link('小米怎么样', span)
+        # 查询句的嵌入与知识库无关，取自句子嵌入缓存，只重新编码片段
+        self.assertEqual(self.encoder.batches, [['小米']])
+        self.assertEqual(links[0]['candidates'][0]['entity'], '小米集团')
+    
+    def test_generation_bumped_after_update_completes(self):
+        """版本号在BM25索引和嵌入矩阵都更新后才递增，没有新增条目时不变"""
+        index_documents = self.preprocessor._index_entity_documents
+        generations = []
+        
+        def record_generation(*args):
+            generations.append(self.preprocessor.kb_generation)
+            return index_documents(*args)
+        
+        with mock.patch.object(self.preprocessor, '_index_entity_documents', side_effect=record_generation):
+            self.preprocessor.update_knowledge_base(['小米集团'])
+        self.assertEqual(generations, [0])
+        self.assertEqual(self.preprocessor.kb_generation, 1)
+        self.assertEqual(self.linker._kb_version(), 1)
+        
+        self.preprocessor.update_knowledge_base(['小米集团'], ['合作'])
+        self.assertEqual(self.preprocessor.kb_generation, 1)
+        self.preprocessor.update_knowledge_base(relationships=['投资'])
+        self.assertEqual(self.preprocessor.kb_generation, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
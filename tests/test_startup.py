@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Web服务启动过程（后台初始化与启动耗时报告）单元测试
+"""
+
+import io
+import os
+import sys
+import unittest
+from contextlib import redirect_stdout
+from types import SimpleNamespace
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import web_interface.app as web_app
+
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   _io
+import time:      1000 |     300000 |   preprocessing.text_processor
+import time:       500 |     200000 |     jieba
+import time:      2000 |     500000 | preprocessing
+import time:       300 |      50000 | models
+"""
+
+
+class StartupTest(unittest.TestCase):
+    """启动过程测试类"""
+    
+    def test_import_time_report(self):
+        """解析-X importtime输出，只保留前两层模块，按累计耗时降序"""
+        completed = SimpleNamespace(returncode=0, stderr=IMPORTTIME_OUTPUT)
+        with mock.patch.object(web_app.subprocess, 'run', return_value=completed) as run:
+            rows = web_app.import_time_report(top_n=3)
+        self.assertEqual(run.call_args.args[0][1:4], ['-X', 'importtime', '-c'])
+        self.assertEqual(rows, [('preprocessing', 0.002, 0.5), ('preprocessing.text_processor', 0.001, 0.3),
+                                ('models', 0.0003, 0.05)])
+        
+        failed = SimpleNamespace(returncode=1, stderr="ModuleNotFoundError: No module named 'torch'")
+        with mock.patch.object(web_app.subprocess, 'run', return_value=failed):
+            with self.assertLogs(web_app.logger, level='ERROR'):
+                self.assertIsNone(web_app.import_time_report())
+    
+    def test_startup_phase(self):
+        """阶段耗时在出错时也会记录"""
+        with mock.patch.object(web_app, 'startup_timings', {}) as timings:
+            with web_app.startup_phase('neo4j'):
+                pass
+            with self.assertRaises(RuntimeError):
+                with web_app.startup_phase('training'):
+                    raise RuntimeError('训练失败')
+        self.assertEqual(list(timings), ['neo4j', 'training'])
+        self.assertTrue(all(seconds >= 0 for seconds in timings.values()))
+    
+    def test_health_during_background_init(self):
+        """后台初始化期间/health返回initializing，完成后报告编码器状态和各阶段耗时"""
+        client = web_app.app.test_client()
+        with mock.patch.multiple(web_app, preprocessor=None, graph_manager=None, qa_engine=None,
+                                 initializing=True, startup_timings={'neo4j': 0.5}):
+            body = client.get('/health').get_json()
+        self.assertEqual((body['status'], body['initializing'], body['encoder']), ('unhealthy', True, None))
+        
+        encoder_status = {'model_name': 'bert-base-chinese', 'loaded': False, 'load_seconds': None, 'error': None}
+        preprocessor = SimpleNamespace(bert_encoder=SimpleNamespace(get_status=lambda: encoder_status))
+        graph_manager = SimpleNamespace(get_node_count=lambda: 3)
+        with mock.patch.multiple(web_app, preprocessor=preprocessor, graph_manager=graph_manager,
+                                 qa_engine=object(), initializing=False,
+                                 startup_timings={'neo4j': 0.5, 'training': 2.0}):
+            body = client.get('/health').get_json()
+        self.assertEqual((body['status'], body['initializing']), ('healthy', False))
+        self.assertEqual(body['encoder'], encoder_status)
+        self.assertEqual(body['startup_seconds'], {'neo4j': 0.5, 'training': 2.0})
+    
+    def test_temporal_index_built_after_sample_data(self):
+        """示例数据写入之后才构建时间索引和问答引擎，示例关系能进入外推模型"""
+        calls = mock.Mock()
+        graph_manager = calls.graph_manager
+        graph_manager.get_node_count.return_value = 0
+        calls.qa_engine_class.side_effect = lambda manager: calls.qa_engine
+        with mock.patch.multiple(web_app, Neo4jManager=mock.Mock(), QueryPreprocessor=mock.Mock(),
+                                 ChangePoller=mock.Mock(), startup_timings={}, preprocessor=None,
+                                 graph_manager=None, qa_engine=None, change_poller=None,
+                                 GraphManager=mock.Mock(return_value=graph_manager),
+                                 QAEngine=calls.qa_engine_class), \
+                mock.patch.object(web_app.os.path, 'exists', return_value=True):
+            self.assertTrue(web_app.initialize_components())
+        
+        order = [name for name, _, _ in calls.mock_calls]
+        self.assertLess(order.index('graph_manager.build_graph_from_json'),
+                        order.index('graph_manager.build_temporal_index'))
+        self.assertLess(order.index('graph_manager.build_temporal_index'), order.index('qa_engine_class'))
+    
+    def test_print_startup_report(self):
+        """启动报告包含导入明细、已导入的重依赖和各初始化阶段耗时"""
+        output = io.StringIO()
+        rows = [('preprocessing', 0.002, 0.5)]
+        with mock.patch.object(web_app, 'import_time_report', return_value=rows), \
+                mock.patch.multiple(web_app, preprocessor=None, startup_timings={'training': 2.0}), \
+                redirect_stdout(output):
+            web_app.print_startup_report()
+        report = output.getvalue()
+        self.assertIn('preprocessing', report)
+        self.assertIn('training', report)
+        self.assertIn('当前进程已导入的重依赖', report)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+时间关系索引单元测试
+"""
+
+import os
+import sys
+import unittest
+from datetime import datetime, timezone
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge_graph.temporal_index import TemporalIndex
+
+
+class FakeNeo4jManager:
+    """只返回固定关系的Neo4j连接管理器"""
+    
+    def __init__(self, rows):
+        self.rows = rows
+    
+    def stream_query(self, query, parameters=None, as_tuples=False):
+        return iter(self.rows)
+
+
+class TemporalIndexTest(unittest.TestCase):
+    """TemporalIndex测试类"""
+    
+    def setUp(self):
+        rows = [
+            ('苹果公司', 'PARTNERS_WITH', 'IBM', {'since': 2014}),
+            ('苹果公司', 'PARTNERS_WITH', '英特尔', {'year': 2005}),
+            ('苹果公司', 'ACQUIRED', 'Beats', {'year': 2014}),
+            ('苹果公司', 'ACQUIRED', 'Shazam', {'created_at': '2018-09-24'}),
+            ('微软', 'PARTNERS_WITH', '苹果公司', {'since': 1997}),
+            ('苹果公司', 'PARTNERS_WITH', '高通', {})
+        ]
+        self.index = TemporalIndex(FakeNeo4jManager(rows)).build()
+    
+    def test_as_of(self):
+        """某一年份之前的关系，包括实体作为尾实体的关系"""
+        results = self.index.relationships_as_of('苹果公司', 2014, relationship='PARTNERS_WITH')
+        self.assertEqual([(item['related_entity'], item['year'], item['direction']) for item in results],
+                         [('微软', 1997, 'in'), ('英特尔', 2005, 'out'), ('IBM', 2014, 'out')])
+        outgoing = self.index.relationships_as_of('苹果公司', 2014, direction='out')
+        self.assertEqual([item['related_entity'] for item in outgoing], ['英特尔', 'IBM', 'Beats'])
+    
+    def test_between_years(self):
+        """时间区间查询包含两端年份"""
+        results = self.index.relationships_between('苹果公司', 2010, 2018, relationship='ACQUIRED')
+        self.assertEqual([item['related_entity'] for item in results], ['Beats', 'Shazam'])
+        self.assertEqual(self.index.relationships_between('苹果公司', 2019), [])
+        self.assertEqual(self.index.relationships_between('华为', 2000, 2020), [])
+    
+    def test_year_partition_and_incremental_add(self):
+        """年份分区查询和变更追加"""
+        self.assertEqual(len(self.index), 5)
+        self.assertEqual(self.index.edges_between(2014, 2014, relationship='ACQUIRED'),
+                         [('苹果公司', 'ACQUIRED', 'Beats', 2014)])
+        self.index.apply_graph_changes({'relationships': [
+            {'start': '苹果公司', 'type': 'ACQUIRED', 'end': 'NeXT', 'properties': {'year': 1997}},
+            {'start': '苹果公司', 'type': 'ACQUIRED', 'end': 'Xnor', 'properties': {}}
+        ]})
+        self.assertEqual(self.index.year_range(), (1997, 2018))
+        self.assertEqual([item['related_entity'] for item in self.index.relationships_as_of('苹果公司', 2000)],
+                         ['微软', 'NeXT'])
+    
+    
+    def test_created_at_timestamp_not_a_year(self):
+        """只有写入时间戳created_at（DateTime）的关系没有业务年份，不进入索引"""
+        written = datetime(2026, 5, 1, tzinfo=timezone.utc)
+        self.assertIsNone(TemporalIndex.extract_year({'created_at': written}))
+        self.assertEqual(TemporalIndex.extract_year({'year': 2014, 'created_at': written}), 2014)
+        
+        index = TemporalIndex(FakeNeo4jManager([
+            ('苹果公司', 'COMPETES_WITH', '三星', {'created_at': written}),
+            ('苹果公司', 'ACQUIRED', 'Beats', {'year': 2014, 'created_at': written})
+        ])).build()
+        index.apply_graph_changes({'relationships': [
+            {'start': '谷歌', 'type': 'COMPETES_WITH', 'end': '苹果公司', 'properties': {'created_at': written}}
+        ]})
+        self.assertEqual(len(index), 1)
+        self.assertEqual(index.year_range(), (2014, 2014))
+        self.assertEqual(index.relationships_between('苹果公司', 2020), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+时间三元组存储单元测试
+"""
+
+import os
+import sys
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.temporal_store import TemporalStore
+
+
+class TemporalStoreTest(unittest.TestCase):
+    """TemporalStore测试类"""
+    
+    def setUp(self):
+        self.rows = [
+            ('苹果公司', '收购', 'Beats', 2014),
+            ('微软', '收购', '领英', 2016),
+            ('苹果公司', '合作', 'IBM', 2014),
+            ('苹果公司', '收购', 'Shazam', 2018),
+            ('苹果公司', '收购', 'NeXT', 1997),
+            ('微软', '合作', '苹果公司', 1997)
+        ]
+        self.store = TemporalStore()
+        self.store.extend(self.rows)
+    
+    def test_relationship_counts(self):
+        """各关系类型的次数按降序排列"""
+        self.assertEqual(self.store.relationship_counts('苹果公司'), [('收购', 3), ('合作', 1)])
+        self.assertEqual(self.store.relationship_counts('Beats'), [])
+        self.assertEqual(self.store.relationship_counts('华为'), [])
+    
+    def test_targets_sorted_by_year(self):
+        """历史尾实体按年份升序返回"""
+        targets, years = self.store.targets('苹果公司', '收购')
+        self.assertEqual(targets, ['NeXT', 'Beats', 'Shazam'])
+        self.assertEqual(list(years), [1997, 2014, 2018])
+        self.assertEqual(self.store.targets('苹果公司', '投资')[0], [])
+    
+    def test_extend_keeps_index_consistent(self):
+        """追加数据后偏移和统计随之更新"""
+        new_rows = [('Beats', '合作', '苹果公司', 2020), ('苹果公司', '投资', '滴滴', 2016)]
+        self.store.extend(new_rows)
+        self.assertEqual(sorted(self.store.rows()), sorted(self.rows + new_rows))
+        self.assertTrue(self.store.has_history('Beats'))
+        self.assertEqual(self.store.targets('苹果公司', '投资')[0], ['滴滴'])
+        self.assertEqual(self.store.year_range(), (1997, 2020))
+    
+    def test_records_round_trip(self):
+        """导出的记录可以重建出相同的存储"""
+        restored = TemporalStore()
+        restored.extend(
+            (row['head'], row['relationship'], row['tail'], row['year']) for row in self.store.to_records()
+        )
+        self.assertEqual(sorted(restored.rows()), sorted(self.rows))
+
+
+if __name__ == '__main__':
+    unittest.main()
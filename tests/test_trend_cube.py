@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+行业趋势统计立方体单元测试
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.trend_cube import TrendCube
+
+
+class TrendCubeTest(unittest.TestCase):
+    """TrendCube测试类"""
+    
+    def setUp(self):
+        # 科技行业的收购每年增加一次，合作保持每年一次
+        self.rows = [('科技', '收购', year) for year in range(2015, 2020) for _ in range(year - 2014)]
+        self.rows += [('科技', '合作', year) for year in range(2015, 2020)]
+        self.rows += [('金融', '投资', 2018), (None, '收购', 2018)]
+        self.cube = TrendCube(window=5)
+        self.cube.add(self.rows)
+    
+    def test_series(self):
+        """按行业和关系类型切片得到每年的数量"""
+        years, counts = self.cube.series('科技', '收购')
+        self.assertEqual(list(years), list(range(2015, 2020)))
+        self.assertEqual(list(counts), [1, 2, 3, 4, 5])
+        self.assertEqual(list(self.cube.series('科技')[1]), [2, 3, 4, 5, 6])
+        self.assertFalse(self.cube.series('医疗')[1].any())
+        # 没有行业的关系不计入
+        self.assertEqual(len(self.cube), len(self.rows) - 1)
+    
+    def test_forecast_matches_polyfit(self):
+        """向量化的趋势与逐个单元格的最小二乘拟合一致"""
+        results = self.cube.forecast('科技', future_years=2)
+        self.assertEqual([item['relationship'] for item in results], ['收购', '合作'])
+        
+        years, counts = self.cube.series('科技', '收购')
+        slope, intercept = np.polyfit(years, counts, 1)
+        self.assertAlmostEqual(results[0]['slope'], slope)
+        self.assertEqual([item['year'] for item in results[0]['forecast']], [2020, 2021])
+        self.assertAlmostEqual(results[0]['forecast'][0]['count'], slope * 2020 + intercept)
+        self.assertEqual(results[0]['trend'], '上升')
+        self.assertEqual(results[1]['trend'], '平稳')
+        self.assertEqual(self.cube.forecast('医疗'), [])
+    
+    def test_forecast_uses_one_snapshot(self):
+        """拟合期间的并发写入扩展了年份轴，预测仍按读取时的快照对齐年份和计数"""
+        fit_trends = self.cube._fit_trends
+        
+        def fit_during_write(state):
+            self.cube.add([('科技', '收购', 2012), ('科技', '收购', 2023)])
+            return fit_trends(state)
+        
+        with mock.patch.object(self.cube, '_fit_trends', side_effect=fit_during_write):
+            results = self.cube.forecast('科技', future_years=2)
+        self.assertEqual([item['year'] for item in results[0]['forecast']], [2020, 2021])
+        self.assertAlmostEqual(results[0]['slope'], 1.0)
+        self.assertEqual(self.cube.years()[[0, -1]].tolist(), [2012, 2023])
+    
+    def test_incremental_add_extends_years(self):
+        """增量写入新的行业和更早、更晚的年份"""
+        self.cube.add([('科技', '收购', 2012), ('医疗', '合作', 2021)])
+        years, counts = self.cube.series('科技', '收购')
+        self.assertEqual((years[0], years[-1]), (2012, 2021))
+        self.assertEqual(counts[0], 1)
+        self.assertEqual(counts[years.tolist().index(2019)], 5)
+        self.assertEqual(self.cube.series('医疗', '合作')[1][-1], 1)
+        self.assertEqual(self.cube.get_stats()['industries'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
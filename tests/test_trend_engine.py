@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+行业趋势批量计算单元测试
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.candidate_scorer import CandidateScorer, EdgeSet
+from models.temporal_store import TemporalStore
+from models.trend_engine import TrendEngine
+
+
+class FakeModel:
+    """提供TrendEngine所需属性的最小模型"""
+    
+    def __init__(self):
+        rng = np.random.default_rng(1)
+        self.entity_embeddings = {f'公司{i}': rng.normal(0, 0.1, 8) for i in range(40)}
+        self.relationship_embeddings = {rel: rng.normal(0, 0.1, 8) for rel in ('收购', '合作')}
+        self.temporal_store = TemporalStore()
+        self.temporal_store.extend([('公司0', '收购', '公司1', 2015), ('公司2', '合作', '公司3', 2018)])
+        self.existing_edges = EdgeSet()
+        self.existing_edges.add_many([('公司0', '收购', '公司1'), ('公司4', '合作', '公司5')])
+        self._scorer = CandidateScorer(self.entity_embeddings)
+    
+    def _get_scorer(self):
+        return self._scorer
+
+
+class TrendEngineTest(unittest.TestCase):
+    """TrendEngine测试类"""
+    
+    def setUp(self):
+        self.model = FakeModel()
+        self.industry = [f'公司{i}' for i in range(20)] + ['不存在的公司']
+    
+    def test_targets_restricted_to_industry(self):
+        """预测的双方都属于行业，且不包含已有关系"""
+        engine = TrendEngine(self.model)
+        results = engine.predict('科技', self.industry, top_k=50)
+        self.assertTrue(results)
+        for result in results:
+            source, target = result['participants']
+            self.assertIn(source, self.industry)
+            self.assertIn(target, self.industry)
+            self.assertNotEqual(source, target)
+            rel_type = result['prediction'].split('建立 ')[1].split(' ')[0]
+            self.assertFalse(self.model.existing_edges.contains(source, rel_type, target))
+    
+    def test_history_limits_relationship_types(self):
+        """有历史记录的公司只预测历史中出现过的关系类型"""
+        engine = TrendEngine(self.model, per_company=10)
+        for result in engine.predict('科技', self.industry, top_k=200):
+            if result['participants'][0] == '公司0':
+                self.assertIn('收购', result['prediction'])
+                self.assertNotEqual(result['participants'][1], '公司1')
+    
+    def test_chunked_matches_single_pass(self):
+        """分块并行计算与一次计算的结果一致"""
+        single = TrendEngine(self.model).predict('科技', self.industry, top_k=30)
+        chunked_engine = TrendEngine(self.model, chunk_size=3)
+        chunked = chunked_engine.predict('科技', self.industry, top_k=30)
+        chunked_engine.close()
+        self.assertEqual(single, chunked)
+
+
+if __name__ == '__main__':
+    unittest.main()
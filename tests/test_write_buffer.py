@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+写缓冲队列单元测试
+"""
+
+import os
+import sys
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge_graph.neo4j_manager import Neo4jManager
+from knowledge_graph.write_buffer import WriteBuffer
+
+
+class FakeNeo4jManager:
+    """记录每个批次的连接管理器，可以让提交阻塞或失败"""
+    
+    def __init__(self):
+        self.batches = []
+        self.committed = []
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+        self.error = None
+    
+    def execute_write_batch(self, operations, raise_on_error=False):
+        self.entered.set()
+        self.release.wait()
+        if self.error:
+            raise self.error
+        self.batches.append(list(operations))
+        self.committed.extend(operations)
+        return len(operations)
+
+
+class WriteBufferTest(unittest.TestCase):
+    """WriteBuffer测试类"""
+    
+    def setUp(self):
+        self.neo4j_manager = FakeNeo4jManager()
+        self.buffers = []
+    
+    def tearDown(self):
+        self.neo4j_manager.release.set()
+        for buffer in self.buffers:
+            buffer.close()
+    
+    def make_buffer(self, **config):
+        config.setdefault('flush_interval', 60)
+        buffer = WriteBuffer(self.neo4j_manager, **config)
+        self.buffers.append(buffer)
+        return buffer
+    
+    def test_group_commit_batch_size(self):
+        """每个事务最多包含max_batch_size个写操作，提交顺序与入队顺序一致"""
+        buffer = self.make_buffer(max_batch_size=3)
+        # 第一个批次提交完成前全部写操作都已入队，之后的批次按max_batch_size切分
+        self.neo4j_manager.release.clear()
+        operations = [(f"CREATE (n {{i: {i}}})", {'i': i}) for i in range(7)]
+        for query, parameters in operations:
+            self.assertTrue(buffer.submit(query, parameters))
+        flusher = threading.Thread(target=buffer.flush)
+        flusher.start()
+        self.assertTrue(self.neo4j_manager.entered.wait(1))
+        self.neo4j_manager.release.set()
+        flusher.join(1)
+        
+        self.assertEqual([len(batch) for batch in self.neo4j_manager.batches], [3, 3, 1])
+        self.assertEqual(self.neo4j_manager.committed, operations)
+        stats = buffer.get_stats()
+        self.assertEqual((stats['submitted'], stats['committed'], stats['batches'], stats['pending']), (7, 7, 3, 0))
+    
+    def test_flush_reads_own_writes(self):
+        """flush返回时已入队的写操作都已提交，包括后台线程正在提交的批次"""
+        buffer = self.make_buffer(flush_interval=0.01)
+        self.neo4j_manager.release.clear()
+        buffer.submit("CREATE (a)")
+        self.assertTrue(self.neo4j_manager.entered.wait(1))
+        buffer.submit("CREATE (b)")
+        
+        flusher = threading.Thread(target=buffer.flush)
+        flusher.start()
+        flusher.join(0.05)
+        self.assertTrue(flusher.is_alive())
+        
+        self.neo4j_manager.release.set()
+        flusher.join(1)
+        self.assertFalse(flusher.is_alive())
+        self.assertEqual([query for query, _ in self.neo4j_manager.committed], ["CREATE (a)", "CREATE (b)"])
+        self.assertEqual(buffer.pending(), 0)
+    
+    def test_backpressure_and_rejection(self):
+        """队列满时submit阻塞等待，超时后拒绝"""
+        buffer = self.make_buffer(max_batch_size=100, max_queue_size=2, put_timeout=0.05)
+        self.assertTrue(buffer.submit("CREATE (a)"))
+        self.assertTrue(buffer.submit("CREATE (b)"))
+        self.assertFalse(buffer.submit("CREATE (c)"))
+        self.assertEqual(buffer.get_stats()['rejected'], 1)
+        
+        # 等待中的submit在队列腾出空间后入队
+        result = {}
+        waiter = threading.Thread(target=lambda: result.update(ok=buffer.submit("CREATE (d)", timeout=2)))
+        waiter.start()
+        waiter.join(0.05)
+        self.assertTrue(waiter.is_alive())
+        buffer.flush()
+        waiter.join(2)
+        self.assertTrue(result['ok'])
+        buffer.flush()
+        self.assertEqual([query for query, _ in self.neo4j_manager.committed],
+                         ["CREATE (a)", "CREATE (b)", "CREATE (d)"])
+    
+    def test_failed_batch(self):
+        """批次失败时记录失败的写操作并调用回调"""
+        failures = []
+        buffer = self.make_buffer(on_batch_error=failures.append)
+        self.neo4j_manager.error = RuntimeError("约束冲突")
+        buffer.submit("CREATE (a)", {'name': '苹果公司'})
+        results = buffer.flush()
+        
+        self.assertFalse(results[0]['success'])
+        self.assertEqual(failures[0]['operations'], [("CREATE (a)", {'name': '苹果公司'})])
+        self.assertEqual(buffer.get_stats()['failed'], 1)
+        self.assertEqual(len(buffer.failed_batches), 1)
+    
+    def test_close_flushes_and_rejects(self):
+        """关闭时提交剩余写操作，之后拒绝新的写操作"""
+        buffer = self.make_buffer()
+        buffer.submit("CREATE (a)")
+        buffer.close()
+        self.assertEqual(len(self.neo4j_manager.committed), 1)
+        self.assertFalse(buffer.submit("CREATE (b)"))
+    
+    def test_buffered_writes_share_one_transaction(self):
+        """经Neo4jManager缓冲的写操作在flush_writes时以一个事务提交，版本号只递增一次"""
+        transactions = []
+        
+        class FakeSession:
+            def __enter__(self):
+                return self
+            
+            def __exit__(self, *exc):
+                return False
+            
+            def run(self, query, parameters=None):
+                return SimpleNamespace(single=lambda: [1])
+            
+            def execute_write(self, work, operations):
+                tx = SimpleNamespace(run=lambda query, parameters: SimpleNamespace(consume=lambda: None))
+                transactions.append(len(operations))
+                return work(tx, operations)
+        
+        driver = SimpleNamespace(session=lambda **config: FakeSession(), close=lambda: None)
+        with mock.patch('knowledge_graph.neo4j_manager.GraphDatabase.driver', return_value=driver):
+            manager = Neo4jManager()
+        manager.enable_write_buffer(flush_interval=60)
+        try:
+            for name in ('苹果公司', '微软公司', '特斯拉公司'):
+                self.assertTrue(manager.create_node('Company', {'name': name}, buffered=True))
+            self.assertEqual(manager.generation, 0)
+            manager.flush_writes()
+            self.assertEqual(transactions, [3])
+            self.assertEqual(manager.generation, 1)
+        finally:
+            manager.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
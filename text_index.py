@@ -0,0 +1,192 @@
+# 实体名文本索引，只依赖标准库；knowledge_graph和preprocessing两个包共用，
+# 导入时不会加载neo4j驱动或knowledge_graph包的日志配置
+from array import array
+from bisect import bisect_left
+from collections import Counter
+import heapq
+import threading
+
+class NGramIndex:
+    """
+    实体名的字符n-gram倒排索引
+    
+    每个名称按1~3字的字符n-gram写入倒排表，倒排表是按名称编号升序排列的整数数组
+    （编号按写入顺序分配，追加即有序）。子串查询取查询串的全部最长n-gram，从最短的倒排表开始
+    二分求交，再对少量候选做一次子串校验；模糊查询按二元组的Dice系数排序。
+    """
+    def __init__(self, max_n=3, max_fuzzy_posting=50000):
+        """
+        初始化索引
+        
+        Args:
+            max_n: 索引的最长n-gram
+            max_fuzzy_posting: 模糊查询时忽略倒排表超过该长度的高频二元组（如"公司"）
+        """
+        self.max_n = max_n
+        self.max_fuzzy_posting = max_fuzzy_posting
+        self.names = []
+        self.name_to_id = {}
+        self.postings = {}
+        # 每个名称的不重复二元组数量，用于计算Dice系数
+        self.bigram_counts = array('i')
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.names)
+    
+    def __contains__(self, name):
+        return name in self.name_to_id
+    
+    def _grams(self, text):
+        """text中长度为1~max_n的全部不重复n-gram"""
+        return {text[i:i + n] for n in range(1, self.max_n + 1) for i in range(len(text) - n + 1)}
+    
+    @staticmethod
+    def _bigrams(text):
+        """text的二元组集合，单字名称以自身作为唯一的二元组"""
+        if len(text) < 2:
+            return {text}
+        return {text[i:i + 2] for i in range(len(text) - 1)}
+    
+    def add(self, name):
+        """
+        写入一个名称
+        
+        Returns:
+            名称编号
+        """
+        name = str(name)
+        with self._lock:
+            name_id = self.name_to_id.get(name)
+            if name_id is not None:
+                return name_id
+            name_id = len(self.names)
+            for gram in self._grams(name):
+                posting = self.postings.get(gram)
+                if posting is None:
+                    posting = self.postings[gram] = array('i')
+                posting.append(name_id)
+            self.bigram_counts.append(len(self._bigrams(name)))
+            # 倒排表写完后再登记名称，并发读取时不会看到写了一半的条目
+            self.names.append(name)
+            self.name_to_id[name] = name_id
+            return name_id
+    
+    def add_many(self, names):
+        """批量写入名称，返回新写入的数量"""
+        before = len(self.names)
+        for name in names:
+            if name is not None:
+                self.add(name)
+        return len(self.names) - before
+    
+    @staticmethod
+    def _intersect(postings):
+        """多个升序倒排表求交：遍历最短的表，在其余表中带下界二分查找"""
+        postings = sorted(postings, key=len)
+        shortest, others = postings[0], postings[1:]
+        if not others:
+            return list(shortest)
+        lows = [0] * len(others)
+        result = []
+        for name_id in shortest:
+            for i, posting in enumerate(others):
+                lows[i] = bisect_left(posting, name_id, lows[i])
+                if lows[i] == len(posting):
+                    return result
+                if posting[lows[i]] != name_id:
+                    break
+            else:
+                result.append(name_id)
+        return result
+    
+    def substring_ids(self, query):
+        """名称中包含query的全部名称编号（升序）"""
+        if not query:
+            return []
+        n = min(self.max_n, len(query))
+        grams = {query[i:i + n] for i in range(len(query) - n + 1)}
+        postings = []
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+        
+        candidates = self._intersect(postings)
+        # 编号可能属于尚未登记完成的名称
+        limit = len(self.names)
+        if len(query) <= self.max_n:
+            return [i for i in candidates if i < limit]
+        return [i for i in candidates if i < limit and query in self.names[i]]
+    
+    def has_substring(self, query):
+        """是否存在包含query的名称"""
+        if not query:
+            return True
+        if len(query) <= self.max_n:
+            posting = self.postings.get(query)
+            return bool(posting) and posting[0] < len(self.names)
+        return bool(self.substring_ids(query))
+    
+    def search(self, query, limit=10):
+        """
+        子串查询
+        
+        Returns:
+            [(名称, 分数), ...]，分数为查询串在名称中所占的比例，完全匹配为1.0，按分数降序
+        """
+        query = str(query)
+        ids = heapq.nsmallest(limit, self.substring_ids(query), key=lambda i: len(self.names[i]))
+        return [(self.names[i], len(query) / len(self.names[i])) for i in ids]
+    
+    def fuzzy_search(self, query, limit=10, min_score=0.3):
+        """
+        模糊查询：按二元组Dice系数排序，可以找回有错别字或多余字符的名称
+        
+        Returns:
+            [(名称, Dice系数), ...]，按分数降序
+        """
+        query_bigrams = self._bigrams(str(query))
+        shared = Counter()
+        for gram in query_bigrams:
+            posting = self.postings.get(gram)
+            if posting is None or len(posting) > self.max_fuzzy_posting:
+                continue
+            shared.update(posting)
+        
+        total = len(self.names)
+        scored = []
+        for name_id, count in shared.items():
+            if name_id >= total:
+                continue
+            score = 2 * count / (len(query_bigrams) + self.bigram_counts[name_id])
+            if score >= min_score:
+                scored.append((score, -len(self.names[name_id]), name_id))
+        scored.sort(reverse=True)
+        return [(self.names[name_id], score) for score, _, name_id in scored[:limit]]
+    
+    def lookup(self, query, limit=10, fuzzy=True, min_score=0.3):
+        """
+        子串匹配优先、模糊匹配补足的排序候选列表
+        
+        Returns:
+            [(名称, 分数), ...]
+        """
+        results = self.search(query, limit)
+        if fuzzy and len(results) < limit:
+            seen = {name for name, _ in results}
+            for name, score in self.fuzzy_search(query, limit, min_score):
+                if name not in seen:
+                    results.append((name, score))
+                    if len(results) >= limit:
+                        break
+        return results
+    
+    def get_stats(self):
+        """获取索引统计信息"""
+        return {
+            'names': len(self.names),
+            'grams': len(self.postings),
+            'postings': sum(len(posting) for posting in self.postings.values())
+        }
@@ -1,17 +1,24 @@
 from flask import Flask, render_template, request, jsonify
+from contextlib import contextmanager
+import argparse
+import subprocess
 import sys
 import os
 import logging
 import random
+import threading
+import time
 from datetime import datetime
 
 # 添加项目根目录到Python路径，以便导入其他模块
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# 导入项目的核心模块
+# 导入项目的核心模块（torch、transformers、sklearn、pandas在首次使用时才导入）
+_import_start = time.perf_counter()
 from preprocessing import QueryPreprocessor
-from knowledge_graph import init_knowledge_graph, Neo4jManager, GraphManager
+from knowledge_graph import init_knowledge_graph, Neo4jManager, GraphManager, ChangePoller
 from models import QAEngine
+CORE_IMPORT_SECONDS = time.perf_counter() - _import_start
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -25,6 +32,14 @@ app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev_key_for_local_devel
 preprocessor = None
 graph_manager = None
 qa_engine = None
+change_poller = None
+
+# 启动过程：各初始化阶段的耗时（秒）和后台初始化状态
+startup_timings = {}
+initializing = False
+
+# 启动报告中单独列出的重依赖
+HEAVY_MODULES = ('torch', 'transformers', 'sklearn', 'pandas', 'jieba', 'neo4j', 'numpy')
 
 # 示例数据 - 用于演示和测试
 def get_sample_interpolation_data(entity1=None, relation=None, entity2=None):
@@ -205,43 +220,150 @@ def get_sample_extrapolation_data(entity, future_years=5):
     return predictions_by_year, relationship_stats, general_insights
 
 
+@contextmanager
+def startup_phase(name):
+    """记录一个初始化阶段的耗时"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[name] = time.perf_counter() - start_time
+
+
 def initialize_components():
     """初始化系统组件"""
-    global preprocessor, graph_manager, qa_engine
+    global preprocessor, graph_manager, qa_engine, change_poller, initializing
     
+    initializing = True
     try:
         logger.info("正在初始化系统组件...")
         
         # 初始化Neo4j连接
-        neo4j_manager = Neo4jManager()
-        graph_manager = GraphManager(neo4j_manager)
-        
-        # 初始化预处理模块
-        preprocessor = QueryPreprocessor()
+        with startup_phase('neo4j'):
+            neo4j_manager = Neo4jManager()
+            graph_manager = GraphManager(neo4j_manager)
         
-        # 初始化问答引擎
-        qa_engine = QAEngine(graph_manager)
+        # 初始化预处理模块，BERT权重默认在后台线程中加载
+        with startup_phase('preprocessor'):
+            preprocessor = QueryPreprocessor(retrieval_mode=os.environ.get('ENTITY_RETRIEVAL_MODE', 'dense'),
+                                             encoder_loading=os.environ.get('ENCODER_LOADING', 'background'))
         
         # 尝试加载示例数据（如果没有数据）
-        if graph_manager.get_node_count() == 0:
-            logger.info("检测到数据库为空，尝试加载示例数据...")
-            sample_data_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                "knowledge_graph", "data", "sample_graph.json"
-            )
-            if os.path.exists(sample_data_path):
-                graph_manager.build_graph_from_json(sample_data_path)
-                logger.info("示例数据加载成功")
+        with startup_phase('sample_data'):
+            if graph_manager.get_node_count() == 0:
+                logger.info("检测到数据库为空，尝试加载示例数据...")
+                sample_data_path = os.path.join(
+                    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                    "knowledge_graph", "data", "sample_graph.json"
+                )
+                if os.path.exists(sample_data_path):
+                    graph_manager.build_graph_from_json(sample_data_path)
+                    logger.info("示例数据加载成功")
+        
+        # 在示例数据加载之后构建带时间信息的关系索引，外推模型直接从索引读取时间数据；
+        # 变更轮询从最新位置开始，索引构建前写入的关系只能由构建本身读入
+        with startup_phase('temporal_index'):
+            graph_manager.build_temporal_index()
+        
+        # 初始化问答引擎（外推模型在构造时从时间索引收集时间数据）
+        with startup_phase('qa_engine'):
+            qa_engine = QAEngine(graph_manager)
+        
+        # 构建已知实体名过滤器，跳过对一定不存在的实体的数据库查询
+        with startup_phase('entity_filter'):
+            graph_manager.build_entity_filter(snapshot_path=os.environ.get('ENTITY_FILTER_SNAPSHOT'))
+        # 构建实体名n-gram索引，部分名称查找在进程内完成
+        with startup_phase('ngram_index'):
+            graph_manager.build_ngram_index()
         
         # 训练模型
         logger.info("正在训练模型...")
-        qa_engine.train_models(interpolation_epochs=5, extrapolation_epochs=3, learning_rate=0.01)
+        with startup_phase('training'):
+            qa_engine.train_models(interpolation_epochs=5, extrapolation_epochs=3, learning_rate=0.01)
         
-        logger.info("系统组件初始化完成")
+        # 行业趋势和热门实体的预测结果由后台线程定期预先计算
+        qa_engine.enable_forecast_views(
+            refresh_interval=float(os.environ.get('FORECAST_REFRESH_INTERVAL', 300.0)),
+            top_entities=int(os.environ.get('FORECAST_TOP_ENTITIES', 100))
+        )
+        
+        # 轮询图数据变更，使预处理器和模型无需重启即可看到新数据
+        change_poller = ChangePoller(neo4j_manager,
+                                     poll_interval=float(os.environ.get('CHANGE_POLL_INTERVAL', 5.0)),
+                                     lag=float(os.environ.get('CHANGE_POLL_LAG', 60.0)))
+        change_poller.subscribe(graph_manager.apply_graph_changes)
+        change_poller.subscribe(preprocessor.apply_graph_changes)
+        change_poller.subscribe(qa_engine.apply_graph_changes)
+        change_poller.start()
+        
+        logger.info(f"系统组件初始化完成，耗时 {sum(startup_timings.values()):.2f} 秒")
         return True
     except Exception as e:
         logger.error(f"初始化系统组件失败: {str(e)}")
         return False
+    finally:
+        initializing = False
+
+
+def import_time_report(modules=('preprocessing', 'knowledge_graph', 'models'), top_n=15):
+    """
+    在子进程中用 python -X importtime 导入指定模块，统计各模块的导入耗时
+    
+    Args:
+        modules: 要导入的模块
+        top_n: 返回累计耗时最长的前n个模块
+    
+    Returns:
+        [(模块名, 自身耗时秒, 累计耗时秒), ...]，按累计耗时降序；子进程导入失败时返回None
+    """
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + ', '.join(modules)],
+        cwd=project_root, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        logger.error(f"统计导入耗时失败: {completed.stderr.strip().splitlines()[-1:]}")
+        return None
+    
+    rows = []
+    for line in completed.stderr.splitlines():
+        # 格式: "import time: 自身微秒 | 累计微秒 | 缩进的模块名"，缩进表示嵌套层级
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        # 只保留直接导入的模块及其下一层，更深的嵌套已计入上层的累计耗时
+        if depth <= 1:
+            rows.append((name.strip(), int(fields[0]) / 1e6, int(fields[1]) / 1e6))
+    rows.sort(key=lambda row: row[2], reverse=True)
+    return rows[:top_n]
+
+
+def print_startup_report(top_n=15):
+    """输出启动耗时报告：模块导入明细、已导入的重依赖和各初始化阶段耗时"""
+    print(f"核心模块导入耗时: {CORE_IMPORT_SECONDS:.3f} 秒")
+    
+    rows = import_time_report(top_n=top_n)
+    if rows:
+        print(f"\n导入耗时明细（-X importtime，累计耗时前 {top_n}）:")
+        print(f"  {'累计(秒)':>10} {'自身(秒)':>10}  模块")
+        for name, self_seconds, cumulative_seconds in rows:
+            print(f"  {cumulative_seconds:>10.3f} {self_seconds:>10.3f}  {name}")
+    
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    print(f"\n当前进程已导入的重依赖: {', '.join(loaded) or '无'}")
+    
+    if startup_timings:
+        print("\n组件初始化耗时:")
+        for phase, seconds in startup_timings.items():
+            print(f"  {phase:<16} {seconds:.3f} 秒")
+    if preprocessor:
+        status = preprocessor.bert_encoder.get_status()
+        print(f"\nBERT模型: {'已加载' if status['loaded'] else '未加载'}"
+              + (f"，耗时 {status['load_seconds']:.2f} 秒" if status['load_seconds'] else ''))
 
 
 @app.route('/')
@@ -386,13 +508,15 @@ def api_trends():
         data = request.json
         industry = data.get('industry', '').strip()
         future_years = int(data.get('future_years', 5))
+        # 'pairwise'预测公司之间的新关系，'aggregate'预测各关系类型的数量趋势
+        mode = data.get('mode', 'pairwise')
         
         if not industry:
             return jsonify({'error': '请输入行业名称'}), 400
         
         # 使用问答引擎处理行业趋势预测
         try:
-            trends = qa_engine.predict_industry_trend(industry, future_years, 5)  # 这里默认使用top_k=5
+            trends = qa_engine.predict_industry_trend(industry, future_years, 5, mode=mode)  # 这里默认使用top_k=5
         except Exception as e:
             logger.error(f"API行业趋势预测处理失败: {str(e)}")
             # 生成示例趋势数据
@@ -411,7 +535,8 @@ def api_trends():
             'trends': trends,
             'input_data': {
                 'industry': industry,
-                'future_years': future_years
+                'future_years': future_years,
+                'mode': mode
             }
         })
     except Exception as e:
@@ -419,6 +544,29 @@ def api_trends():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/query_stats', methods=['GET'])
+def api_query_stats():
+    """Cypher查询性能统计API接口"""
+    if not graph_manager:
+        return jsonify({'success': False, 'error': '知识图谱未初始化'}), 503
+    
+    try:
+        top_n = int(request.args.get('top_n', 20))
+        sort_by = request.args.get('sort_by', 'total_ms')
+        
+        return jsonify({
+            'success': True,
+            'queries': graph_manager.neo4j_manager.get_query_stats(top_n=top_n, sort_by=sort_by),
+            'cache': graph_manager.get_cache_stats(),
+            'entity_filter': graph_manager.get_entity_filter_stats(),
+            'preprocess_cache': preprocessor.get_cache_stats() if preprocessor else None,
+            'forecast_views': qa_engine.forecast_views.get_stats() if qa_engine and qa_engine.forecast_views else None
+        })
+    except Exception as e:
+        logger.error(f"查询统计API错误: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @app.route('/health')
 def health_check():
     """健康检查接口"""
@@ -433,17 +581,41 @@ def health_check():
     
     return jsonify({
         'status': 'healthy' if all(status.values()) else 'unhealthy',
-        'components': status
+        'components': status,
+        'initializing': initializing,
+        'encoder': preprocessor.bert_encoder.get_status() if preprocessor else None,
+        'startup_seconds': dict(startup_timings)
     })
 
 
 if __name__ == '__main__':
-    # 初始化系统组件
-    initialized = initialize_components()
+    parser = argparse.ArgumentParser(description='知识推理问答系统Web服务')
+    parser.add_argument('--startup-report', action='store_true',
+                        help='初始化系统组件后输出启动耗时报告（模块导入明细和各初始化阶段耗时）并退出')
+    parser.add_argument('--lazy-init', action='store_true',
+                        help='立即启动Web服务，在后台线程中初始化系统组件，初始化期间/health返回initializing')
+    args = parser.parse_args()
     
-    if initialized:
-        logger.info("启动Flask应用...")
-        # 开发环境下运行
-        app.run(host='0.0.0.0', port=5000, debug=True)
+    if args.startup_report:
+        initialized = initialize_components()
+        if change_poller:
+            change_poller.stop()
+        print_startup_report()
+        sys.exit(0 if initialized else 1)
+    
+    if args.lazy_init:
+        initializing = True
+        threading.Thread(target=initialize_components, name='component-init', daemon=True).start()
+        logger.info("启动Flask应用，系统组件在后台初始化...")
+        # 重载器会在子进程中再次执行初始化，后台初始化时关闭
+        app.run(host='0.0.0.0', port=5000, debug=True, use_reloader=False)
     else:
-        logger.error("系统初始化失败，无法启动应用")
\ No newline at end of file
+        # 初始化系统组件
+        initialized = initialize_components()
+        
+        if initialized:
+            logger.info("启动Flask应用...")
+            # 开发环境下运行
+            app.run(host='0.0.0.0', port=5000, debug=True)
+        else:
+            logger.error("系统初始化失败，无法启动应用")